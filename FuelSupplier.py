@@ -1,82 +1,168 @@
+import time
+_script_start = time.perf_counter()
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import pandas as pd
-import plotly.express as px # For Plotly charts
+import gzip
 import math
+import os
+from io import BytesIO
 import datetime # For footer
-import matplotlib.pyplot as plt # For Matplotlib charts
-import matplotlib.ticker as mticker
-from io import StringIO # To read string data as if it's a file
-import re # For more flexible parsing
 import numpy as np # For np.nan
+from fuel_config import (
+    YEAR_OPTIONS, VESSEL_TYPES_OWNED, VESSEL_KEYS, MILLION, MIX_SUM_TOLERANCE,
+    DEFAULT_OWNED_VESSEL_COUNTS, FUEL_MIX_CATEGORIES, DEFAULT_FUEL_MIX,
+    GFI_LINES, REFERENCE_STORE, OBSERVED_CONSUMPTION_FACTORS, config_version,
+)
+from fuel_format import format_value
+import fleet_registry
+import fuel_compliance
+import fuel_engine
+import fuel_jobs
+import fuel_montecarlo
+import fuel_report
+import fuel_sensitivity
+import fuel_session
+import fuel_timeline
+import instrumentation
+import live_results
+import result_cache
+import scenario_store
+# plotly, matplotlib (fuel_charts) and scipy (fuel_optimizer) are loaded lazily by the sections that use them
 
 # *** Call set_page_config() immediately after imports ***
 st.set_page_config(layout="wide")
+section_timer = instrumentation.SectionTimer(start=_script_start)
+section_timer.lap("Imports")
+# Payload and session-size measurements only run while the debug panel is open or metrics are exported
+profiling = (st.session_state.get('show_debug_panel', os.environ.get("FUEL_DEBUG_PANEL") == "1")
+             or instrumentation.EXPORT_ENABLED)
 
-# --- Configuration ---
-YEAR_OPTIONS = [2030, 2040, 2050]
-VESSEL_TYPES_OWNED = ["VLCC", "Suezmax", "Aframax", "Panamax", "MR Tanker"]
-MILLION = 1_000_000
-
-DEFAULT_OWNED_VESSEL_COUNTS = {
-    2030: {"vlcc": 18, "suezmax": 29, "aframax": 5, "panamax": 1, "mr_tanker": 4},
-    2040: {"vlcc": 18, "suezmax": 29, "aframax": 5, "panamax": 0, "mr_tanker": 0},
-    2050: {"vlcc": 18, "suezmax": 29, "aframax": 0, "panamax": 0, "mr_tanker": 0},
-}
-
-# NEW: Default Fleet GFI values for plotting
-DEFAULT_FLEET_GFI = {
-    2030: 85.8,
-    2040: 14.0,
-    2050: 16.8
-}
-
-FUEL_MIX_CATEGORIES = {
-    2030: {"diesel_prod": "Diesel (Produced)", "b30_prod": "B30 (Produced)", "methanol_prod": "Methanol (Produced)", "methanol_proc": "Methanol (Procured)", "ammonia_prod": "Ammonia (Produced)", "ammonia_proc": "Ammonia (Procured)", "hvo_prod": "HVO (Produced)", "hvo_proc": "HVO (Procured)"},
-    2040: {"diesel_prod": "Diesel (Produced)", "b50_prod": "B50 (Produced)", "methanol_prod": "Methanol (Produced)", "methanol_proc": "Methanol (Procured)", "ammonia_prod": "Ammonia (Produced)", "ammonia_proc": "Ammonia (Procured)", "hvo_prod": "HVO (Produced)", "hvo_proc": "HVO (Procured)", "biolng_prod": "BioLNG (Produced)", "biolng_proc": "BioLNG (Procured)", "blueh2_prod": "BlueH2 (Produced)", "blueh2_proc": "BlueH2 (Procured)"},
-    2050: {"diesel_prod": "Diesel (Produced)", "b100_prod": "B100 (Produced)", "b100_proc": "B100 (Procured)", "biomethanol_prod": "bioMethanol (Produced)", "biomethanol_proc": "bioMethanol (Procured)", "ammonia_prod": "Ammonia (Produced)", "ammonia_proc": "Ammonia (Procured)", "biolng_prod": "BioLNG (Produced)", "biolng_proc": "BioLNG (Procured)", "blueh2_prod": "BlueH2 (Produced)", "blueh2_proc": "BlueH2 (Procured)", "elng_prod": "eLNG (Produced)", "elng_proc": "eLNG (Procured)", "ediesel_prod": "eDiesel (Produced)", "ediesel_proc": "eDiesel (Procured)", "emethanol_prod": "eMethanol (Produced)", "emethanol_proc": "eMethanol (Procured)"}
-}
-DEFAULT_FUEL_MIX = {
-    2030: {"diesel_prod": 92.91, "b30_prod": 1.54, "methanol_prod": 0.01, "methanol_proc": 0.00, "ammonia_prod": 0.02, "ammonia_proc": 0.01, "hvo_prod": 0.02, "hvo_proc": 5.49},
-    2040: {"diesel_prod": 7.49, "b50_prod": 2.10, "methanol_prod": 10.80, "methanol_proc": 0.02, "ammonia_prod": 7.80, "ammonia_proc": 8.07, "hvo_prod": 12.78, "hvo_proc": 12.60, "biolng_prod": 11.83, "biolng_proc": 11.27, "blueh2_prod": 7.69, "blueh2_proc": 7.56},
-    2050: {"diesel_prod": 11.66, "b100_prod": 11.60, "b100_proc": 7.90, "biomethanol_prod": 8.22, "biomethanol_proc": 5.14, "ammonia_prod": 4.84, "ammonia_proc": 0.03, "biolng_prod": 21.30, "biolng_proc": 16.26, "blueh2_prod": 1.46, "blueh2_proc": 0.61, "elng_prod": 3.06, "elng_proc": 2.91, "ediesel_prod": 0.87, "ediesel_proc": 0.02, "emethanol_prod": 1.99, "emethanol_proc": 2.13}
-}
-VESSEL_CONSUMPTION_FACTORS = {
-    2030: {"vlcc": 1306537.24, "suezmax": 618990.62, "aframax": 526902.73, "panamax": 468391.74, "mr_tanker": 355173.15},
-    2040: {"vlcc": 1304860.84, "suezmax": 617547.63, "aframax": 525203.36, "panamax": 467124.63, "mr_tanker": 354390.79},
-    2050: {"vlcc": 1303743.24, "suezmax": 616585.64, "aframax": 524070.44, "panamax": 466279.89, "mr_tanker": 353869.23}
-}
-DEFAULT_FUEL_COSTS_GJ = {
-    2030: {"diesel_prod": 11.51, "b30_prod": 14.76, "methanol_prod": 30.68, "methanol_proc": 33.44, "ammonia_prod": 43.54, "ammonia_proc": 47.46, "hvo_prod": 25.43, "hvo_proc": 23.33},
-    2040: {"diesel_prod": 10.46, "b50_prod": 13.1, "methanol_prod": 26.18, "methanol_proc": 28.54, "ammonia_prod": 43.54, "ammonia_proc": 36.6, "hvo_prod": 22.82, "hvo_proc": 23.33, "biolng_prod": 20.03, "biolng_proc": 21.83, "blueh2_prod": 40.81, "blueh2_proc": 44.48},
-    2050: {"diesel_prod": 8.72, "b100_prod": 22.17, "b100_proc": 24.16, "biomethanol_prod": 23.63, "biomethanol_proc": 25.75, "ammonia_prod": 26.62, "ammonia_proc": 28.8, "biolng_prod": 17.42, "biolng_proc": 18.99, "blueh2_prod": 39.41, "blueh2_proc": 42.96, "elng_prod": 35.27, "elng_proc": 35.73, "ediesel_prod": 43.34, "ediesel_proc": 47.23, "emethanol_prod": 38.94, "emethanol_proc": 38.44}
-}
-ALL_FUEL_MIX_KEYS = set().union(*(d.keys() for d in FUEL_MIX_CATEGORIES.values()))
-
-
-# --- Helper Function for Formatting ---
-def format_value(value, sig_figs=3):
-    if value is None or math.isnan(value) or abs(value) < 1e-9: return "0.00"
-    try: return f"{value:.{sig_figs}g}"
-    except (ValueError, TypeError): return str(value)
+# --- Shared Result Cache ---
+@instrumentation.counted_cache(st.cache_resource)
+def get_result_cache():
+    return result_cache.ResultCache(persist_dir=os.environ.get("FUEL_RESULT_CACHE_DIR"))
+
+
+@instrumentation.counted_cache(st.cache_resource)
+def get_figure_cache():
+    return fuel_session.FigureCache()
+
+
+@instrumentation.counted_cache(st.cache_resource)
+def get_scenario_store():
+    return scenario_store.ScenarioStore(os.environ.get("FUEL_SCENARIO_DB"))
+
+
+def current_scenario_inputs(year):
+    owned_counts = {k: st.session_state.get(f"owned_{k}", 0) for k in VESSEL_KEYS}
+    fuel_mix = {key: st.session_state.get(key, 0.0) for key in FUEL_MIX_CATEGORIES.get(year, {})}
+    return owned_counts, fuel_mix
+
+
+@instrumentation.counted_cache(st.cache_data(max_entries=4))
+def load_uploaded_registry(data, name):
+    return fleet_registry.load_registry(BytesIO(data), "parquet" if name.lower().endswith(".parquet") else "csv")
+
+
+def active_registry():
+    """The uploaded vessel registry if the user chose to calculate with it, else None."""
+    upload = st.session_state.get("registry_file")
+    if upload is None or not st.session_state.get("use_vessel_registry"):
+        return None
+    try:
+        return load_uploaded_registry(upload.getvalue(), upload.name)
+    except ValueError:
+        return None
+
+
+def scenario_cache_key(year, counts, mix, registry=None):
+    """Result-cache key for input arrays laid out as ``fuel_session.read_inputs`` returns them."""
+    extra = [fleet_registry.registry_fingerprint(registry)] if registry is not None else []
+    return result_cache.scenario_key(year, counts, mix, "scenario_results", *extra)
+
+
+def memoized_figure(name, data, build):
+    """Build a chart once per distinct source data, shared by all sessions (read-only)."""
+    return get_figure_cache().get_or_build(name, data, build)
+
+
+def record_payload(name, payload_bytes):
+    instrumentation.record_figure(name, payload_bytes)
+    st.session_state.setdefault("figure_payload_bytes", {})[name] = payload_bytes
+
+
+def show_plotly_chart(name, fig, **kwargs):
+    if profiling:
+        record_payload(name, len(fig.to_json()))
+    return st.plotly_chart(fig, **kwargs)
+
+
+def show_image(name, image, **kwargs):
+    if profiling:
+        record_payload(name, len(image))
+    st.image(image, **kwargs)
+
+
+def store_calculation_results(results):
+    st.session_state.results = results
+    st.session_state.show_results = True
+    st.session_state.monte_carlo_summary = None
+
+def refresh_live_results():
+    """Push the current inputs through the session's LiveCalculation, recomputing only what changed."""
+    start = time.perf_counter()
+    year = st.session_state.selected_year
+    try:
+        tables = fuel_engine.get_year_tables(year)
+    except KeyError:
+        return
+    counts, mix = fuel_session.read_inputs(st.session_state, year)
+    registry = active_registry()
+    if registry is not None:
+        counts, factors = registry.engine_inputs(year)
+    else:
+        factors = tables.consumption_factors
+
+    live_key = (year, fleet_registry.registry_fingerprint(registry) if registry is not None else None)
+    live = st.session_state.live_calculation
+    if live is None or st.session_state.live_calculation_key != live_key:
+        live = live_results.LiveCalculation(tables, counts, mix, consumption_factors=factors)
+        changed = set(live_results.DEPENDENCIES)
+        st.session_state.live_calculation = live
+        st.session_state.live_calculation_key = live_key
+    else:
+        changed = live.update(vessel_counts=counts, consumption_factors=factors, fuel_mix=mix)
+    if changed or not st.session_state.show_results:
+        store_calculation_results(live.results())
+    st.session_state.live_update_stats = (len(changed), (time.perf_counter() - start) * 1000.0)
 
 # --- Callbacks ---
 def clear_results_if_individual_input_changes():
     st.session_state.results = None
     st.session_state.show_results = False
-    # Clear GFI data if individual inputs change, as it's tied to a full calculation run
-    if 'calculated_fleet_gfi' in st.session_state:
-        del st.session_state.calculated_fleet_gfi
-    if 'gfi_calculation_year' in st.session_state:
-        del st.session_state.gfi_calculation_year
+    st.session_state.monte_carlo_summary = None
+    st.session_state.timeline_results = None
+
+
+def handle_individual_input_change():
+    if st.session_state.live_mode:
+        return  # Live results are refreshed incrementally at the top of the run
+    # Restore results if these exact inputs were calculated before (in any session), else clear
+    clear_results_if_individual_input_changes()
+    year = st.session_state.selected_year
+    counts, mix = fuel_session.read_inputs(st.session_state, year)
+    if mix.size and fuel_engine.mix_sums_ok(mix):
+        cached = get_result_cache().get(scenario_cache_key(year, counts, mix, active_registry()))
+        if cached is not None:
+            store_calculation_results(cached)
 
 
 def handle_year_selection_change():
     st.session_state.results = None
     st.session_state.show_results = False
-    if 'calculated_fleet_gfi' in st.session_state:
-        del st.session_state.calculated_fleet_gfi
-    if 'gfi_calculation_year' in st.session_state:
-        del st.session_state.gfi_calculation_year
+    st.session_state.monte_carlo_summary = None
+    st.session_state.timeline_results = None
 
     newly_selected_year = st.session_state.selected_year
     year_vessel_defaults = DEFAULT_OWNED_VESSEL_COUNTS.get(newly_selected_year, {})
@@ -93,15 +179,30 @@ if 'results' not in st.session_state:
     st.session_state.results = None
 if 'show_results' not in st.session_state:
     st.session_state.show_results = False
+if 'monte_carlo_summary' not in st.session_state:
+    st.session_state.monte_carlo_summary = None
+if 'timeline_results' not in st.session_state:
+    st.session_state.timeline_results = None
+if 'renewal_results' not in st.session_state:
+    st.session_state.renewal_results = None
+if 'scenario_load_request' not in st.session_state:
+    st.session_state.scenario_load_request = None
+if 'job_ids' not in st.session_state:
+    st.session_state.job_ids = []  # Background sweeps opened in this session, newest first
+if 'report_ids' not in st.session_state:
+    st.session_state.report_ids = []  # Reports built in this session, newest first
 if 'reset_request_for_year' not in st.session_state:
     st.session_state.reset_request_for_year = None
 if 'fuel_mix_defaults_loaded_for_year' not in st.session_state:
     st.session_state.fuel_mix_defaults_loaded_for_year = None
-# For GFI plotting
-if 'calculated_fleet_gfi' not in st.session_state:
-    st.session_state.calculated_fleet_gfi = None
-if 'gfi_calculation_year' not in st.session_state:
-    st.session_state.gfi_calculation_year = None
+if 'optimized_mix_request' not in st.session_state:
+    st.session_state.optimized_mix_request = None
+if 'live_mode' not in st.session_state:
+    st.session_state.live_mode = False
+if 'live_calculation' not in st.session_state:
+    st.session_state.live_calculation = None
+    st.session_state.live_calculation_key = None
+    st.session_state.live_update_stats = None
 
 
 _current_year_for_init = st.session_state.selected_year
@@ -113,10 +214,23 @@ for vessel_type_display in VESSEL_TYPES_OWNED:
         st.session_state[_ss_key] = _initial_vessel_counts_for_year.get(_internal_key, 0)
 
 _initial_fuel_mix_for_year = DEFAULT_FUEL_MIX.get(_current_year_for_init, {})
-for key in ALL_FUEL_MIX_KEYS:
+for key in FUEL_MIX_CATEGORIES.get(_current_year_for_init, {}):  # Only the selected year's mix is kept
     if key not in st.session_state:
         st.session_state[key] = _initial_fuel_mix_for_year.get(key, 0.0)
 
+# --- Load Saved Scenario ---
+if st.session_state.scenario_load_request:
+    load_year, load_counts, load_mix = st.session_state.scenario_load_request
+    st.session_state.selected_year = load_year
+    for k, count in load_counts.items():
+        st.session_state[f"owned_{k}"] = count
+    for key, share in load_mix.items():
+        st.session_state[key] = share
+    st.session_state.use_vessel_registry = False
+    st.session_state.fuel_mix_defaults_loaded_for_year = load_year
+    st.session_state.scenario_load_request = None
+    clear_results_if_individual_input_changes()
+
 if st.session_state.fuel_mix_defaults_loaded_for_year != st.session_state.selected_year:
     st.session_state.reset_request_for_year = st.session_state.selected_year
 
@@ -130,6 +244,20 @@ if st.session_state.get('reset_request_for_year'):
             st.session_state[key] = defaults_to_set.get(key, 0.0)
     st.session_state.fuel_mix_defaults_loaded_for_year = year_to_reset
     st.session_state.reset_request_for_year = None
+fuel_session.prune_mix_keys(st.session_state, st.session_state.selected_year)
+
+# --- Apply Optimized Fuel Mix ---
+if st.session_state.optimized_mix_request:
+    for key, value in st.session_state.optimized_mix_request.items():
+        st.session_state[key] = value
+    st.session_state.optimized_mix_request = None
+    clear_results_if_individual_input_changes()
+
+# --- Live Results ---
+if st.session_state.live_mode:
+    refresh_live_results()
+
+section_timer.lap("Session State")
 
 # --- App Layout ---
 st.title("⛽ Fuel Supplier Decision Making Tool")
@@ -145,18 +273,40 @@ with col_main_1:
         on_change=handle_year_selection_change
     )
     st.markdown("**Owned Vessel Counts:**")
+    using_registry = active_registry() is not None
     for vessel in VESSEL_TYPES_OWNED:
         key = f"owned_{vessel.lower().replace(' ', '_')}"
         st.number_input(
-            f"# Owned {vessel}", min_value=0, step=1, key=key,
-            on_change=clear_results_if_individual_input_changes
+            f"# Owned {vessel}", min_value=0, step=1, key=key, disabled=using_registry,
+            on_change=handle_individual_input_change
         )
-    # Manual GFI input removed. GFI will be taken from DEFAULT_FLEET_GFI based on selected year.
+    with st.expander("Vessel Registry (optional)", expanded=using_registry):
+        registry_file = st.file_uploader("Per-vessel registry (CSV or Parquet)", type=["csv", "parquet"],
+                                         key="registry_file", on_change=handle_individual_input_change)
+        st.caption("Columns: vessel_id, vessel_type, and optionally consumption_gj, build_year, "
+                   "retire_year, engine, region, fuel_capability (e.g. diesel;methanol).")
+        if registry_file is not None:
+            try:
+                uploaded_registry = load_uploaded_registry(registry_file.getvalue(), registry_file.name)
+            except ValueError as e:
+                st.error(str(e))
+            else:
+                st.checkbox(f"Calculate with the registry's {len(uploaded_registry):,} vessels instead of the counts above",
+                            key="use_vessel_registry", on_change=handle_individual_input_change)
+                group_by = st.selectbox("Group by:", options=fleet_registry.GROUP_BY, key="registry_group_by",
+                                        format_func=str.title)
+                aggregate = uploaded_registry.aggregate(group_by, st.session_state.selected_year)
+                st.dataframe(pd.DataFrame({
+                    group_by.title(): aggregate.labels,
+                    "Active Vessels": aggregate.vessel_count,
+                    "Consumption (GJ/Year)": aggregate.consumption_gj,
+                }).style.format({"Consumption (GJ/Year)": "{:,.0f}"}), hide_index=True, use_container_width=True)
 
 with col_main_2:
     selected_year = st.session_state.selected_year
+    mix_limits = ({}, (0.0, 100.0))  # Availability caps and produced share, shared by the optimizer and frontier
     st.subheader(f"2. Input Fuel Mix (%) for {selected_year}")
-    st.markdown("_Source: External Analysis (e.g., Matlab)_")
+    st.markdown("_Source: External Analysis (e.g., Matlab) or the built-in optimizer below_")
     current_fuel_mix_categories = FUEL_MIX_CATEGORIES.get(selected_year, {})
     if not current_fuel_mix_categories:
         st.error(f"Fuel mix configuration not found for year {selected_year}.")
@@ -169,12 +319,12 @@ with col_main_2:
                  st.number_input(
                      display_name.replace(" Percentage", ""), min_value=0.0, max_value=100.0,
                      step=1.0, format="%.2f", key=key, help="Percentage (0-100).",
-                     on_change=clear_results_if_individual_input_changes
+                     on_change=handle_individual_input_change
                  )
                  total_percentage += st.session_state.get(key, 0.0)
             col_idx = (col_idx + 1) % 2
         
-        if not math.isclose(total_percentage, 100.0, abs_tol=0.1):
+        if not math.isclose(total_percentage, 100.0, abs_tol=MIX_SUM_TOLERANCE):
             st.warning(f"Mix % sum = {total_percentage:.2f}%. Should be 100%.")
         else:
             st.success(f"Mix % sum = {total_percentage:.2f}%.")
@@ -183,211 +333,223 @@ with col_main_2:
             st.session_state.reset_request_for_year = selected_year
             st.rerun()
 
+        with st.expander(f"Optimize {selected_year} Mix (Least Cost)"):
+            gfi_limits = fuel_compliance.gfi_limits(selected_year)
+            opt_line = st.selectbox(
+                "GFI target line:", options=[*GFI_LINES, None], index=1, key='opt_gfi_line',
+                format_func=lambda line: f"{line} ({gfi_limits[GFI_LINES[line]]:.2f} gCO2eq/MJ)" if line else "No GFI cap"
+            )
+            opt_compliance = st.checkbox("Include GFI penalty/credit cost in the objective", key='opt_include_compliance',
+                                         help="Trade fuel cost against remedial-unit penalties and surplus credits.")
+            opt_produced_share = st.slider("Produced share of fuel (%)", 0.0, 100.0, (0.0, 100.0),
+                                           step=1.0, key='opt_produced_share')
+            opt_caps = st.data_editor(
+                pd.DataFrame({"Fuel Source": list(current_fuel_mix_categories.values()),
+                              "Max Share (%)": [100.0] * len(current_fuel_mix_categories)}),
+                disabled=["Fuel Source"], hide_index=True, use_container_width=True,
+                key=f"opt_caps_{selected_year}",
+                column_config={"Max Share (%)": st.column_config.NumberColumn(min_value=0.0, max_value=100.0, format="%.2f")},
+            )
+            mix_limits = (dict(zip(current_fuel_mix_categories, opt_caps["Max Share (%)"])), tuple(opt_produced_share))
+            if st.button("Optimize Mix"):
+                fuel_optimizer = instrumentation.lazy_import("fuel_optimizer")
+                try:
+                    optimized = fuel_optimizer.optimize_fuel_mix(
+                        selected_year, gfi_line=opt_line, produced_share=opt_produced_share,
+                        include_compliance_cost=opt_compliance, availability_caps=mix_limits[0]
+                    )
+                except ValueError as e:
+                    st.error(str(e))
+                else:
+                    st.session_state.optimized_mix_request = optimized.fuel_mix
+                    st.rerun()
+
 
 st.divider()
+section_timer.lap("Inputs")
 
 # --- Calculation Trigger ---
 st.header("📊 Calculate & Visualize")
+st.toggle("Live results", key="live_mode", on_change=clear_results_if_individual_input_changes,
+          help="Update the outputs as inputs change, recomputing only the affected figures.")
+if st.session_state.live_mode and st.session_state.live_update_stats:
+    changed_outputs, update_ms = st.session_state.live_update_stats
+    live_mix_total = fuel_session.read_inputs(st.session_state, st.session_state.selected_year)[1].sum()
+    st.caption(f"Live update: {changed_outputs} outputs recomputed in {update_ms:.2f} ms")
+    if not fuel_engine.mix_sums_ok(live_mix_total):
+        st.warning(f"Mix % sum = {live_mix_total:.2f}%. Live results are provisional until it totals 100%.")
 if st.button("Run Calculation", type="primary"):
     current_year = st.session_state.selected_year
-    current_consumption_factors = VESSEL_CONSUMPTION_FACTORS.get(current_year)
-    current_fuel_mix_categories = FUEL_MIX_CATEGORIES.get(current_year)
-    current_fuel_costs_gj = DEFAULT_FUEL_COSTS_GJ.get(current_year)
+    try:
+        year_tables = fuel_engine.get_year_tables(current_year)
+    except KeyError:
+        year_tables = None
 
-    if not current_consumption_factors or not current_fuel_mix_categories or not current_fuel_costs_gj:
+    if year_tables is None:
         st.error(f"Configuration missing for {current_year}.")
         clear_results_if_individual_input_changes()
     else:
-        total_percentage = sum(st.session_state.get(key, 0.0) for key in current_fuel_mix_categories.keys())
-        if not math.isclose(total_percentage, 100.0, abs_tol=0.1):
+        owned_counts, fuel_mix = current_scenario_inputs(current_year)
+        counts, mix = fuel_session.read_inputs(st.session_state, current_year)
+        registry = active_registry()
+        if not fuel_engine.mix_sums_ok(mix):
              st.error(f"Cannot proceed. Fuel mix % must sum to 100%.")
              clear_results_if_individual_input_changes()
         else:
-            fleet_cons_by_type = {}
-            total_annual_cons = 0.0
-            fuel_cons_by_mix = {}
-            fuel_mix_perc = {}
-            fuel_cost_by_mix = {}
-            total_fuel_cost = 0.0
-            prod_vs_proc_cost = {'Produced': 0.0, 'Procured': 0.0}
-            base_fuel_demand_gj = {}
-
             with st.spinner(f"Calculating for {current_year}..."):
-                for vessel in VESSEL_TYPES_OWNED:
-                    v_key = f"owned_{vessel.lower().replace(' ', '_')}"
-                    factor_key = vessel.lower().replace(' ', '_')
-                    num_vessels = st.session_state.get(v_key, 0)
-                    consumption_per_vessel = current_consumption_factors.get(factor_key, 0)
-                    consumption = num_vessels * consumption_per_vessel
-                    fleet_cons_by_type[vessel] = consumption
-                    total_annual_cons += consumption
-
-                for key, display_name in current_fuel_mix_categories.items():
-                    percentage = st.session_state.get(key, 0.0)
-                    cost_gj = current_fuel_costs_gj.get(key, 0.0)
+                for display_name, cost_gj, percentage in zip(year_tables.display_names, year_tables.fuel_costs_gj, mix):
                     if cost_gj == 0.0 and percentage > 0:
                         st.warning(f"Cost is $0/GJ for {display_name} which has a {percentage:.2f}% share.")
-                    fuel_consumption_gj = total_annual_cons * (percentage / 100.0)
-                    fuel_cost_usd = fuel_consumption_gj * cost_gj
-                    
-                    fuel_cons_by_mix[display_name] = fuel_consumption_gj
-                    fuel_cost_by_mix[display_name] = fuel_cost_usd / MILLION
-                    fuel_mix_perc[display_name] = percentage
-                    total_fuel_cost += fuel_cost_usd
-
-                    if "(Produced)" in display_name:
-                        prod_vs_proc_cost['Produced'] += fuel_cost_usd
-                    elif "(Procured)" in display_name:
-                        prod_vs_proc_cost['Procured'] += fuel_cost_usd
-                    
-                    base_name = display_name.replace(" (Produced)", "").replace(" (Procured)", "")
-                    base_fuel_demand_gj[base_name] = base_fuel_demand_gj.get(base_name, 0.0) + fuel_consumption_gj
-            
-            total_fuel_cost_million = total_fuel_cost / MILLION
-            prod_vs_proc_cost['Produced'] /= MILLION
-            prod_vs_proc_cost['Procured'] /= MILLION
-
-            st.session_state.results = {
-                "fleet_consumption_by_type": fleet_cons_by_type,
-                "fuel_mix_percentages": fuel_mix_perc,
-                "total_annual_consumption": total_annual_cons,
-                "fuel_consumption_by_mix": fuel_cons_by_mix,
-                "fuel_cost_by_mix": fuel_cost_by_mix,
-                "total_fuel_cost_million": total_fuel_cost_million,
-                "prod_vs_proc_cost_million": prod_vs_proc_cost,
-                "base_fuel_demand_gj": base_fuel_demand_gj,
-                "calculated_for_year": current_year
-            }
-            st.session_state.show_results = True
-            
-            # MODIFICATION: Set GFI for plotting from defaults
-            st.session_state.calculated_fleet_gfi = DEFAULT_FLEET_GFI.get(current_year)
-            st.session_state.gfi_calculation_year = current_year
+                if registry is not None:
+                    compute = lambda: fleet_registry.compute_registry_results(current_year, registry, fuel_mix)
+                else:
+                    compute = lambda: fuel_engine.compute_results(current_year, owned_counts, fuel_mix)
+                store_calculation_results(get_result_cache().get_or_compute(
+                    scenario_cache_key(current_year, counts, mix, registry), compute
+                ))
 
             st.success(f"Calculation Complete for {current_year}!")
 
+cache_stats = get_result_cache().stats()
+st.caption(f"Shared result cache: {cache_stats['entries']} scenarios, "
+           f"{cache_stats['hits']} hits / {cache_stats['misses']} misses ({cache_stats['hit_rate']:.0%} hit rate)")
+
 st.divider()
+section_timer.lap("Calculation")
 
 # --- Output Section: Main Calculation Results ---
 st.header("📈 Calculation Outputs")
 if st.session_state.show_results and st.session_state.results:
     results = st.session_state.results
-    calc_year = results["calculated_for_year"]
+    calc_year = results.year
+    calc_tables = results.tables
     
     st.subheader(f"Annual Fuel Analysis (Year: {calc_year})")
     
     m_col1, m_col2 = st.columns(2)
     with m_col1:
-        st.metric(label="Total Annual Fleet Consumption", value=f"{results['total_annual_consumption']:,.2f} GJ/Year")
+        observed_years = sorted(OBSERVED_CONSUMPTION_FACTORS)
+        st.metric(label="Total Annual Fleet Consumption", value=f"{results.total_consumption:,.2f} GJ/Year",
+                  help=(f"Per-vessel consumption calibrated to noon reports and voyage logs ({observed_years[0]}–{observed_years[-1]})"
+                        if observed_years else "Per-vessel consumption from the reference projections"))
     with m_col2:
-        st.metric(label="Total Annual Fuel Expenditure", value=f"{format_value(results['total_fuel_cost_million'], 3)} Million USD")
+        st.metric(label="Total Annual Fuel Expenditure", value=f"{format_value(results.total_cost_musd, 3)} Million USD")
+    m_col3, m_col4 = st.columns(2)
+    with m_col3:
+        st.metric(label="Fleet GFI (Well-to-Wake)", value=f"{results.fleet_gfi:.2f} gCO2eq/MJ",
+                  help=fuel_compliance.ZONE_LABELS[results.gfi_zone])
+        st.caption(fuel_compliance.ZONE_LABELS[results.gfi_zone])
+    with m_col4:
+        st.metric(label="GFI Compliance Cost (Penalty − Credit)", value=f"{format_value(results.compliance_cost_musd, 3)} Million USD")
+        st.caption(f"Total incl. compliance: {format_value(results.total_cost_incl_compliance_musd, 3)} Million USD")
     
     st.divider()
     
     row1_col1, row1_col2 = st.columns(2)
     with row1_col1:
         st.markdown("**Fuel Volume & Cost Breakdown (by Source)**")
-        breakdown_data = []
-        sorted_mix_keys = sorted(results["fuel_consumption_by_mix"].keys())
-        for fuel_name in sorted_mix_keys:
-            if results["fuel_consumption_by_mix"][fuel_name] > 1e-9: 
-                breakdown_data.append({
-                    "Fuel Source": fuel_name,
-                    "Consumption (GJ/Year)": results["fuel_consumption_by_mix"][fuel_name],
-                    "Cost (Million USD/Year)": results["fuel_cost_by_mix"][fuel_name] 
-                })
-        if breakdown_data:
-            df_breakdown = pd.DataFrame(breakdown_data)
-            st.dataframe(
-                df_breakdown.style.format({
-                    "Consumption (GJ/Year)": "{:,.0f}",
-                    "Cost (Million USD/Year)": "{:,.3f}"
-                }),
-                height = 350, use_container_width=True
-            )
+        # Rows sorted by fuel name, built from the result arrays only when shown
+        breakdown_rows = [i for i in np.argsort(calc_tables.display_names) if results.consumption_by_mix[i] > 1e-9]
+        if breakdown_rows:
+            st.dataframe({
+                "Fuel Source": [calc_tables.display_names[i] for i in breakdown_rows],
+                "Consumption (GJ/Year)": results.consumption_by_mix[breakdown_rows],
+                "Cost (Million USD/Year)": results.cost_by_mix_musd[breakdown_rows],
+            }, column_config={
+                "Consumption (GJ/Year)": st.column_config.NumberColumn(format="%,.0f"),
+                "Cost (Million USD/Year)": st.column_config.NumberColumn(format="%,.3f"),
+            }, height=350, use_container_width=True)
         else: st.info("No significant fuel consumption to display.")
 
+    # Figures are memoized by the arrays each one plots, so a chart whose data is unchanged reuses its figure and spec
+    result_charts = instrumentation.lazy_import("result_charts")
+    output_figure = lambda name, data, build: memoized_figure(name, data, lambda: build(results))
+
     with row1_col2:
         st.markdown("**Cost Contribution by Fuel Source**")
-        cost_data = {k: v for k, v in results["fuel_cost_by_mix"].items() if v > 1e-9}
-        if cost_data:
-            df_cost_pie = pd.DataFrame(cost_data.items(), columns=['Fuel Source', 'Cost (Million USD/Year)'])
-            fig_cost_pie = px.pie(df_cost_pie, values='Cost (Million USD/Year)', names='Fuel Source', hole=0.3)
-            fig_cost_pie.update_traces(textposition='inside', textinfo='percent+label', hoverinfo='label+percent+value')
-            fig_cost_pie.update_layout(showlegend=False, height=350, margin=dict(t=20, b=20))
-            st.plotly_chart(fig_cost_pie, use_container_width=True)
+        fig_cost_pie = output_figure("cost_pie", (results.tables.display_names, results.cost_by_mix_musd),
+                                     result_charts.cost_pie)
+        if fig_cost_pie is not None:
+            show_plotly_chart("cost_pie", fig_cost_pie, use_container_width=True)
         else: st.info("No cost data to display in pie chart.")
 
     row2_col1, row2_col2 = st.columns(2)
     with row2_col1:
         st.markdown("**Production vs. Procurement Costs**")
-        prod_proc_data = results['prod_vs_proc_cost_million']
-        if sum(prod_proc_data.values()) > 1e-9 :
-            df_prod_proc = pd.DataFrame(prod_proc_data.items(), columns=['Source Type', 'Total Cost (Million USD)'])
-            fig_prod_proc = px.bar(df_prod_proc, x='Source Type', y='Total Cost (Million USD)', 
-                                   text_auto='.3s', labels={'Total Cost (Million USD)': 'Million USD/Year'})
-            fig_prod_proc.update_layout(xaxis_title=None, height=350, margin=dict(b=50))
-            fig_prod_proc.update_traces(textposition='outside')
-            st.plotly_chart(fig_prod_proc, use_container_width=True)
+        fig_prod_proc = output_figure("prod_proc", (results.produced_cost_musd, results.procured_cost_musd),
+                                       result_charts.produced_procured_bar)
+        if fig_prod_proc is not None:
+            show_plotly_chart("prod_proc", fig_prod_proc, use_container_width=True)
         else: st.info("Costs are effectively zero.")
             
     with row2_col2:
         st.markdown("**Consumption by Vessel Type**")
-        if results["fleet_consumption_by_type"] and any(abs(v) > 1e-9 for v in results["fleet_consumption_by_type"].values()):
-            df_type = pd.DataFrame(results["fleet_consumption_by_type"].items(), columns=['Vessel Type', 'Consumption (GJ/Year)'])
-            df_type_plot = df_type[abs(df_type['Consumption (GJ/Year)']) > 1e-9]
-            if not df_type_plot.empty:
-                fig_type = px.bar(df_type_plot, x='Vessel Type', y='Consumption (GJ/Year)',
-                                  text_auto='.3s', labels={'Consumption (GJ/Year)': 'GJ / Year'})
-                fig_type.update_layout(xaxis_tickangle=-45, height=350, margin=dict(b=50))
-                fig_type.update_traces(textposition='outside')
-                st.plotly_chart(fig_type, use_container_width=True)
-            else: st.info("Consumptions for all vessel types are effectively zero.")
-        else: st.info("No vessel consumption data to display.")
+        fig_type = output_figure("type_bar", results.consumption_by_type, result_charts.vessel_type_bar)
+        if fig_type is not None:
+            show_plotly_chart("type_bar", fig_type, use_container_width=True)
+        else: st.info("Consumptions for all vessel types are effectively zero.")
     
     st.divider()
     st.markdown("**Total Demand by Base Fuel Type (Aggregated)**")
-    base_fuel_demand_data = results.get("base_fuel_demand_gj", {})
-
-    # Filter out base fuels with negligible demand for plotting
-    plot_base_fuel_demand = {
-        fuel: demand for fuel, demand in base_fuel_demand_data.items() if abs(demand) > 1e-9  # Using a small epsilon
-    }
-
-    if plot_base_fuel_demand:
-        df_base_demand = pd.DataFrame(plot_base_fuel_demand.items(),
-                                      columns=['Base Fuel Type', 'Total Demand (GJ/Year)'])
-        # Sorting by demand might still be useful for how Plotly orders segments if not specified otherwise,
-        # but for a pie chart, it's less critical for direct visual interpretation than for bars.
-        df_base_demand = df_base_demand.sort_values(by='Total Demand (GJ/Year)', ascending=False)
-
-        # --- MODIFICATION: Convert to Pie Chart ---
-        fig_base_demand_pie = px.pie(
-            df_base_demand,
-            names='Base Fuel Type',
-            values='Total Demand (GJ/Year)',
-            hole=0.3,  # Optional: for a donut chart effect
-            # title="Fuel Demand Distribution" # Title can be set here or via markdown
-        )
+    fig_base_demand_pie = output_figure("base_demand_pie", (results.tables.base_names, results.base_fuel_demand),
+                                        result_charts.base_demand_pie)
+    if fig_base_demand_pie is not None:
+        show_plotly_chart("base_demand_pie", fig_base_demand_pie, use_container_width=True)
+    else:
+        st.info("No significant base fuel demand to display.")   
 
-        fig_base_demand_pie.update_traces(
-            textposition='inside',  # Options: 'inside', 'outside', 'auto', 'none'
-            textinfo='percent+label',  # Shows percentage and label on slices
-            # hoverinfo='label+percent+value' # Info on hover
-            pull=[0.05 if i == 0 else 0 for i in range(len(df_base_demand))]  # Explode the largest slice slightly
-        )
+    with st.expander("💾 Save to Scenario Store"):
+        sv_col1, sv_col2, sv_col3 = st.columns([2, 2, 1])
+        with sv_col1:
+            save_name = st.text_input("Name", value=f"{calc_year} scenario", key='save_scenario_name')
+        with sv_col2:
+            save_tags = st.text_input("Tags (comma-separated)", key='save_scenario_tags', placeholder="e.g. base, board review")
+        with sv_col3:
+            st.write("")
+            if st.button("Save Scenario", disabled=not save_name.strip()):
+                save_registry = active_registry()
+                if save_registry is not None:
+                    save_counts = dict(zip(VESSEL_KEYS, save_registry.engine_inputs(calc_year)[0].tolist()))
+                else:
+                    save_counts = current_scenario_inputs(calc_year)[0]
+                saved_id = get_scenario_store().save_result(calc_year, save_counts, current_scenario_inputs(calc_year)[1],
+                                                           results, save_name.strip(), save_tags)
+                st.success(f"Saved as scenario #{saved_id}.")
+
+    st.divider()
+    st.markdown("**Fuel Price Uncertainty (Monte Carlo)**")
+    mc_col1, mc_col2, mc_col3 = st.columns(3)
+    with mc_col1:
+        mc_draws = st.number_input("Price draws", min_value=10_000, max_value=100_000_000,
+                                   value=1_000_000, step=100_000, key='mc_draws')
+    with mc_col2:
+        mc_correlation = st.slider("Cross-fuel price correlation", min_value=0.0, max_value=0.95,
+                                   value=fuel_montecarlo.DEFAULT_FUEL_CORRELATION, step=0.05, key='mc_correlation')
+    with mc_col3:
+        mc_seed = st.number_input("Random seed", min_value=0, value=0, step=1, key='mc_seed')
+
+    if st.button("Run Price Uncertainty Analysis"):
+        mc_consumption = results.consumption_by_mix
+        with st.spinner(f"Sampling {int(mc_draws):,} price paths..."):
+            st.session_state.monte_carlo_summary = fuel_montecarlo.simulate_cost_distribution(
+                calc_year, mc_consumption, n_draws=int(mc_draws), correlation=mc_correlation, seed=int(mc_seed)
+            )
 
-        fig_base_demand_pie.update_layout(
-            # title_x=0.5, # Center title if you set it in px.pie
-            height=450,
-            margin=dict(t=30, b=30, l=30, r=30),  # Adjust margins
-            showlegend=True,  # Usually good to have legend for pie, or can be False if labels on slices are enough
-            legend_title_text='Fuel Types',
-            # legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1) # Example legend positioning
+    mc_summary = st.session_state.monte_carlo_summary
+    if mc_summary is not None and mc_summary.year == calc_year:
+        p_cols = st.columns(len(mc_summary.percentiles))
+        for p_col, p, value in zip(p_cols, mc_summary.percentiles, mc_summary.total_cost_percentiles):
+            with p_col:
+                st.metric(label=f"P{p} Total Annual Fuel Expenditure", value=f"{format_value(value / MILLION, 3)} Million USD")
+        df_mc = pd.DataFrame(
+            mc_summary.fuel_cost_percentiles / MILLION,
+            index=pd.Index(mc_summary.display_names, name="Fuel Source"),
+            columns=[f"P{p} Cost (Million USD/Year)" for p in mc_summary.percentiles],
         )
-        st.plotly_chart(fig_base_demand_pie, use_container_width=True)
-    else:
-        st.info("No significant base fuel demand to display.")   
+        df_mc = df_mc[df_mc.abs().sum(axis=1) > 1e-9]
+        st.dataframe(df_mc.style.format("{:,.3f}"), use_container_width=True)
+        st.caption(f"{mc_summary.n_draws:,} correlated price draws; expected expenditure "
+                   f"{format_value(mc_summary.total_cost_mean / MILLION, 3)} Million USD.")
        
 
 else:
@@ -395,227 +557,696 @@ else:
         st.info("Click 'Run Calculation' after entering parameters to see the results.")
 
 st.divider()
+section_timer.lap("Outputs")
+
+# --- Timeline Section: 2025-2050 ---
+st.header(f"📅 {fuel_timeline.TIMELINE_YEARS[0]}–{fuel_timeline.TIMELINE_YEARS[-1]} Timeline")
+st.markdown("_Snapshot-year inputs interpolated to every year; prices follow the projection table._")
+tl_col1, tl_col2 = st.columns(2)
+with tl_col1:
+    tl_discount_pct = st.number_input("Discount rate for NPV (%)", min_value=0.0, max_value=30.0,
+                                      value=fuel_timeline.DEFAULT_DISCOUNT_RATE * 100, step=0.5, key='timeline_discount_pct')
+with tl_col2:
+    tl_use_inputs = st.checkbox(f"Use current inputs for the {st.session_state.selected_year} snapshot",
+                                value=True, key='timeline_use_inputs')
+
+if st.button("Run Timeline"):
+    tl_year = st.session_state.selected_year
+    tl_counts, tl_mix = None, None
+    if tl_use_inputs:
+        tl_year_counts, tl_year_mix = current_scenario_inputs(tl_year)
+        tl_counts, tl_mix = {tl_year: tl_year_counts}, {tl_year: tl_year_mix}
+    if tl_use_inputs and not fuel_engine.mix_sums_ok(fuel_session.read_inputs(st.session_state, tl_year)[1]):
+        st.error(f"Cannot proceed. The {tl_year} fuel mix % must sum to 100%, or untick 'Use current inputs'.")
+    else:
+        with st.spinner("Calculating all years..."):
+            st.session_state.timeline_results = fuel_timeline.compute_timeline(
+                tl_counts, tl_mix, discount_rate=tl_discount_pct / 100.0
+            )
+
+timeline = st.session_state.timeline_results
+if timeline is not None:
+    t_col1, t_col2, t_col3, t_col4 = st.columns(4)
+    with t_col1:
+        st.metric(label="Cumulative Fuel Expenditure", value=f"{format_value(timeline.cumulative_cost[-1] / MILLION, 4)} Million USD")
+    with t_col2:
+        st.metric(label=f"NPV of Fuel Expenditure ({timeline.discount_rate:.1%})", value=f"{format_value(timeline.npv_cost / MILLION, 4)} Million USD")
+    with t_col3:
+        st.metric(label="Cumulative GFI Compliance Cost", value=f"{format_value(timeline.compliance.cost.sum() / MILLION, 4)} Million USD",
+                  help=f"NPV: {format_value(timeline.npv_compliance_cost / MILLION, 4)} Million USD")
+    with t_col4:
+        st.metric(label="Cumulative Fleet Consumption", value=f"{timeline.batch.total_consumption.sum():,.0f} GJ")
+
+    result_charts = instrumentation.lazy_import("result_charts")
+    fig_timeline = memoized_figure("timeline", fuel_session.data_digest(timeline), lambda: result_charts.timeline_cost_bar(
+        timeline.years, timeline.batch.cost_by_mix @ timeline.tables.base_matrix, timeline.tables.base_names))
+    if fig_timeline is not None:
+        show_plotly_chart("timeline", fig_timeline, use_container_width=True)
+
+    df_timeline_demand = pd.DataFrame({
+        "Total Consumption (GJ/Year)": timeline.batch.total_consumption,
+        "Total Cost (Million USD/Year)": timeline.batch.total_cost / MILLION,
+        "Cumulative Cost (Million USD)": timeline.cumulative_cost / MILLION,
+        "Fleet GFI (gCO2eq/MJ)": timeline.compliance.gfi,
+        "GFI Zone": [fuel_compliance.ZONE_LABELS[z] for z in timeline.compliance.zone],
+        "Compliance Cost (Million USD/Year)": timeline.compliance.cost / MILLION,
+        "Total incl. Compliance (Million USD/Year)": (timeline.batch.total_cost + timeline.compliance.cost) / MILLION,
+    }, index=pd.Index(timeline.years, name='Year'))
+    st.dataframe(df_timeline_demand.style.format("{:,.1f}", subset=df_timeline_demand.columns.drop("GFI Zone")),
+                 height=350, use_container_width=True)
+
+st.divider()
+section_timer.lap("Timeline")
+
+# --- Fleet Renewal Planner Section ---
+st.header("🚢 Fleet Renewal Planner")
+st.markdown("_When to convert each vessel type to an alternative-fuel engine, minimizing the NPV of fuel, "
+            "GFI compliance and conversion capex. Uses the timeline's discount rate and fleet inputs; "
+            "low-carbon drop-in fuels are limited to their reference-mix supply._")
+rn_col1, rn_col2 = st.columns(2)
+with rn_col1:
+    renewal_pathways = st.multiselect("Engine pathways to compare:", ["methanol", "ammonia", "lng", "hydrogen"],
+                                      default=["methanol", "ammonia", "lng", "hydrogen"], key='renewal_pathways',
+                                      format_func=lambda c: {"lng": "LNG"}.get(c, c.title()))
+with rn_col2:
+    renewal_slots = st.number_input("Max retrofits per vessel type per year", min_value=0, max_value=10, value=2,
+                                    step=1, key='renewal_slots')
+
+if st.button("Plan Fleet Renewal", disabled=not renewal_pathways):
+    fuel_renewal = instrumentation.lazy_import("fuel_renewal")
+    rn_year = st.session_state.selected_year
+    rn_counts = {rn_year: current_scenario_inputs(rn_year)[0]} if tl_use_inputs else None
+    with st.spinner("Planning conversions for 2025–2050..."):
+        try:
+            st.session_state.renewal_results = fuel_renewal.plan_fleet_renewal(
+                renewal_pathways, owned_counts_by_year=rn_counts, max_retrofits_per_year=int(renewal_slots),
+                discount_rate=tl_discount_pct / 100.0)
+        except ValueError as e:
+            st.session_state.renewal_results = None
+            st.error(str(e))
+
+renewal = st.session_state.renewal_results
+if renewal is not None:
+    go = instrumentation.lazy_import("plotly.graph_objects")
+    result_charts = instrumentation.lazy_import("result_charts")
+    plan = renewal.best
+    pathway_name = lambda c: {"lng": "LNG"}.get(c, c.title())
+    r_col1, r_col2, r_col3, r_col4 = st.columns(4)
+    with r_col1:
+        st.metric("Best Pathway", pathway_name(plan.capability),
+                  help=f"{int(plan.converted[-1].sum())} of {int(plan.vessel_counts[-1].sum())} vessels capable by {plan.years[-1]}")
+    with r_col2:
+        st.metric(f"NPV Total Cost ({renewal.discount_rate:.1%})", f"{format_value(plan.npv / MILLION, 4)} Million USD")
+    with r_col3:
+        st.metric("NPV Conversion Capex", f"{format_value(plan.npv_capex / MILLION, 4)} Million USD")
+    with r_col4:
+        st.metric("NPV GFI Compliance Cost", f"{format_value(plan.npv_compliance_cost / MILLION, 4)} Million USD")
+
+    fig_renewal = go.Figure([
+        go.Bar(x=plan.years, y=plan.fuel_cost / MILLION, name="Fuel"),
+        go.Bar(x=plan.years, y=plan.compliance_cost / MILLION, name="GFI compliance"),
+        go.Bar(x=plan.years, y=plan.capex / MILLION, name="Conversion capex"),
+        result_charts.line_trace(plan.years, plan.capable_share * 100, name="Capable energy share (%)", yaxis="y2",
+                                 mode="lines+markers", line=dict(color="black")),
+    ])
+    fig_renewal.update_layout(barmode='relative', height=450, margin=dict(t=20, b=50),
+                              yaxis_title="Million USD/Year", legend=dict(orientation='h', y=-0.15),
+                              yaxis2=dict(title="Capable share (%)", overlaying='y', side='right', range=[0, 100]))
+    show_plotly_chart("renewal", fig_renewal, use_container_width=True)
+
+    changes = (plan.retrofits + plan.newbuilds).sum(axis=1) > 0
+    df_schedule = pd.DataFrame(plan.retrofits + plan.newbuilds, index=pd.Index(plan.years, name='Year'),
+                               columns=VESSEL_TYPES_OWNED)[changes]
+    df_schedule["Capable Vessels"] = [f"{c} / {n}" for c, n in zip(plan.converted.sum(axis=1)[changes],
+                                                                   plan.vessel_counts.sum(axis=1)[changes])]
+    df_schedule["Capable Share (%)"] = plan.capable_share[changes] * 100
+    df_schedule["Capex (Million USD)"] = plan.capex[changes] / MILLION
+    s_col1, s_col2 = st.columns(2)
+    with s_col1:
+        st.markdown(f"**Conversions ({pathway_name(plan.capability)})**")
+        if len(df_schedule):
+            st.dataframe(df_schedule.style.format({"Capable Share (%)": "{:,.1f}", "Capex (Million USD)": "{:,.1f}"}),
+                         height=350, use_container_width=True)
+        else:
+            st.info("No conversions pay off under these assumptions.")
+    with s_col2:
+        st.markdown("**Pathway Comparison (NPV, Million USD)**")
+        st.dataframe(pd.DataFrame([{
+            "Pathway": pathway_name(p.capability), "Total": p.npv / MILLION, "Fuel": p.npv_fuel_cost / MILLION,
+            "Compliance": p.npv_compliance_cost / MILLION, "Capex": p.npv_capex / MILLION,
+            "Vessels Converted": int((p.retrofits + p.newbuilds).sum()),
+        } for p in renewal.plans.values()]).set_index("Pathway").style.format("{:,.1f}", subset=["Total", "Fuel", "Compliance", "Capex"]),
+            use_container_width=True)
+    st.caption(f"Solved in {renewal.elapsed_s:.1f} s: "
+               f"{sum(p.states_evaluated for p in renewal.plans.values()):,} fleet states evaluated, "
+               f"{sum(p.states_pruned for p in renewal.plans.values()):,} pruned as dominated.")
+
+st.divider()
+section_timer.lap("Renewal")
+
+# --- Sensitivity Section ---
+@instrumentation.counted_cache(st.cache_data(max_entries=64))
+def compute_sensitivity(scope, year, counts, mix, factors=None):
+    """Jacobians for one input set, shared by every session with the same inputs."""
+    if scope == "year":
+        return fuel_sensitivity.year_sensitivity(year, counts, mix, factors)
+    mix_keys = fuel_engine.get_year_tables(year).mix_keys
+    return fuel_sensitivity.timeline_sensitivity(fuel_timeline.compute_timeline(
+        {year: dict(zip(VESSEL_KEYS, counts.tolist()))}, {year: dict(zip(mix_keys, mix.tolist()))}))
+
+
+def current_sensitivity(scope):
+    """Jacobians for the current inputs."""
+    year = st.session_state.selected_year
+    counts, mix = fuel_session.read_inputs(st.session_state, year)
+    registry = active_registry() if scope == "year" else None
+    factors = None
+    if registry is not None:
+        counts, factors = registry.engine_inputs(year)
+    return compute_sensitivity(scope, year, counts, mix, factors)
+
+
+@st.fragment
+def sensitivity_section():
+    st.header("🎯 Sensitivity Analysis")
+    st.markdown("_Exact swings from closed-form derivatives of the current inputs; mix-share changes are "
+                "rebalanced across the other fuels so the mix stays at 100%, and stop at 0% and 100%._")
+    year = st.session_state.selected_year
+    s_col1, s_col2, s_col3 = st.columns(3)
+    with s_col1:
+        scope = st.radio("Scope:", options=["year", "timeline"], key='sensitivity_scope', horizontal=True,
+                         format_func=lambda s: f"{year}" if s == "year" else
+                         f"All years ({fuel_timeline.TIMELINE_YEARS[0]}–{fuel_timeline.TIMELINE_YEARS[-1]} total)")
+    with s_col2:
+        swing_pct = st.slider("Input swing (±%)", 1, 50, 10, key='sensitivity_swing_pct')
+    if not fuel_engine.mix_sums_ok(fuel_session.read_inputs(st.session_state, year)[1]):
+        st.info("Sensitivities are computed once the fuel mix sums to 100%.")
+        return
+    try:
+        sens = current_sensitivity(scope)
+    except KeyError as e:
+        st.error(str(e))
+        return
+    with s_col3:
+        output = st.selectbox("Output:", options=sens.outputs, key='sensitivity_output')
+    rows = fuel_sensitivity.tornado(sens, output, swing_pct, aggregate=scope == "timeline", top=15)
+    if not rows:
+        st.info(f"No input moves {output} for these inputs.")
+        return
+    scale, unit = (MILLION, "Million USD") if output == fuel_sensitivity.COST_OUTPUT else (1.0, "GJ")
+    o = sens.outputs.index(output)
+    base_value = (sens.base[:, o].sum() if scope == "timeline" else sens.base[0, o]) / scale
+    labels = [label for label, *_ in rows][::-1]
+    low = np.array([r[1] for r in rows][::-1]) / scale - base_value
+    high = np.array([r[2] for r in rows][::-1]) / scale - base_value
+
+    go = instrumentation.lazy_import("plotly.graph_objects")
+    fig_tornado = go.Figure([
+        go.Bar(y=labels, x=low, base=base_value, orientation='h', name=f"Input −{swing_pct}%", marker_color='#1f77b4'),
+        go.Bar(y=labels, x=high, base=base_value, orientation='h', name=f"Input +{swing_pct}%", marker_color='#ff7f0e'),
+    ])
+    fig_tornado.add_vline(x=base_value, line_dash='dash', line_color='grey')
+    fig_tornado.update_layout(barmode='overlay', height=max(300, 28 * len(labels) + 120), margin=dict(t=20, b=40),
+                              xaxis_title=f"{output} ({unit})", legend=dict(orientation='h', y=-0.15))
+    show_plotly_chart("tornado", fig_tornado, use_container_width=True)
+    with st.expander("Derivatives"):
+        st.dataframe(pd.DataFrame(
+            [(label, derivative / scale, at_high / scale - base_value) for label, at_low, at_high, derivative in rows],
+            columns=["Input", f"d Output / d Input ({unit} per unit)", f"Change at +{swing_pct}% ({unit})"],
+        ), hide_index=True, use_container_width=True)
+        st.caption("Units per input: vessels, USD/GJ, or percentage points of mix share.")
+
+
+sensitivity_section()
+st.divider()
+section_timer.lap("Sensitivity")
+
+# --- Cost vs GFI Frontier Section ---
+FRONTIER_SAMPLE_OPTIONS = (100_000, 200_000, 1_000_000, 2_000_000)
+FRONTIER_ZONE_COLORS = {1: 'rgba(255,0,0,0.15)', 2: 'rgba(255,165,0,0.2)', 3: 'rgba(144,238,144,0.3)', 4: 'rgba(0,100,0,0.25)'}
+
+
+@instrumentation.counted_cache(st.cache_data(max_entries=8, show_spinner="Sampling fuel mixes..."))
+def compute_frontier(data_version, year, n_samples, caps, produced_share):
+    fuel_frontier = instrumentation.lazy_import("fuel_frontier")  # Brings in scipy (fuel_optimizer)
+    return fuel_frontier.pareto_frontier(year, n_samples=n_samples, availability_caps=dict(caps),
+                                         produced_share=produced_share)
+
+
+@st.fragment
+def frontier_section(limits):
+    year = st.session_state.selected_year
+    st.header(f"🧭 Cost vs GFI Frontier ({year})")
+    st.markdown("_Least fuel cost attainable at each fleet GFI, within the optimizer's share limits. "
+                "Click a frontier point to load its mix into the inputs._")
+    n_samples = st.select_slider("Sampled mixes:", options=FRONTIER_SAMPLE_OPTIONS, value=FRONTIER_SAMPLE_OPTIONS[1],
+                                 key='frontier_samples', format_func=lambda n: f"{n:,}")
+    try:
+        frontier = compute_frontier(config_version(), year, n_samples, tuple(sorted(limits[0].items())), limits[1])
+    except KeyError as e:
+        st.error(str(e))
+        return
+    if not len(frontier.gfi):
+        st.warning("No fuel mix satisfies the optimizer's share limits.")
+        return
+
+    owned_counts, fuel_mix = current_scenario_inputs(year)
+    registry = active_registry()
+    tables = fuel_engine.get_year_tables(year)
+    counts, factors = (registry.engine_inputs(year) if registry is not None
+                       else (fuel_engine.counts_vector(owned_counts), tables.consumption_factors))
+    fleet_gj = float(counts @ factors)
+    scale, unit = (fleet_gj / MILLION, "Million USD/Year") if fleet_gj > 0 else (1.0, "USD/GJ")
+
+    go = instrumentation.lazy_import("plotly.graph_objects")
+    limits_gfi = fuel_compliance.gfi_limits(year)
+    base, dc, credit = (limits_gfi[GFI_LINES[line]] for line in ("Base", "DC", "Credit"))
+    x_max = max(float(frontier.gfi.max()), base) + 2.0
+    fig = go.Figure()
+    for zone, (x0, x1) in {1: (base, x_max), 2: (dc, base), 3: (credit, dc), 4: (0.0, credit)}.items():
+        fig.add_vrect(x0=x0, x1=x1, fillcolor=FRONTIER_ZONE_COLORS[zone], line_width=0, layer='below',
+                      annotation_text=fuel_compliance.ZONE_LABELS[zone].split(':')[0], annotation_position='top left')
+    fig.add_trace(go.Scattergl(x=frontier.cloud_gfi, y=frontier.cloud_cost_per_gj * scale, mode='markers',
+                               marker=dict(size=3, color='lightgrey'), name='Sampled mixes', hoverinfo='skip'))
+    fig.add_trace(go.Scatter(x=frontier.gfi, y=frontier.cost_per_gj * scale, mode='lines+markers',
+                             marker=dict(size=7, color='#1f77b4'), line=dict(color='#1f77b4'), name='Frontier',
+                             hovertemplate='GFI %{x:.2f} gCO2eq/MJ<br>%{y:,.2f} ' + unit + '<extra></extra>'))
+    mix_vector = fuel_engine.mix_vector(year, fuel_mix)
+    if fuel_engine.mix_sums_ok(mix_vector):
+        fig.add_trace(go.Scatter(x=[float(mix_vector @ tables.emission_factors / 100.0)],
+                                 y=[float(mix_vector @ tables.fuel_costs_gj / 100.0) * scale], mode='markers',
+                                 marker=dict(symbol='star', size=16, color='blue', line=dict(color='black', width=1)),
+                                 name='Current mix'))
+    fig.update_layout(height=500, margin=dict(t=30, b=50), xaxis_title="Fleet GFI (gCO2eq/MJ)",
+                      yaxis_title=f"Fuel Expenditure ({unit})", xaxis_range=[0, x_max],
+                      legend=dict(orientation='h', y=-0.2))
+    event = show_plotly_chart("frontier", fig, use_container_width=True, on_select="rerun", selection_mode="points",
+                              key=f"frontier_chart_{year}")
+    st.caption(f"{frontier.n_candidates:,} candidate mixes; {len(frontier.gfi)} frontier points "
+               f"({int(frontier.from_lp.sum())} exact).")
+
+    points = [p for p in event.selection.points if p.get("curve_number") == 1] if event else []
+    if points:
+        index = points[0]["point_index"]
+        selection = (year, n_samples, index)
+        if st.session_state.get("frontier_loaded") != selection:
+            st.session_state.frontier_loaded = selection
+            st.session_state.optimized_mix_request = dict(zip(frontier.mix_keys, frontier.mixes[index].round(4).tolist()))
+            st.rerun()
+
+
+frontier_section(mix_limits)
+st.divider()
+section_timer.lap("Frontier")
+
+# --- Background Sweeps Section ---
+SWEEP_SCENARIO_OPTIONS = (10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+SWEEP_SAVE_LIMIT = 10_000  # Scenarios of a sweep kept in the scenario store, cheapest first
+SWEEP_DOWNLOAD_LIMIT = 1_000_000  # Rows in a sweep download; larger sweeps download their cheapest rows
+JOB_POLL_SECONDS = 1.0
+
+
+@instrumentation.counted_cache(st.cache_resource)
+def get_job_runner():
+    workers = os.environ.get("FUEL_JOB_WORKERS")
+    return fuel_jobs.JobRunner(os.environ.get("FUEL_JOBS_DIR"), max_workers=int(workers) if workers else None)
+
+
+def open_job(job_id):
+    st.session_state.job_ids = [job_id] + [j for j in st.session_state.job_ids if j != job_id]
+
+
+def sweep_download(runner, job_id, rows):
+    """Gzipped CSV of a sweep's scored rows, built one work unit at a time."""
+    frames = runner.iter_results(job_id)
+    if rows > SWEEP_DOWNLOAD_LIMIT:
+        frames = [fuel_jobs.nsmallest(frames, SWEEP_DOWNLOAD_LIMIT)]
+    buffer = BytesIO()
+    with gzip.open(buffer, "wt", newline="") as f:
+        fuel_jobs.write_csv(frames, f)
+    return buffer.getvalue()
+
+
+def session_job_statuses(runner):
+    statuses = []
+    for job_id in st.session_state.job_ids:
+        try:
+            statuses.append(runner.status(job_id))
+        except KeyError:
+            pass
+    return statuses
+
+
+st.header("🧵 Background Scenario Sweeps")
+st.markdown("_Large sweeps run on a shared background worker pool, so the page stays responsive while they score. "
+            "Progress and partial results update live; any session can reopen a job by its id._")
+job_runner = get_job_runner()
+sweep_kind = st.radio("Sweep type:", ["Fuel price sweep", "Scenario file"], horizontal=True, key='sweep_kind')
+if sweep_kind == "Fuel price sweep":
+    sw_col1, sw_col2, sw_col3 = st.columns(3)
+    with sw_col1:
+        sweep_scenarios = st.select_slider("Scenarios:", options=SWEEP_SCENARIO_OPTIONS, value=SWEEP_SCENARIO_OPTIONS[2],
+                                           key='sweep_scenarios', format_func=lambda n: f"{n:,}")
+    with sw_col2:
+        sweep_range_pct = st.slider("Price range (± % of reference):", min_value=1, max_value=90, value=30,
+                                    key='sweep_range_pct')
+    with sw_col3:
+        sweep_seed = st.number_input("Random seed", min_value=0, value=0, step=1, key='sweep_seed')
+    st.caption(f"Every fuel price is drawn independently for the current {st.session_state.selected_year} fleet and mix.")
+    if st.button("Start Price Sweep"):
+        owned_counts, fuel_mix = current_scenario_inputs(st.session_state.selected_year)
+        try:
+            open_job(job_runner.submit_price_sweep(st.session_state.selected_year, owned_counts, fuel_mix,
+                                                   sweep_scenarios, sweep_range_pct, seed=int(sweep_seed)))
+        except ValueError as e:
+            st.error(str(e))
+else:
+    sweep_file = st.file_uploader("Scenario file (fuel_batch format: year, vessel counts, mix %, optional cost_<fuel>)",
+                                  type=["csv", "parquet"], key='sweep_file')
+    if st.button("Start Scoring", disabled=sweep_file is None):
+        try:
+            open_job(job_runner.submit_scenario_file(sweep_file.getvalue(), sweep_file.name))
+        except (ValueError, pd.errors.ParserError) as e:
+            st.error(f"Could not read {sweep_file.name}: {e}")
+
+job_col1, job_col2 = st.columns([3, 1])
+with job_col1:
+    job_id_to_open = st.text_input("Open a job by id:", key='job_id_to_open', placeholder="e.g. 3f2a9c1b7d4e")
+with job_col2:
+    st.write("")
+    if st.button("Open Job", disabled=not job_id_to_open.strip()):
+        try:
+            job_runner.status(job_id_to_open.strip())
+            open_job(job_id_to_open.strip())
+        except KeyError as e:
+            st.error(e.args[0])
+
+jobs_active = any(s.state == "running" for s in session_job_statuses(job_runner))
+
+
+@st.fragment(run_every=JOB_POLL_SECONDS if jobs_active else None)
+def jobs_section():
+    runner = get_job_runner()
+    statuses = session_job_statuses(runner)
+    if not statuses:
+        st.info("No background sweeps in this session yet.")
+    for status in statuses:
+        with st.container(border=True):
+            st.markdown(f"**{status.label}** · `{status.job_id}` · {status.state}")
+            st.progress(status.progress, text=f"{status.units_done}/{status.n_units} units · {status.rows:,} scenarios scored"
+                                              + (f" ({status.invalid:,} invalid)" if status.invalid else ""))
+            if status.error:
+                st.error(status.error)
+            if status.rows > status.invalid:
+                j_col1, j_col2, j_col3 = st.columns(3)
+                with j_col1:
+                    st.metric("Mean Cost incl. Compliance", f"{format_value(status.cost_mean_musd, 3)} Million USD")
+                with j_col2:
+                    st.metric("Minimum", f"{format_value(status.cost_min_musd, 3)} Million USD")
+                with j_col3:
+                    st.metric("Maximum", f"{format_value(status.cost_max_musd, 3)} Million USD")
+                st.caption(" · ".join(f"{fuel_compliance.ZONE_LABELS[zone]}: {count:,}"
+                                      for zone, count in status.zone_counts.items()))
+            b_col1, b_col2, b_col3 = st.columns(3)
+            with b_col1:
+                if status.state == "running":
+                    if st.button("Cancel", key=f"cancel_job_{status.job_id}"):
+                        runner.cancel(status.job_id)
+                        st.rerun()
+                elif status.state in ("cancelled", "interrupted", "failed"):
+                    if st.button("Resume", key=f"resume_job_{status.job_id}"):
+                        runner.resume(status.job_id)
+                        st.rerun()  # Full rerun, to start polling
+            with b_col2:
+                if status.rows:
+                    st.download_button("Download Results (CSV)" if status.rows <= SWEEP_DOWNLOAD_LIMIT
+                                       else f"Download Cheapest {SWEEP_DOWNLOAD_LIMIT:,} (CSV)",
+                                       key=f"download_job_{status.job_id}",
+                                       data=lambda job_id=status.job_id, rows=status.rows: sweep_download(runner, job_id, rows),
+                                       file_name=f"sweep_{status.job_id}.csv.gz", mime="application/gzip",
+                                       on_click="ignore")
+            with b_col3:
+                saved = get_scenario_store().count(job_id=status.job_id)
+                if saved:
+                    st.caption(f"{saved:,} scenarios saved to the scenario store.")
+                elif status.state == "completed" and status.rows > status.invalid:
+                    if st.button(f"Save {min(status.rows - status.invalid, SWEEP_SAVE_LIMIT):,} Cheapest to Store",
+                                 key=f"save_job_{status.job_id}"):
+                        sweep_rows = fuel_jobs.nsmallest(runner.iter_scenarios(status.job_id), SWEEP_SAVE_LIMIT)
+                        get_scenario_store().save_frame(sweep_rows, status.kind, status.label, tags=["sweep"],
+                                                        job_id=status.job_id)
+                        st.rerun(scope="fragment")
+    if jobs_active and not any(s.state == "running" for s in statuses):
+        st.rerun()  # Last job finished: full rerun to stop polling
+
+
+jobs_section()
+st.divider()
+section_timer.lap("Sweeps")
+
+# --- Saved Scenarios Section ---
+MAX_COMPARED_SCENARIOS = 500
+
+
+@st.fragment
+def saved_scenarios_section():
+    st.header("🗂️ Saved Scenarios")
+    store = get_scenario_store()
+    start = time.perf_counter()
+    f_col1, f_col2, f_col3, f_col4 = st.columns(4)
+    with f_col1:
+        filter_years = st.multiselect("Years:", YEAR_OPTIONS, key='saved_filter_years')
+    with f_col2:
+        tag_counts = store.tags()
+        filter_tags = st.multiselect("Tags (all of):", list(tag_counts), key='saved_filter_tags',
+                                     format_func=lambda tag: f"{tag} ({tag_counts.get(tag, 0):,})")
+    with f_col3:
+        fleet_counts = store.fleets(filter_years[0] if len(filter_years) == 1 else None)
+        filter_fleet = st.selectbox("Fleet composition:", [None, *list(fleet_counts)[:200]], key='saved_filter_fleet',
+                                    format_func=lambda key: "Any" if key is None else
+                                    f"{scenario_store.describe_fleet(key)} ({fleet_counts.get(key, 0):,})")
+    with f_col4:
+        filter_name = st.text_input("Name contains:", key='saved_filter_name')
+    listed = store.list_scenarios(years=filter_years, fleet_key=filter_fleet, tags=filter_tags, name_like=filter_name)
+    if listed.empty:
+        st.info("No saved scenarios match. Save one from the calculation outputs or a finished sweep.")
+        return
+
+    table = pd.DataFrame({
+        "ID": listed["id"], "Name": listed["name"], "Source": listed["source"], "Saved": listed["created"],
+        "Year": listed["year"], "Fleet": listed["fleet_key"].map(scenario_store.describe_fleet), "Tags": listed["tags"],
+        "Total incl. Compliance (Million USD)": listed["total_cost_incl_compliance_musd"],
+        "Fleet GFI": listed["fleet_gfi"],
+    })
+    selection = st.dataframe(table, key='saved_scenarios_table', on_select="rerun", selection_mode="multi-row",
+                             hide_index=True, height=300, use_container_width=True,
+                             column_config={"Saved": st.column_config.DatetimeColumn(format="YYYY-MM-DD HH:mm"),
+                                            "Total incl. Compliance (Million USD)": st.column_config.NumberColumn(format="%.2f"),
+                                            "Fleet GFI": st.column_config.NumberColumn(format="%.2f")})
+    selected_ids = listed["id"].iloc[selection.selection.rows].tolist()[:MAX_COMPARED_SCENARIOS]
+    st.caption(f"{len(listed):,} of {store.count():,} saved scenarios shown"
+               + (f"; select up to {MAX_COMPARED_SCENARIOS} rows to compare them." if not selected_ids else "."))
+
+    a_col1, a_col2, a_col3 = st.columns(3)
+    with a_col1:
+        if st.button("Load into Inputs", disabled=len(selected_ids) != 1, help="Select exactly one scenario."):
+            st.session_state.scenario_load_request = store.load_inputs(selected_ids[0])
+            st.rerun()
+    with a_col2:
+        show_differences = st.toggle("Differences vs first selected", key='saved_show_differences',
+                                     disabled=len(selected_ids) < 2)
+    with a_col3:
+        if st.button(f"Delete {len(selected_ids)} Selected", disabled=not selected_ids):
+            store.delete(selected_ids)
+            st.rerun(scope="fragment")
+
+    if selected_ids:
+        comparison = store.compare(selected_ids).apply(pd.to_numeric)
+        if show_differences and len(selected_ids) > 1:
+            comparison = comparison.sub(comparison.iloc[:, 0], axis=0)
+        st.dataframe(comparison.style.format("{:,.2f}", na_rep="–"), use_container_width=True,
+                     height=min(35 * (len(comparison) + 1), 700))
+    st.caption(f"Queried in {(time.perf_counter() - start) * 1000.0:.0f} ms.")
+
+
+saved_scenarios_section()
+st.divider()
+section_timer.lap("Scenarios")
 
 # --- Static Charts Section ---
 st.header("🌍 Regulatory & Market Outlook & Projections")
+# Each chart is its own fragment; matplotlib is only imported once a chart actually renders.
+show_outlook = st.toggle("Show outlook charts", value=True, key='show_outlook_charts')
 
 # --- GFI Compliance Zones Chart ---
-st.subheader("GFI Compliance Zones")
-
-@st.cache_data
-def create_gfi_compliance_chart(calculated_gfi=None, calculation_year=None):
-    gfi_data_string = """
-Year	GFI Base	GFI DC	GFI_Credit
-2028	89.568	77.439	19
-2029	87.702	75.573	19
-2030	85.836	73.707	19
-2031	81.7308	69.6018	19
-2032	77.6256	65.4966	19
-2033	73.5204	61.3914	19
-2034	69.4152	57.2862	19
-2035	65.31	53.181	19
-2036	58.779	46.65	19
-2037	52.248	40.119	19
-2038	45.717	32.655	19
-2039	39.186	27.057	19
-2040	32.655	20.526	14
-2041	31.0689	18.9399	14
-2042	29.4828	17.3538	14
-2043	27.8967	15.7677	14
-2044	26.3106	14.1816	3
-2045	24.7245	12.5955	3
-2046	23.1384	11.0094	3
-2047	21.5523	9.4233	3
-2048	19.9662	7.8372	3
-2049	18.3801	6.2511	3
-2050	16.794	4.665	3
-"""
-    df_gfi = pd.read_csv(StringIO(gfi_data_string), sep='\t')
-    
-    max_gfi_plot = 95
-    min_gfi_plot = 0
-
-    fig, ax = plt.subplots(figsize=(12, 7))
-
-    ax.fill_between(df_gfi['Year'], df_gfi['GFI Base'], max_gfi_plot,
-                    color='red', alpha=0.3, label='Zone 1: Above GFI Base')
-    ax.fill_between(df_gfi['Year'], df_gfi['GFI DC'], df_gfi['GFI Base'],
-                    color='orange', alpha=0.4, label='Zone 2: Penalty Zone')
-    ax.fill_between(df_gfi['Year'], df_gfi['GFI_Credit'], df_gfi['GFI DC'],
-                    color='lightgreen', alpha=0.5, label='Zone 3: Compliant')
-    ax.fill_between(df_gfi['Year'], min_gfi_plot, df_gfi['GFI_Credit'],
-                    color='darkgreen', alpha=0.6, label='Zone 4: Credit Earning')
-
-    ax.plot(df_gfi['Year'], df_gfi['GFI Base'], color='maroon', linestyle='--', linewidth=1.5, label='GFI Base Line')
-    ax.plot(df_gfi['Year'], df_gfi['GFI DC'], color='darkorange', linestyle='--', linewidth=1.5, label='GFI DC Line')
-    ax.plot(df_gfi['Year'], df_gfi['GFI_Credit'], color='green', linestyle='-', linewidth=2, label='GFI Credit Threshold')
-
-    if calculated_gfi is not None and calculation_year is not None:
-        if calculation_year >= 2028 and calculation_year <= 2050: 
-            ax.plot(calculation_year, calculated_gfi, 
-                    marker='*', markersize=15, color='blue', markeredgecolor='black',
-                    label=f'Fleet Optimal GFI ({calculation_year}): {calculated_gfi:.1f}', zorder=10)
-            ax.text(calculation_year + 0.5, calculated_gfi, f'{calculated_gfi:.1f}',
-                    color='blue', fontsize=9, va='center', ha='left', fontweight='bold',
-                    bbox=dict(boxstyle='round,pad=0.2', fc='white', alpha=0.7, ec='none'), zorder=11)
-
-    ax.set_xlabel("Year", fontsize=11)
-    ax.set_ylabel("GFI Value", fontsize=11)
-    ax.set_ylim(min_gfi_plot, max_gfi_plot)
-    ax.set_xticks(df_gfi['Year'])
-    ax.tick_params(axis='x', rotation=45, labelsize=8)
-    ax.yaxis.set_major_formatter(mticker.FormatStrFormatter('%.0f'))
-    ax.tick_params(axis='y', labelsize=9)
-    ax.legend(loc='upper right', fontsize='x-small')
-    ax.grid(True, linestyle=':', alpha=0.6)
-    plt.tight_layout()
-    return fig
-
-fleet_gfi_to_plot = st.session_state.get('calculated_fleet_gfi', None)
-gfi_year_to_plot = st.session_state.get('gfi_calculation_year', None)
-st.pyplot(create_gfi_compliance_chart(calculated_gfi=fleet_gfi_to_plot, calculation_year=gfi_year_to_plot))
-
-st.divider()
+# Charts are rendered once to PNG bytes and cached by data version; only the bytes are served.
+@instrumentation.counted_cache(st.cache_data(max_entries=4))
+def render_gfi_chart_base(data_version):
+    return instrumentation.lazy_import("fuel_charts").render_gfi_base()
+
+@instrumentation.counted_cache(st.cache_data(max_entries=64))
+def create_gfi_compliance_chart(data_version, calculated_gfi=None, calculation_year=None):
+    base_png, pixel_map = render_gfi_chart_base(data_version)
+    if calculated_gfi is None or calculation_year is None:
+        return base_png
+    fuel_charts = instrumentation.lazy_import("fuel_charts")
+    return fuel_charts.overlay_gfi_marker(base_png, pixel_map, calculation_year, calculated_gfi)
+
+@st.fragment
+def gfi_compliance_section():
+    st.subheader("GFI Compliance Zones")
+    gfi_results = st.session_state.results
+    fleet_gfi_to_plot = gfi_results.fleet_gfi if gfi_results is not None else None
+    gfi_year_to_plot = gfi_results.year if gfi_results is not None else None
+    show_image("gfi_compliance", create_gfi_compliance_chart(config_version(), calculated_gfi=fleet_gfi_to_plot, calculation_year=gfi_year_to_plot),
+               use_container_width=True)
+    if fleet_gfi_to_plot is not None and gfi_year_to_plot is not None:
+        zone = fuel_compliance.assess_compliance(fleet_gfi_to_plot, 0.0, gfi_year_to_plot).zone[0]
+        st.caption(f"★ Fleet GFI ({gfi_year_to_plot}): {fleet_gfi_to_plot:.1f} gCO2eq/MJ — {fuel_compliance.ZONE_LABELS[zone]}")
 
 # --- Fuel Price Projections Chart ---
-st.subheader("Fuel Price Projections")
-@st.cache_data
-def create_fuel_price_chart():
-    price_data_string = """
-Fuel_Name	2025	2030	2035	2040	2045	2050
-e-Ammonia	61.24785352	47.46029478	44.50672156	39.89256831	34.24853689	28.79520256
-Biomethane	26.09708531	24.66623704	23.25329011	21.82979358	20.40872087	18.98996952
-e-Methane 	72.65646649	64.82100948	59.77084571	53.26427583	45.65829988	38.44055425
-Biomethanol	39.28383688	33.44040827	30.98830586	28.54051064	27.1786527	25.75435972
-e-Methanol 	87.29803612	75.11334677	68.42818853	60.45467972	51.23354354	42.44528817
-Biodiesel (B100)	NaN	25.4349855	25.17495816	24.86919054	24.58323743	24.1643283
-e-Diesel 	99.27436485	85.01988267	78.03429746	69.55377919	57.97261473	47.23591239
-Biodiesel (B50)	28.6564134	16.93428919	14.90773905	13.10412863	11.31781226	9.516140579
-Biodiesel (B30)	18.9070653	14.7569101	12.58258398	10.4782824	8.392108316	6.287927955
-Blue hydrogen	46.67661337	45.32488929	45.34955508	44.48399521	43.69016386	42.95888073
-VLSFO	14.1	11.51	10.985	10.46	9.59	8.72
-"""
-    df_prices = pd.read_csv(StringIO(price_data_string), sep='\t', na_values=['NaN'])
-    df_prices = df_prices.set_index('Fuel_Name')
-    df_prices_transposed = df_prices.T
-    df_prices_transposed.index = df_prices_transposed.index.astype(int)
-
-    fig, ax = plt.subplots(figsize=(15, 8))
-    for fuel_name in df_prices_transposed.columns:
-        ax.plot(df_prices_transposed.index, df_prices_transposed[fuel_name],
-                label=fuel_name, marker='o', linestyle='-', markersize=4)
-
-    ax.set_xlabel("Year", fontsize=11)
-    ax.set_ylabel("Price (USD/GJ)", fontsize=11)
-    ax.set_xticks(df_prices_transposed.index)
-    ax.tick_params(axis='x', rotation=0, labelsize=9)
-    ax.yaxis.set_major_formatter(mticker.FormatStrFormatter('%.1f'))
-    ax.tick_params(axis='y', labelsize=9)
-    ax.legend(title="Fuel Types", loc='center left', bbox_to_anchor=(1.01, 0.5),
-              fontsize='small', title_fontsize='medium')
-    ax.grid(True, linestyle=':', alpha=0.6)
-    plt.tight_layout(rect=[0, 0, 0.83, 1])
-    return fig
-
-st.pyplot(create_fuel_price_chart())
-st.divider()
+@instrumentation.counted_cache(st.cache_data(max_entries=4))
+def create_fuel_price_chart(data_version):
+    fuel_charts = instrumentation.lazy_import("fuel_charts")
+    return fuel_charts.figure_to_bytes(fuel_charts.fuel_price_figure())
+
+@st.fragment
+def fuel_price_section():
+    st.subheader("Fuel Price Projections")
+    show_image("fuel_price", create_fuel_price_chart(config_version()), use_container_width=True)
 
 # --- Petrobras Major Export Products Projection Chart ---
-st.subheader("Petrobras Major Export Products Projection")
-@st.cache_data
-def parse_export_data(data_string):
-    lines = data_string.strip().split('\n')
-    data_dict = {}
-    current_category = None
-    header = []
-
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-        
-        first_token = line.split('\t')[0].strip()
-        
-        if first_token == "Crude Oil" or first_token == "Oil Production":
-             current_category = first_token
-             continue 
+@instrumentation.counted_cache(st.cache_data(max_entries=4))
+def create_export_projection_chart(data_version):
+    fuel_charts = instrumentation.lazy_import("fuel_charts")
+    df_exports = REFERENCE_STORE.table("export_projections").to_frame(index="Year")
+    return fuel_charts.figure_to_bytes(fuel_charts.export_projection_figure(df_exports))
+
+@st.fragment
+def export_projection_section():
+    st.subheader("Petrobras Major Export Products Projection")
+    show_image("export_projection", create_export_projection_chart(config_version()), use_container_width=True)
+
+if show_outlook:
+    gfi_compliance_section()
+    st.divider()
+    fuel_price_section()
+    st.divider()
+    export_projection_section()
+else:
+    st.info("Outlook charts are hidden. Toggle them on to render.")
+section_timer.lap("Outlook Charts")
 
-        if re.match(r'^\d{4}', first_token): 
-            header = [int(x) for x in line.split('\t')]
-            continue
-        
-        if current_category and header:
-            parts = line.split('\t')
-            sub_category = parts[0].strip() 
-            
-            if not sub_category: 
-                continue
+# --- Report Export Section ---
+REPORT_POLL_SECONDS = 0.5
+REPORT_SCENARIO_CHOICES = 200  # Most recent saved scenarios offered for a report
 
-            full_key = f"{current_category} - {sub_category}"
-            
-            values_str = parts[1:]
-            try:
-                values = [float(x) for x in values_str[:len(header)]]
-                if len(values) == len(header):
-                    data_dict[full_key] = dict(zip(header, values))
-            except ValueError:
-                pass 
-
-    df = pd.DataFrame.from_dict(data_dict, orient='index')
-    if df.empty:
-        return df 
-    return df.T
-
-@st.cache_data
-def create_export_projection_chart():
-    export_data_string = """
-	2025	2026	2027	2028	2029	2030	2031	2032	2033	2034	2035	2036	2037	2038	2039	2040	2041	2042	2043	2044	2045	2046	2047	2048	2049	2050
-Crude Oil	
-China	302.8911629	299.9015242	296.3035403	294.3102495	291.4302563	289.3692783	285.0007371	279.866639	274.6025704	269.2215079	264.2269436	257.3390506	249.9610299	242.5843525	234.2980337	225.5134432	220.4381078	215.7067959	211.0482387	206.2797271	201.9024627	197.4833218	193.213456	188.6563321	184.0054428	179.3571835
-Europe	232.7906071	228.5011808	224.3783649	218.7718734	214.3074763	209.1999343	201.8416603	195.081824	188.5206788	182.3143133	176.0957568	168.9434908	162.4736253	155.6013989	149.5868885	143.8173272	140.7386884	137.3870809	134.164648	131.2167078	128.2597908	125.424756	122.6789039	119.8946582	117.2000431	114.5204089
-USA 	48.09032613	47.59748877	46.92680692	46.37526612	45.77259329	45.17726274	44.09454012	43.15882524	42.10479055	41.02969272	39.97394621	38.6590697	37.19610461	35.92712755	34.66058342	33.49554286	32.96234597	32.34136165	31.70706964	31.05859781	30.43444222	29.89692952	29.4655663	29.07789836	28.72673933	28.37935688
-SE Asia	90.10555164	91.00629743	92.52662249	93.80678911	94.88269568	95.77538969	95.85122452	95.94717078	96.09271636	96.02153922	95.55670356	93.45017602	91.29946432	89.35578213	87.46159257	85.71922184	85.26586357	84.82923793	84.20399074	83.42838502	82.24619255	81.84292359	81.09504736	80.62912761	80.13083362	79.61115212
-	2025	2026	2027	2028	2029	2030	2031	2032	2033	2034	2035	2036	2037	2038	2039	2040	2041	2042	2043	2044	2045	2046	2047	2048	2049	2050
-Oil Production	
-Singapore (Oil Products)	110.4938074	112.771658	115.6106916	118.2102429	120.7781692	123.262747	124.9831055	126.5702625	128.3594557	130.0924646	131.6231022	131.4157635	131.4129089	131.2909177	131.2228979	131.1237478	130.7104447	130.4419177	130.0895922	129.6785904	129.0022658	128.5436541	127.7219922	126.99379	126.1892856	125.3665779
-USA (Oil Products)	92.96593208	92.98058556	92.43405609	92.12700882	91.85158665	91.65951293	90.6396418	89.75297222	88.66426634	87.63174488	86.80159461	85.70347955	84.4008804	83.2174179	81.97998395	80.77368038	79.65864736	78.39883828	77.22282777	76.10549345	75.25348202	74.02455598	73.15868009	72.19934452	71.31631119	70.45148122
-"""
-    df_exports = parse_export_data(export_data_string)
-
-    if df_exports.empty:
-        fig, ax = plt.subplots(figsize=(15,8)) 
-        ax.text(0.5, 0.5, "Data parsing for Petrobras Exports failed.\nPlease check data format.", ha='center', va='center', fontsize=12, color='red')
-        return fig
-
-    fig, ax = plt.subplots(figsize=(15, 8))
-    highlight_years = [2030, 2040, 2050]
-
-    for product_region in df_exports.columns:
-        line, = ax.plot(df_exports.index, df_exports[product_region],
-                        label=product_region, marker='.', linestyle='-', markersize=5)
-        
-        for year in highlight_years:
-            if year in df_exports.index:
-                value = df_exports.loc[year, product_region]
-                ax.plot(year, value, marker='o', markersize=8, color=line.get_color(), markeredgecolor='black', zorder=5)
-                ax.text(year, value + (ax.get_ylim()[1] - ax.get_ylim()[0]) * 0.015, 
-                        f'{value:.1f}', ha='center', va='bottom', fontsize=7, color=line.get_color(),
-                        bbox=dict(boxstyle='round,pad=0.15', fc='white', alpha=0.6, ec='none'), zorder=6)
-
-    ax.set_xlabel("Year", fontsize=11)
-    ax.set_ylabel("Volume (Million Barrels per Year)", fontsize=11)
-    ax.set_xticks(df_exports.index[::2]) 
-    ax.tick_params(axis='x', rotation=45, labelsize=9)
-    ax.yaxis.set_major_formatter(mticker.FormatStrFormatter('%.0f'))
-    ax.tick_params(axis='y', labelsize=9)
-    
-    ax.legend(title="Product - Destination", loc='center left', bbox_to_anchor=(1.01, 0.5),
-              fontsize='small', title_fontsize='medium')
-    ax.grid(True, linestyle=':', alpha=0.6)
-    plt.tight_layout(rect=[0, 0, 0.80, 1]) 
-    return fig
 
-st.pyplot(create_export_projection_chart())
+@instrumentation.counted_cache(st.cache_resource)
+def get_report_runner():
+    workers = os.environ.get("FUEL_REPORT_WORKERS")
+    return fuel_report.ReportRunner(os.environ.get("FUEL_REPORTS_DIR"), max_workers=int(workers) if workers else None)
+
+
+def session_report_statuses(runner):
+    statuses = []
+    for report_id in st.session_state.report_ids:
+        try:
+            statuses.append(runner.status(report_id))
+        except KeyError:
+            pass
+    return statuses
+
+
+st.divider()
+st.header("📄 Report Export")
+st.markdown("_Excel and PDF reports of the breakdown tables, yearly cost and demand, GFI compliance and projections "
+            "are built in the background; charts render on a worker pool and already rendered charts are reused. "
+            "Keep working while a report builds._")
+report_runner = get_report_runner()
+report_formats_available = [f for f in fuel_report.REPORT_FORMATS if f != "xlsx" or fuel_report.EXCEL_ENGINE]
+saved_choices = get_scenario_store().list_scenarios(limit=REPORT_SCENARIO_CHOICES)
+saved_choice_names = {scenario_id: f"{name} ({year})" for scenario_id, name, year
+                      in zip(saved_choices["id"].tolist(), saved_choices["name"].tolist(), saved_choices["year"].tolist())}
+rp_col1, rp_col2 = st.columns(2)
+with rp_col1:
+    report_years = st.radio("Years:", fuel_report.YEAR_SCOPES, horizontal=True, key='report_years',
+                            format_func=lambda scope: f"Snapshot years ({', '.join(map(str, YEAR_OPTIONS))})"
+                            if scope == "snapshots" else
+                            f"Every year {fuel_timeline.TIMELINE_YEARS[0]}–{fuel_timeline.TIMELINE_YEARS[-1]}")
+    report_formats = st.multiselect("Formats:", report_formats_available, default=report_formats_available,
+                                    key='report_formats', format_func=str.upper)
+    if fuel_report.EXCEL_ENGINE is None:
+        st.caption("Install xlsxwriter or openpyxl to also export an Excel workbook.")
+with rp_col2:
+    report_base = st.multiselect("Scenarios:", ["current", "reference"], default=["current"], key='report_base_scenarios',
+                                 format_func={"current": f"Current inputs ({st.session_state.selected_year})",
+                                              "reference": "Reference defaults"}.get)
+    report_saved_ids = st.multiselect("Saved scenarios:", list(saved_choice_names), key='report_saved_ids',
+                                      format_func=lambda scenario_id: saved_choice_names.get(scenario_id, f"#{scenario_id}"),
+                                      max_selections=fuel_report.MAX_SCENARIOS)
+st.caption("Each scenario's inputs replace the defaults for its snapshot year; the other years are interpolated as in the timeline.")
+
+if st.button("Build Report", disabled=not report_formats or not (report_base or report_saved_ids)):
+    report_scenarios = []
+    if "current" in report_base:
+        report_year = st.session_state.selected_year
+        report_counts, report_mix = current_scenario_inputs(report_year)
+        report_scenarios.append(fuel_report.ReportScenario(f"Current inputs ({report_year})",
+                                                           {report_year: report_counts}, {report_year: report_mix}))
+    if "reference" in report_base:
+        report_scenarios.append(fuel_report.ReportScenario("Reference defaults"))
+    report_results = st.session_state.results
+    try:
+        for scenario_id in report_saved_ids:
+            saved_year, saved_counts, saved_mix = get_scenario_store().load_inputs(scenario_id)
+            report_scenarios.append(fuel_report.ReportScenario(saved_choice_names[scenario_id],
+                                                               {saved_year: saved_counts}, {saved_year: saved_mix}))
+        # The outlook charts above already rendered this run; hand their cached bytes to the report
+        prerendered = {"fuel_prices": create_fuel_price_chart(config_version()),
+                       "export_projections": create_export_projection_chart(config_version())} if show_outlook else None
+        report_id = report_runner.submit(
+            report_scenarios, years=report_years, formats=report_formats,
+            discount_rate=st.session_state.timeline_discount_pct / 100.0,
+            calculated_gfi=report_results.fleet_gfi if report_results is not None else None,
+            calculation_year=report_results.year if report_results is not None else None,
+            prerendered=prerendered,
+        )
+        st.session_state.report_ids = [report_id] + st.session_state.report_ids
+    except (ValueError, KeyError) as e:
+        st.error(e.args[0])
+
+reports_active = any(s.state == "running" for s in session_report_statuses(report_runner))
+
+
+@st.fragment(run_every=REPORT_POLL_SECONDS if reports_active else None)
+def reports_section():
+    runner = get_report_runner()
+    statuses = session_report_statuses(runner)
+    if not statuses:
+        st.info("No reports built in this session yet.")
+    for status in statuses:
+        with st.container(border=True):
+            st.markdown(f"**{status.label}** · `{status.report_id}` · {status.state}")
+            if status.state == "running":
+                st.progress(status.progress, text=f"{status.charts_done}/{status.n_charts} charts and tables rendered")
+            elif status.state == "completed":
+                st.caption(f"Built in {status.seconds:.1f} s; {status.cached_charts} of {status.n_charts} "
+                           f"charts and tables reused from the chart cache.")
+                for col, fmt in zip(st.columns(len(status.formats)), status.formats):
+                    with col:
+                        st.download_button(f"Download {fmt.upper()}", key=f"download_report_{status.report_id}_{fmt}",
+                                           data=lambda report_id=status.report_id, fmt=fmt: runner.data(report_id, fmt),
+                                           file_name=f"fuel_report_{status.report_id}.{fmt}",
+                                           mime=fuel_report.MIME_TYPES[fmt], on_click="ignore")
+            if status.error:
+                st.error(status.error)
+    if reports_active and not any(s.state == "running" for s in statuses):
+        st.rerun()  # Last report finished: full rerun to stop polling
+
+
+reports_section()
+section_timer.lap("Reports")
 
 # --- Footer ---
 st.divider()
@@ -623,3 +1254,60 @@ st.markdown(f"<p style='text-align: center; color: grey;'>App Version 1.6 | Last
 current_year = datetime.datetime.now().year
 st.caption(f"© {current_year} by Dr. Chenxi Ji, ABS EAL Lead")
 st.caption("Disclaimer: Calculations based on user inputs and predefined factors.")
+
+# --- Startup Timing Report ---
+if 'first_render_ms' not in st.session_state:
+    st.session_state.first_render_ms = dict(section_timer.laps_ms)
+if st.sidebar.toggle("Startup timing report", value=os.environ.get("FUEL_STARTUP_REPORT") == "1", key='show_startup_report'):
+    st.sidebar.markdown("**Section render times**")
+    st.sidebar.dataframe(
+        pd.DataFrame(instrumentation.startup_report(st.session_state.first_render_ms, section_timer.laps_ms)).set_index("Section"),
+        use_container_width=True
+    )
+    st.sidebar.markdown("**Cold imports (this server process)**")
+    if instrumentation.IMPORT_TIMINGS_MS:
+        st.sidebar.dataframe(
+            pd.DataFrame(instrumentation.IMPORT_TIMINGS_MS.items(), columns=['Module', 'Import (ms)']).set_index('Module'),
+            use_container_width=True
+        )
+    else:
+        st.sidebar.info("No lazily loaded modules imported yet.")
+    st.sidebar.caption(f"This run: {section_timer.total_ms:,.0f} ms; "
+                       f"process up {time.perf_counter() - instrumentation.PROCESS_START:,.0f} s")
+
+# --- Debug Metrics Panel ---
+if st.sidebar.toggle("Debug metrics", value=os.environ.get("FUEL_DEBUG_PANEL") == "1", key='show_debug_panel'):
+    st.sidebar.markdown("**Section spans (this run)**")
+    spans = {labels["section"]: (total / count, peak)
+             for labels, (count, total, peak) in instrumentation.METRICS.rows("section_duration_ms")}
+    st.sidebar.dataframe(pd.DataFrame(
+        [(section, ms, *spans.get(section, (None, None))) for section, ms in section_timer.laps_ms.items()],
+        columns=['Section', 'This run (ms)', 'Mean (ms)', 'Max (ms)']
+    ).set_index('Section').style.format('{:,.1f}', na_rep='–'), use_container_width=True)
+    st.sidebar.markdown("**Cache calls (this server process)**")
+    cache_rows = instrumentation.cache_stats()
+    if cache_rows:
+        st.sidebar.dataframe(pd.DataFrame(cache_rows).set_index('Cache').style.format({'Hit Rate': '{:.0%}'}),
+                             use_container_width=True)
+    st.sidebar.markdown("**Figure payloads (last render)**")
+    payloads = st.session_state.get("figure_payload_bytes", {})
+    if payloads:
+        st.sidebar.dataframe(pd.DataFrame(
+            [(name, size / 1024) for name, size in payloads.items()], columns=['Figure', 'Payload (KiB)']
+        ).set_index('Figure').style.format('{:,.1f}'), use_container_width=True)
+    else:
+        st.sidebar.info("Figure payloads are recorded from the next rerun.")
+    session_bytes = instrumentation.session_memory(st.session_state)
+    st.sidebar.markdown(f"**Session state: {sum(session_bytes.values()) / 1024:,.0f} KiB**")
+    st.sidebar.dataframe(pd.DataFrame(
+        [(key, size / 1024) for key, size in list(session_bytes.items())[:10]], columns=['Key', 'Size (KiB)']
+    ).set_index('Key').style.format('{:,.1f}'), use_container_width=True)
+    st.sidebar.caption(f"Process RSS: {instrumentation.process_rss_bytes() / 2**20:,.0f} MiB")
+    st.sidebar.download_button("Prometheus metrics", instrumentation.METRICS.prometheus_text(),
+                               file_name="fuel_supplier_metrics.prom", mime="text/plain")
+else:
+    session_bytes = instrumentation.session_memory(st.session_state) if profiling else None
+
+ctx = get_script_run_ctx()
+instrumentation.record_run(section_timer.laps_ms, session_id=ctx.session_id if ctx else None,
+                           figure_bytes=st.session_state.get("figure_payload_bytes"), session_bytes=session_bytes)
@@ -0,0 +1,404 @@
+"""Vessel consumption factors derived from noon reports and voyage logs.
+
+    python consumption_logs.py LOG_DIR [--workers 8] [--chunk-rows 500000] [--full] [--dry-run]
+
+Every ``.csv``/``.tsv`` file under LOG_DIR (optionally ``.gz``/``.bz2``/``.xz``/``.zip``
+compressed) is streamed in chunks of ``chunk_rows`` rows. Each report is one row, or one
+row per fuel burned:
+
+* ``vessel_id``, ``vessel_type`` (a VESSEL_TYPES_OWNED name or vessel key) and the report
+  ``date`` (end of the period it covers);
+* either ``fuel`` and ``consumption_t`` (one row per fuel burned) or one ``<fuel>_t``
+  column per fuel (e.g. ``hfo_t``, ``lng_t``); fuels are named as in FUEL_LHV_GJ_PER_T;
+* optional ``hours`` covered by the report, default 24 (noon reports); voyage logs give the
+  voyage duration here.
+
+Common alternative column names (``imo``, ``report_date``, ``fuel_tonnes``, ...) are
+accepted, see ``COLUMN_ALIASES``. Tonnes are converted to GJ with the fuel's LHV and summed
+per vessel and calendar year together with the hours reported; rows with an unknown vessel
+type or fuel, an unparseable date or a non-numeric amount are counted and skipped. In the
+one-row-per-fuel layout the rows of a report (same ``vessel_id`` and ``date``) must be
+adjacent; their GJ are summed and their hours counted once.
+
+Files are processed in parallel on a process pool, each reduced to a per-vessel-year
+partial aggregate stored under ``LOG_DIR/.consumption_ingest/``. Later runs only process
+files that are new or changed since (by size and mtime), drop partials of deleted files and
+merge the rest, so memory is bounded by the number of vessel-years, not the log volume.
+A change to the LHV table reprocesses everything.
+
+The factor of a vessel type and year is the mean annualized consumption (GJ scaled from the
+reported hours to the full year) of its vessels with at least ``MIN_REPORT_HOURS`` of
+reports. It is written to ``consumption_factors.tsv`` in the reference data directory,
+from which ``fuel_config`` calibrates VESSEL_CONSUMPTION_FACTORS; running apps pick it up
+on restart.
+"""
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from fuel_config import VESSEL_TYPES_OWNED, VESSEL_KEYS, FUEL_LHV_GJ_PER_T
+from reference_store import DEFAULT_DATA_DIR
+
+DEFAULT_CHUNK_ROWS = 500_000
+DEFAULT_REPORT_HOURS = 24.0
+MIN_REPORT_HOURS = 30 * 24.0  # Vessel-years with less reporting are too sparse to annualize
+STATE_DIR = ".consumption_ingest"
+FACTOR_FILE = "consumption_factors.tsv"
+LOG_SUFFIXES = (".csv", ".tsv")
+_COMPRESSION_SUFFIXES = ("", ".gz", ".bz2", ".xz", ".zip")
+COLUMN_ALIASES = {
+    "vessel_id": ("vessel_id", "imo", "imo_number", "vessel"),
+    "vessel_type": ("vessel_type", "type", "ship_type"),
+    "date": ("date", "report_date", "timestamp", "report_time", "end_date", "arrival"),
+    "fuel": ("fuel", "fuel_type"),
+    "tonnes": ("consumption_t", "fuel_tonnes", "tonnes", "consumption_mt", "fuel_consumption_t"),
+    "hours": ("hours", "period_hours", "duration_h", "duration_hours", "voyage_hours"),
+}
+_AGGREGATE_COLUMNS = ["vessel_id", "year", "type_code", "gj", "hours"]
+
+
+def normalize_name(name):
+    return str(name).strip().lower().replace(" ", "").replace("-", "").replace("_", "")
+
+
+_LHV = {normalize_name(fuel): lhv for fuel, lhv in FUEL_LHV_GJ_PER_T.items()}
+_TYPE_CODES = {normalize_name(name): i for i, name in enumerate(VESSEL_TYPES_OWNED)}
+_TYPE_CODES.update({normalize_name(key): i for i, key in enumerate(VESSEL_KEYS)})
+
+
+class IngestResult(NamedTuple):
+    factors: pd.DataFrame   # year, vessel_key, consumption_factor_gj, vessel_count, report_hours
+    files_processed: int
+    files_unchanged: int
+    files_removed: int
+    rows: int               # report rows read in the processed files
+    rows_skipped: dict      # reason -> rows
+    vessel_years: int
+    elapsed_s: float
+
+
+# --- Parsing ---
+def is_log_file(name):
+    lower = name.lower()
+    return any(lower.endswith(s + c) for s in LOG_SUFFIXES for c in _COMPRESSION_SUFFIXES)
+
+
+def _separator(path):
+    return "\t" if ".tsv" in os.path.basename(path).lower() else ","
+
+
+def resolve_columns(header):
+    """Map the canonical columns (and ``<fuel>_t`` columns, as ``fuel:<fuel>``) to ``header`` names."""
+    by_name = {normalize_name(h): h for h in header}
+    columns = {}
+    for canonical, aliases in COLUMN_ALIASES.items():
+        found = next((by_name[normalize_name(a)] for a in aliases if normalize_name(a) in by_name), None)
+        if found is not None:
+            columns[canonical] = found
+    if "fuel" not in columns or "tonnes" not in columns:
+        columns.pop("fuel", None)
+        columns.pop("tonnes", None)
+        for h in header:
+            name = str(h).strip().lower()
+            for suffix in ("_t", "_mt"):
+                fuel = normalize_name(name[:-len(suffix)])
+                if name.endswith(suffix) and fuel in _LHV:
+                    columns[f"fuel:{fuel}"] = h
+    missing = [c for c in ("vessel_id", "vessel_type", "date") if c not in columns]
+    if not any(c == "fuel" or c.startswith("fuel:") for c in columns):
+        missing.append("fuel and consumption_t, or <fuel>_t columns")
+    if missing:
+        raise ValueError(f"Log is missing required columns: {missing}")
+    return columns
+
+
+def _lookup(values, table):
+    """``table[normalize_name(v)]`` per value (NaN if absent), normalizing each distinct label once."""
+    codes, labels = pd.factorize(values)
+    mapped = np.array([table.get(normalize_name(label), np.nan) for label in labels] + [np.nan], dtype=np.float64)
+    return mapped[codes]  # Missing values have code -1, the trailing NaN
+
+
+def _numeric(values):
+    return pd.to_numeric(values, errors="coerce").to_numpy(dtype=np.float64)
+
+
+def chunk_energy(chunk, columns):
+    """Per-report (vessel_id, year, type_code, gj, hours) of a log chunk, plus skipped rows by reason.
+
+    In the one-row-per-fuel layout the fuel rows of a report are collapsed into one, so the
+    report's hours are counted once however many fuels it burned.
+    """
+    skipped = {}
+
+    def skip(reason, mask):
+        if mask.any():
+            skipped[reason] = skipped.get(reason, 0) + int(mask.sum())
+
+    type_code = _lookup(chunk[columns["vessel_type"]], _TYPE_CODES)
+    dates = pd.to_datetime(chunk[columns["date"]], errors="coerce", utc=True)
+    year = dates.dt.year.to_numpy(dtype=np.float64)
+    if "fuel" in columns:
+        lhv = _lookup(chunk[columns["fuel"]], _LHV)
+        tonnes = _numeric(chunk[columns["tonnes"]])
+        skip("unknown fuel", np.isnan(lhv))
+        gj = tonnes * lhv
+        bad_amount = ~np.isnan(lhv) & ~(tonnes >= 0)
+    else:
+        fuel_columns = [(name, c) for name, c in columns.items() if name.startswith("fuel:")]
+        amounts = np.column_stack([_numeric(chunk[c]) for _, c in fuel_columns])
+        lhv = np.array([_LHV[name[len("fuel:"):]] for name, _ in fuel_columns])
+        gj = np.nansum(amounts * lhv, axis=1)
+        bad_amount = np.isnan(amounts).all(axis=1) | (amounts < 0).any(axis=1)
+    hours = _numeric(chunk[columns["hours"]]) if "hours" in columns else np.full(len(chunk), DEFAULT_REPORT_HOURS)
+
+    ok = ~np.isnan(gj) & ~bad_amount
+    skip("bad amount", bad_amount)
+    skip("unknown vessel type", ok & np.isnan(type_code))
+    ok &= ~np.isnan(type_code)
+    skip("bad date", ok & np.isnan(year))
+    ok &= ~np.isnan(year)
+    skip("bad hours", ok & ~(hours >= 0))
+    ok &= hours >= 0
+    frame = pd.DataFrame({
+        "vessel_id": chunk[columns["vessel_id"]].astype(str).str.strip().to_numpy()[ok],
+        "year": year[ok].astype(np.int16),
+        "type_code": type_code[ok].astype(np.int8),
+        "gj": gj[ok],
+        "hours": hours[ok],
+    })
+    if "fuel" in columns:
+        frame["report"] = dates.dt.tz_localize(None).to_numpy()[ok]
+        frame = (frame.groupby(["vessel_id", "report"], sort=False)
+                 .agg(year=("year", "first"), type_code=("type_code", "first"), gj=("gj", "sum"),
+                      hours=("hours", "max"))
+                 .reset_index()[_AGGREGATE_COLUMNS])
+    return frame, skipped
+
+
+def reduce_vessel_years(frame):
+    """Sum GJ and hours per (vessel_id, year); a vessel keeps the first type it was reported as."""
+    if frame.empty:
+        return frame[_AGGREGATE_COLUMNS].reset_index(drop=True)
+    return (frame.groupby(["vessel_id", "year"], sort=False, observed=True)
+            .agg(type_code=("type_code", "first"), gj=("gj", "sum"), hours=("hours", "sum"))
+            .reset_index()[_AGGREGATE_COLUMNS])
+
+
+def read_log_chunks(path, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Yield (chunk, resolved columns) for ``path``, reading only the columns that are used."""
+    sep = _separator(path)
+    columns = resolve_columns(pd.read_csv(path, sep=sep, nrows=0).columns)
+    used = list(dict.fromkeys(columns.values()))
+    for chunk in pd.read_csv(path, sep=sep, usecols=used, dtype=str, chunksize=chunk_rows):
+        yield chunk, columns
+
+
+def _split_last_report(chunk, columns):
+    """(chunk, trailing rows of its last report) so a report split across chunks is read whole."""
+    ids = chunk[columns["vessel_id"]].astype(str).str.strip().to_numpy()
+    dates = chunk[columns["date"]].to_numpy()
+    same = (ids == ids[-1]) & (dates == dates[-1])
+    n_tail = int(np.cumprod(same[::-1]).sum())
+    return chunk.iloc[:len(chunk) - n_tail], chunk.iloc[len(chunk) - n_tail:]
+
+
+def aggregate_file(path, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """(per-vessel-year aggregate, rows read, skipped rows by reason) of one log file."""
+    aggregate = pd.DataFrame({c: pd.Series(dtype=t) for c, t in
+                              zip(_AGGREGATE_COLUMNS, (str, np.int16, np.int8, np.float64, np.float64))})
+    rows, skipped = 0, {}
+
+    def add(chunk, columns):
+        nonlocal aggregate
+        energy, chunk_skipped = chunk_energy(chunk, columns)
+        aggregate = reduce_vessel_years(pd.concat([aggregate, energy], ignore_index=True))
+        for reason, n in chunk_skipped.items():
+            skipped[reason] = skipped.get(reason, 0) + n
+
+    carry, columns = None, None
+    for chunk, columns in read_log_chunks(path, chunk_rows):
+        rows += len(chunk)
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+            carry = None
+        if "fuel" in columns:
+            chunk, carry = _split_last_report(chunk, columns)
+        if len(chunk):
+            add(chunk, columns)
+    if carry is not None and len(carry):
+        add(carry, columns)
+    return aggregate, rows, skipped
+
+
+def _ingest_file(path, partial_path, chunk_rows):
+    """Worker entry point: aggregate one file and store the partial; returns (rows, skipped)."""
+    aggregate, rows, skipped = aggregate_file(path, chunk_rows)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(partial_path), suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        pickle.dump(aggregate, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, partial_path)
+    return rows, skipped
+
+
+# --- Factors ---
+def consumption_factors(vessel_years, min_hours=MIN_REPORT_HOURS):
+    """Mean annualized GJ per vessel by (year, vessel_key) from a per-vessel-year aggregate."""
+    year = vessel_years["year"].to_numpy(dtype=np.int64)
+    hours_in_year = np.where((year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0)), 8784.0, 8760.0)
+    hours = vessel_years["hours"].to_numpy(dtype=np.float64)
+    keep = hours >= min_hours
+    annual = vessel_years["gj"].to_numpy(dtype=np.float64)[keep] * hours_in_year[keep] / np.minimum(hours[keep], hours_in_year[keep])
+    factors = (pd.DataFrame({"year": year[keep], "vessel_key": np.array(VESSEL_KEYS)[vessel_years["type_code"].to_numpy()[keep]],
+                             "annual_gj": annual, "hours": hours[keep]})
+               .groupby(["year", "vessel_key"], sort=True)
+               .agg(consumption_factor_gj=("annual_gj", "mean"), vessel_count=("annual_gj", "size"),
+                    report_hours=("hours", "sum"))
+               .reset_index())
+    return factors
+
+
+def write_factor_table(factors, data_dir=None):
+    """Atomically replace the reference ``consumption_factors.tsv``; returns its path."""
+    data_dir = data_dir or os.environ.get("FUEL_REFERENCE_DATA_DIR", DEFAULT_DATA_DIR)
+    path = os.path.join(data_dir, FACTOR_FILE)
+    fd, tmp = tempfile.mkstemp(dir=data_dir, suffix=".tmp")
+    with os.fdopen(fd, "w", newline="") as f:
+        factors.to_csv(f, sep="\t", index=False, float_format="%.2f", lineterminator="\n")
+    os.replace(tmp, path)
+    return path
+
+
+# --- Incremental ingestion ---
+def _list_logs(log_dir):
+    found = {}
+    for root, dirs, files in os.walk(log_dir):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for name in sorted(files):
+            if is_log_file(name) and not name.startswith("."):
+                path = os.path.join(root, name)
+                stat = os.stat(path)
+                found[os.path.relpath(path, log_dir)] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    return found
+
+
+def _state_version():
+    """Partials stay valid while the LHVs and vessel types they were computed with are unchanged."""
+    return hashlib.sha256(json.dumps([sorted(_LHV.items()), VESSEL_KEYS]).encode()).hexdigest()[:16]
+
+
+def _load_state(state_dir, version):
+    try:
+        with open(os.path.join(state_dir, "state.json")) as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return {}
+    return state["files"] if state.get("version") == version else {}
+
+
+def _save_state(state_dir, version, files):
+    fd, tmp = tempfile.mkstemp(dir=state_dir, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump({"version": version, "files": files}, f, indent=1)
+    os.replace(tmp, os.path.join(state_dir, "state.json"))
+
+
+def ingest_logs(log_dir, max_workers=None, chunk_rows=DEFAULT_CHUNK_ROWS, full=False, min_hours=MIN_REPORT_HOURS,
+                progress=None):
+    """Process new or changed log files under ``log_dir`` and return the merged IngestResult.
+
+    ``full`` reprocesses every file. ``progress(done, total, relpath)`` is called as files finish.
+    """
+    start = time.perf_counter()
+    state_dir = os.path.join(log_dir, STATE_DIR)
+    os.makedirs(state_dir, exist_ok=True)
+    version = _state_version()
+    known = {} if full else _load_state(state_dir, version)
+    current = _list_logs(log_dir)
+    partial_path = lambda relpath: os.path.join(state_dir, hashlib.sha1(relpath.encode()).hexdigest()[:16] + ".pkl")
+
+    removed = [p for p in known if p not in current]
+    for relpath in removed:
+        if os.path.exists(partial_path(relpath)):
+            os.remove(partial_path(relpath))
+        del known[relpath]
+    pending = [p for p, stat in current.items()
+               if p not in known or {k: known[p][k] for k in stat} != stat or not os.path.exists(partial_path(p))]
+
+    rows, skipped = 0, {}
+    workers = max(1, min(max_workers or os.cpu_count() or 1, len(pending)))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_ingest_file, os.path.join(log_dir, p), partial_path(p), chunk_rows): p
+                   for p in pending}
+        for done, future in enumerate(as_completed(futures), start=1):
+            relpath = futures[future]
+            try:
+                file_rows, file_skipped = future.result()
+            except (ValueError, pd.errors.ParserError) as e:
+                raise ValueError(f"{relpath}: {e}") from None
+            rows += file_rows
+            for reason, n in file_skipped.items():
+                skipped[reason] = skipped.get(reason, 0) + n
+            known[relpath] = dict(current[relpath], rows=file_rows, skipped=file_skipped)
+            _save_state(state_dir, version, known)  # An interrupted run keeps the files it finished
+            if progress:
+                progress(done, len(pending), relpath)
+    _save_state(state_dir, version, known)
+
+    vessel_years = None
+    for relpath in sorted(known):
+        with open(partial_path(relpath), "rb") as f:
+            partial = pickle.load(f)
+        vessel_years = partial if vessel_years is None else reduce_vessel_years(
+            pd.concat([vessel_years, partial], ignore_index=True))
+    if vessel_years is None:
+        vessel_years = pd.DataFrame(columns=_AGGREGATE_COLUMNS).astype(
+            {"year": np.int16, "type_code": np.int8, "gj": np.float64, "hours": np.float64})
+    return IngestResult(
+        factors=consumption_factors(vessel_years, min_hours),
+        files_processed=len(pending),
+        files_unchanged=len(current) - len(pending),
+        files_removed=len(removed),
+        rows=rows,
+        rows_skipped=skipped,
+        vessel_years=len(vessel_years),
+        elapsed_s=time.perf_counter() - start,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Derive vessel consumption factors from noon reports and voyage logs.")
+    parser.add_argument("log_dir", help="Directory of .csv/.tsv log files (searched recursively)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS, help="Rows read per chunk")
+    parser.add_argument("--min-hours", type=float, default=MIN_REPORT_HOURS,
+                        help="Reported hours a vessel-year needs to count towards a factor")
+    parser.add_argument("--full", action="store_true", help="Reprocess every file, not just new or changed ones")
+    parser.add_argument("--data-dir", default=None, help="Reference data directory to write the factor table to")
+    parser.add_argument("--dry-run", action="store_true", help="Print the factors without writing them")
+    args = parser.parse_args(argv)
+
+    result = ingest_logs(args.log_dir, args.workers, args.chunk_rows, args.full, args.min_hours,
+                         progress=lambda done, total, relpath: print(f"[{done}/{total}] {relpath}", file=sys.stderr))
+    skipped = ", ".join(f"{n:,} {reason}" for reason, n in sorted(result.rows_skipped.items())) or "none"
+    print(f"{result.files_processed} files processed ({result.rows:,} rows, skipped: {skipped}), "
+          f"{result.files_unchanged} unchanged, {result.files_removed} removed; "
+          f"{result.vessel_years:,} vessel-years in {result.elapsed_s:.1f} s", file=sys.stderr)
+    print(result.factors.to_string(index=False), file=sys.stderr)
+    if not args.dry_run:
+        print(f"-> {write_factor_table(result.factors, args.data_dir)}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""Streaming parser for the sectioned export-projection TSV format.
+
+The format is a sequence of tab-separated rows:
+
+* header rows list the periods (``<TAB>2025<TAB>2026...``; years or any other labels such as
+  ``2025-01``) and apply to the rows that follow until the next header;
+* section rows carry only a label (``Crude Oil``, ``Oil Production``, ...), possibly followed by
+  fewer empty fields than the header has periods (or any number before the first section);
+* data rows are ``destination<TAB>value<TAB>value...`` and become the column
+  ``"<section> - <destination>"`` of a wide frame indexed by period. A full-width row with
+  every value blank is malformed, not a section.
+
+Trailing empty fields are otherwise ignored, so ``China<TAB>1<TAB>2<TAB>`` is a data row.
+
+Input is consumed line by line and values are converted in blocks of ``chunk_rows`` rows, so
+memory stays proportional to the parsed values rather than the text or per-cell objects.
+Rows that cannot be parsed are returned in ``malformed_rows`` instead of being dropped silently.
+"""
+import io
+import re
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CHUNK_ROWS = 4096
+_PERIOD_RE = re.compile(r'^\d{4}')
+
+
+class MalformedRow(NamedTuple):
+    line_number: int  # 1-based
+    reason: str
+    text: str
+
+
+class ExportData(NamedTuple):
+    frame: pd.DataFrame       # index: periods, columns: "<section> - <destination>"
+    malformed_rows: list      # [MalformedRow]
+
+
+def _period_labels(fields):
+    labels = [f.strip() for f in fields]
+    try:
+        return tuple(int(label) for label in labels)
+    except ValueError:
+        return tuple(labels)
+
+
+class _Group:
+    """Rows sharing one header: their global column positions and converted value blocks."""
+
+    def __init__(self, periods):
+        self.periods = periods
+        self.columns = []
+        self.blocks = []
+
+
+def parse_export_data(source, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Parse sectioned export data from a string or any iterable of lines (e.g. an open file)."""
+    lines = io.StringIO(source) if isinstance(source, str) else source
+    groups = {}
+    column_names = []
+    seen = set()
+    malformed = []
+    section = None
+    group = None
+    pending = []  # (line number, column name, value fields, line) awaiting block conversion
+
+    def flush():
+        if not pending:
+            return
+        try:
+            block = np.array([fields for _, _, fields, _ in pending], dtype=np.float64)
+            names = [name for _, name, _, _ in pending]
+        except ValueError:  # Find the offending rows; keep the rest
+            rows, names = [], []
+            for line_number, name, fields, line in pending:
+                try:
+                    rows.append(np.array(fields, dtype=np.float64))
+                    names.append(name)
+                except ValueError as e:
+                    malformed.append(MalformedRow(line_number, str(e), line))
+            block = np.array(rows, dtype=np.float64).reshape(len(rows), len(group.periods))
+        for name in names:
+            group.columns.append(len(column_names))
+            column_names.append(name)
+        group.blocks.append(block)
+        pending.clear()
+
+    for line_number, raw in enumerate(lines, start=1):
+        line = raw.rstrip('\r\n')
+        if not line.strip():
+            continue
+        fields = line.split('\t')
+        width = len(fields) - 1  # Value fields before stripping, to tell padded sections from blank rows
+        while len(fields) > 1 and not fields[-1].strip():  # Trailing tabs after the last field
+            fields.pop()
+        label = fields[0].strip()
+
+        if not label or _PERIOD_RE.match(label):
+            flush()
+            periods = _period_labels(fields[1:] if not label else fields)
+            group = groups.setdefault(periods, _Group(periods))
+            continue
+        values = fields[1:]
+        if not values and (section is None or group is None or width < len(group.periods)):
+            section = label
+            continue
+
+        if section is None or group is None:
+            malformed.append(MalformedRow(line_number, "data row before any section or header row", line))
+            continue
+        name = f"{section} - {label}"
+        if not values:
+            malformed.append(MalformedRow(line_number, "data row without values", line))
+        elif len(values) != len(group.periods):
+            malformed.append(MalformedRow(
+                line_number, f"expected {len(group.periods)} values, found {len(values)}", line))
+        elif name in seen:
+            malformed.append(MalformedRow(line_number, f"duplicate row '{name}'", line))
+        else:
+            seen.add(name)
+            pending.append((line_number, name, values, line))
+            if len(pending) >= chunk_rows:
+                flush()
+    flush()
+    return ExportData(_assemble(groups.values(), column_names), malformed)
+
+
+def _assemble(groups, column_names):
+    groups = [g for g in groups if g.columns]
+    if not groups:
+        return pd.DataFrame()
+    if len(groups) == 1:
+        (group,) = groups
+        return pd.DataFrame(np.concatenate(group.blocks).T, index=list(group.periods), columns=column_names)
+
+    periods = list(dict.fromkeys(p for g in groups for p in g.periods))
+    if all(isinstance(p, int) for p in periods):
+        periods.sort()
+    position = {p: i for i, p in enumerate(periods)}
+    values = np.full((len(periods), len(column_names)), np.nan)
+    for group in groups:
+        rows = np.array([position[p] for p in group.periods])
+        values[np.ix_(rows, np.array(group.columns))] = np.concatenate(group.blocks).T
+    return pd.DataFrame(values, index=periods, columns=column_names)
@@ -0,0 +1,203 @@
+"""Per-vessel fleet registry stored as a struct of arrays.
+
+Each attribute is one NumPy array over all hulls (categorical attributes as small integer
+codes, fuel capability as a bitmask), so tens of thousands of vessels take a few MB and
+every group-by is a single ``np.bincount``. ``engine_inputs`` collapses the registry into
+the per-type counts and consumption factors the engine already scores, so registry fleets
+produce the same outputs as the per-type counts.
+
+Registry files (CSV or Parquet) have one row per vessel:
+
+* ``vessel_id``, ``vessel_type`` (a VESSEL_TYPES_OWNED name or vessel key) -- required;
+* ``consumption_gj`` -- annual GJ; blank uses the type's VESSEL_CONSUMPTION_FACTORS value;
+* ``build_year``, ``retire_year`` -- the vessel is active for build_year <= year < retire_year;
+* ``engine``, ``region`` -- free-text categories;
+* ``fuel_capability`` -- ``;``-separated fuel base keys (e.g. ``diesel;methanol``), default diesel.
+"""
+import hashlib
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from fuel_config import YEAR_OPTIONS, VESSEL_TYPES_OWNED, VESSEL_KEYS, VESSEL_CONSUMPTION_FACTORS, FUEL_WTW_EMISSION_FACTORS
+import fuel_engine
+
+CAPABILITY_FUELS = tuple(FUEL_WTW_EMISSION_FACTORS)  # Bit i of fuel_capability = CAPABILITY_FUELS[i]
+# Narrowest unsigned dtype with a bit per fuel; the reference data decides how many there are.
+# None beyond 64 fuels: building a registry then fails (``_capability_dtype``), the rest of the app works.
+CAPABILITY_DTYPE = next((t for t in (np.uint16, np.uint32, np.uint64) if np.iinfo(t).bits >= len(CAPABILITY_FUELS)), None)
+GROUP_BY = ("type", "engine", "region", "capability")
+_NO_RETIREMENT = np.iinfo(np.int16).max
+
+
+class FleetAggregate(NamedTuple):
+    labels: tuple
+    vessel_count: np.ndarray    # (G,)
+    consumption_gj: np.ndarray  # (G,) GJ/year
+
+
+class FleetRegistry(NamedTuple):
+    vessel_id: np.ndarray        # (N,) str
+    type_code: np.ndarray        # (N,) int8 index into VESSEL_KEYS
+    consumption_gj: np.ndarray   # (N,) float64 GJ/year, NaN = type default for the year
+    build_year: np.ndarray       # (N,) int16
+    retire_year: np.ndarray      # (N,) int16
+    engine_code: np.ndarray      # (N,) int16 index into engines
+    region_code: np.ndarray      # (N,) int16 index into regions
+    fuel_capability: np.ndarray  # (N,) CAPABILITY_DTYPE bitmask over CAPABILITY_FUELS
+    engines: tuple
+    regions: tuple
+
+    def __len__(self):
+        return len(self.vessel_id)
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, field).nbytes for field in self._fields if isinstance(getattr(self, field), np.ndarray))
+
+    def active(self, year):
+        return (self.build_year <= year) & (year < self.retire_year)
+
+    def consumption_for(self, year):
+        """(N,) GJ/year with blanks filled from the year's (or nearest snapshot's) type factors."""
+        snapshot = min(YEAR_OPTIONS, key=lambda y: abs(y - year))
+        defaults = np.array([VESSEL_CONSUMPTION_FACTORS[snapshot][k] for k in VESSEL_KEYS])
+        return np.where(np.isnan(self.consumption_gj), defaults[self.type_code], self.consumption_gj)
+
+    def aggregate(self, by="type", year=None):
+        """Vessel count and consumption per type/engine/region, or per fuel each vessel can burn.
+
+        With ``year``, only vessels active that year are counted. Capability groups overlap:
+        a dual-fuel vessel counts towards each of its fuels.
+        """
+        weights = self.consumption_for(year if year is not None else YEAR_OPTIONS[0])
+        mask = self.active(year) if year is not None else np.ones(len(self), dtype=bool)
+        if by == "capability":
+            shifts = np.arange(len(CAPABILITY_FUELS), dtype=self.fuel_capability.dtype)
+            bits = ((self.fuel_capability[mask, None] >> shifts) & 1).astype(float)
+            return FleetAggregate(CAPABILITY_FUELS, bits.sum(axis=0).astype(np.int64), weights[mask] @ bits)
+        codes, labels = {
+            "type": (self.type_code, tuple(VESSEL_TYPES_OWNED)),
+            "engine": (self.engine_code, self.engines),
+            "region": (self.region_code, self.regions),
+        }[by]
+        codes = codes[mask]
+        return FleetAggregate(
+            labels,
+            np.bincount(codes, minlength=len(labels)),
+            np.bincount(codes, weights=weights[mask], minlength=len(labels)),
+        )
+
+    def engine_inputs(self, year):
+        """(vessel_counts, consumption_factors), both (V,), for ``fuel_engine.compute_batch``.
+
+        Factors are the mean consumption of the active vessels of each type, so counts x
+        factors reproduces the registry's total consumption per type.
+        """
+        totals = self.aggregate("type", year)
+        counts = totals.vessel_count.astype(float)
+        factors = np.divide(totals.consumption_gj, counts, out=np.zeros_like(counts), where=counts > 0)
+        return counts, factors
+
+
+def _codes(values):
+    labels, codes = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+    return codes.astype(np.int16), tuple(labels.tolist())
+
+
+def _type_codes(vessel_types):
+    lookup = {name: i for i, name in enumerate(VESSEL_TYPES_OWNED)}
+    lookup.update({key: i for i, key in enumerate(VESSEL_KEYS)})
+    labels, inverse = np.unique(vessel_types.astype(str).str.strip(), return_inverse=True)
+    unknown = [label for label in labels if label not in lookup]
+    if unknown:
+        raise ValueError(f"Unknown vessel types in registry: {unknown}")
+    return np.array([lookup[label] for label in labels], dtype=np.int8)[inverse]
+
+
+def _capability_dtype():
+    if CAPABILITY_DTYPE is None:
+        raise ValueError(f"Vessel registries support at most 64 fuels in fuel_capability; "
+                         f"the reference data has {len(CAPABILITY_FUELS)}.")
+    return CAPABILITY_DTYPE
+
+
+def _capability_bits(capabilities):
+    dtype = _capability_dtype()
+    dummies = capabilities.fillna("diesel").astype(str).str.replace(" ", "").str.lower().str.get_dummies(sep=";")
+    unknown = [fuel for fuel in dummies.columns if fuel not in CAPABILITY_FUELS]
+    if unknown:
+        raise ValueError(f"Unknown fuels in registry fuel_capability: {unknown}")
+    bits = np.zeros(len(capabilities), dtype=dtype)
+    for fuel in dummies.columns:
+        bits |= dummies[fuel].to_numpy(dtype=dtype) << dtype(CAPABILITY_FUELS.index(fuel))
+    return bits
+
+
+def registry_from_frame(frame):
+    missing = {"vessel_id", "vessel_type"} - set(frame.columns)
+    if missing:
+        raise ValueError(f"Registry is missing required columns: {sorted(missing)}")
+    n = len(frame)
+    column = lambda name, default: frame[name] if name in frame else pd.Series(default, index=frame.index)
+    engine_code, engines = _codes(column("engine", "").fillna(""))
+    region_code, regions = _codes(column("region", "").fillna(""))
+    return FleetRegistry(
+        vessel_id=frame["vessel_id"].astype(str).to_numpy(dtype=str),
+        type_code=_type_codes(frame["vessel_type"]),
+        consumption_gj=pd.to_numeric(column("consumption_gj", np.nan)).to_numpy(dtype=np.float64),
+        build_year=pd.to_numeric(column("build_year", 0)).fillna(0).to_numpy(dtype=np.int16),
+        retire_year=pd.to_numeric(column("retire_year", _NO_RETIREMENT)).fillna(_NO_RETIREMENT).to_numpy(dtype=np.int16),
+        engine_code=engine_code,
+        region_code=region_code,
+        fuel_capability=_capability_bits(column("fuel_capability", None)) if n else np.zeros(0, _capability_dtype()),
+        engines=engines,
+        regions=regions,
+    )
+
+
+def load_registry(source, file_format=None):
+    """Load a registry from a CSV/Parquet path or file object (``file_format`` 'csv'/'parquet')."""
+    name = getattr(source, "name", source)
+    file_format = file_format or ("parquet" if str(name).lower().endswith((".parquet", ".pq")) else "csv")
+    frame = pd.read_parquet(source) if file_format == "parquet" else pd.read_csv(source)
+    return registry_from_frame(frame)
+
+
+def registry_from_counts(owned_counts):
+    """Expand per-type counts (keyed by VESSEL_KEYS) into one registry row per vessel."""
+    counts = np.array([int(owned_counts.get(k, 0)) for k in VESSEL_KEYS])
+    type_code = np.repeat(np.arange(len(VESSEL_KEYS), dtype=np.int8), counts)
+    n = len(type_code)
+    return FleetRegistry(
+        vessel_id=np.array([f"{VESSEL_KEYS[t]}_{i}" for i, t in enumerate(type_code)], dtype=str),
+        type_code=type_code,
+        consumption_gj=np.full(n, np.nan),
+        build_year=np.zeros(n, dtype=np.int16),
+        retire_year=np.full(n, _NO_RETIREMENT, dtype=np.int16),
+        engine_code=np.zeros(n, dtype=np.int16),
+        region_code=np.zeros(n, dtype=np.int16),
+        fuel_capability=np.full(n, 1 << CAPABILITY_FUELS.index("diesel"), dtype=_capability_dtype()),
+        engines=("",),
+        regions=("",),
+    )
+
+
+def compute_registry_results(year, registry, fuel_mix):
+    """``fuel_engine.ScenarioResults`` for a registry fleet (``fuel_mix`` keyed by fuel-mix key)."""
+    tables = fuel_engine.get_year_tables(year)
+    counts, factors = registry.engine_inputs(year)
+    mix = fuel_engine.mix_vector(year, fuel_mix)
+    batch = fuel_engine.compute_batch(counts, mix, factors, tables.fuel_costs_gj,
+                                      tables.produced_mask, tables.procured_mask, tables.base_matrix)
+    return fuel_engine.scenario_results(tables, batch, mix)
+
+
+def registry_fingerprint(registry):
+    """Stable short hash of a registry's contents, for use in cache keys."""
+    digest = hashlib.sha256()
+    for field in registry._fields:
+        value = getattr(registry, field)
+        digest.update(value.tobytes() if isinstance(value, np.ndarray) else repr(value).encode())
+    return digest.hexdigest()[:16]
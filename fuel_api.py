@@ -0,0 +1,404 @@
+"""Local HTTP API for the fleet cost calculation.
+
+    python fuel_api.py [--host 127.0.0.1] [--port 8600] [--workers 4] [--window-ms 2]
+
+A plain ASGI app served by uvicorn (installed with Streamlit) on the asyncio event loop:
+
+* ``POST /v1/calculate`` -- one scenario, returns its result;
+* ``POST /v1/calculate/batch`` -- ``{"scenarios": [...]}``, returns ``{"results": [...]}`` in
+  request order, with ``{"error": ...}`` in place of each invalid scenario;
+* ``GET /v1/config`` -- years, vessel keys and each year's fuel-mix keys;
+* ``GET /v1/health`` and ``GET /metrics`` (Prometheus text).
+
+A scenario is ``{"year": 2030, "vessel_counts": {"vlcc": 18, ...}, "fuel_mix":
+{"diesel_prod": 92.91, ...}}`` with optional ``"fuel_costs_gj"`` price overrides by mix key.
+Vessel types may be given by key or name, missing entries count as 0 and the mix must sum
+to 100%. Results carry the numbers behind the app's Run Calculation: consumption by vessel
+type and fuel, cost by fuel, produced/procured cost, base-fuel demand and the GFI
+compliance outcome, keyed by vessel and mix keys.
+
+Throughput comes from three layers in ``Scorer``:
+
+* response cache -- each scenario's serialized result is kept in a ``result_cache.ResultCache``
+  under its canonical scenario key, so repeated inputs skip scoring and serialization;
+* coalescing -- scenarios arriving within ``window_ms`` of each other, from any requests, are
+  scored together as one vectorized ``fuel_engine`` batch per year, and identical scenarios
+  already waiting share one result;
+* bounded executor -- batches run on a thread pool, or a process pool from ``process_rows``
+  scenarios up, with at most ``max_batches`` in flight; while more than ``max_queued``
+  scenarios are waiting, new requests are refused with 503.
+
+``orjson`` is used for JSON when installed (~5x faster than the standard library).
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import NamedTuple
+
+import numpy as np
+
+from fuel_config import YEAR_OPTIONS, VESSEL_TYPES_OWNED, VESSEL_KEYS, FUEL_MIX_CATEGORIES, MILLION
+from instrumentation import METRICS
+import fuel_batch
+import fuel_compliance
+import fuel_engine
+import result_cache
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+DEFAULT_PORT = 8600
+DEFAULT_WINDOW_MS = 2.0
+DEFAULT_MAX_BATCH = 8_192        # Scenarios scored per engine call
+DEFAULT_PROCESS_ROWS = 20_000    # Batches at least this large go to the process pool
+DEFAULT_MAX_QUEUED = 500_000     # Waiting scenarios before requests are refused
+MAX_BODY_BYTES = 64 * 1024 * 1024
+PARSE_INLINE_MAX = 256           # Larger batch requests are validated off the event loop
+_VESSEL_INDEX = {fuel_batch._normalize_column(name): i for i, name in enumerate(VESSEL_TYPES_OWNED)}
+_VESSEL_INDEX.update({key: i for i, key in enumerate(VESSEL_KEYS)})
+
+
+def dumps(obj):
+    return orjson.dumps(obj) if orjson else json.dumps(obj, separators=(",", ":")).encode()
+
+
+def loads(data):
+    return orjson.loads(data) if orjson else json.loads(data)
+
+
+class Scenario(NamedTuple):
+    year: int
+    counts: np.ndarray   # (V,)
+    mix: np.ndarray      # (F,) percent, the year's mix keys
+    costs: np.ndarray    # (F,) USD/GJ
+    key: str             # result_cache.scenario_key
+
+
+class BusyError(Exception):
+    pass
+
+
+# --- Scenarios ---
+def _vector(values, index, size, field, base=None):
+    if not isinstance(values, dict):
+        raise ValueError(f"{field} must be an object")
+    out = np.zeros(size) if base is None else base.copy()
+    for name, value in values.items():
+        i = index.get(name, index.get(fuel_batch._normalize_column(name)))
+        if i is None:
+            raise ValueError(f"{field}: unknown key {name!r}")
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value) or value < 0:
+            raise ValueError(f"{field}.{name} must be a non-negative number")
+        out[i] = value
+    return out
+
+
+def parse_scenario(payload):
+    """Validate one scenario payload; raises ValueError with a client-facing message."""
+    if not isinstance(payload, dict):
+        raise ValueError("scenario must be an object")
+    year = payload.get("year")
+    if isinstance(year, bool) or year not in YEAR_OPTIONS:
+        raise ValueError(f"year must be one of {YEAR_OPTIONS}")
+    tables = fuel_engine.get_year_tables(year)
+    mix_index = {k: i for i, k in enumerate(tables.mix_keys)}
+    counts = _vector(payload.get("vessel_counts", {}), _VESSEL_INDEX, len(VESSEL_KEYS), "vessel_counts")
+    if "fuel_mix" not in payload:
+        raise ValueError("fuel_mix is required")
+    mix = _vector(payload["fuel_mix"], mix_index, len(mix_index), "fuel_mix")
+    if not fuel_engine.mix_sums_ok(mix):
+        raise ValueError(f"fuel_mix sums to {mix.sum():.2f}% (must be 100%)")
+    extra = []
+    costs = tables.fuel_costs_gj
+    if payload.get("fuel_costs_gj"):
+        costs = _vector(payload["fuel_costs_gj"], mix_index, len(mix_index), "fuel_costs_gj", base=costs)
+        extra = [result_cache._canonical(costs)]
+    return Scenario(year, counts, mix, costs, result_cache.scenario_key(year, counts, mix, "api", *extra))
+
+
+def parse_many(payloads):
+    """(Scenario or error message) per payload."""
+    parsed = []
+    for payload in payloads:
+        try:
+            parsed.append(parse_scenario(payload))
+        except ValueError as e:
+            parsed.append(str(e))
+    return parsed
+
+
+def score_rows(year, counts, mix, costs):
+    """Serialized result (JSON bytes) of each of N scenarios of one year; runs in the executor."""
+    tables = fuel_engine.get_year_tables(year)
+    batch = fuel_engine.compute_year_batch(year, counts, mix, fuel_costs_gj=costs, tables=tables)
+    compliance = fuel_compliance.assess_batch(tables, batch, mix)
+    columns = zip(
+        batch.total_consumption.tolist(), batch.consumption_by_type.tolist(), batch.consumption_by_mix.tolist(),
+        (batch.cost_by_mix / MILLION).tolist(), (batch.total_cost / MILLION).tolist(),
+        (batch.produced_cost / MILLION).tolist(), (batch.procured_cost / MILLION).tolist(),
+        batch.base_fuel_demand.tolist(), compliance.gfi[:, 0].tolist(), compliance.zone[:, 0].tolist(),
+        (compliance.cost[:, 0] / MILLION).tolist(),
+    )
+    return [dumps({
+        "year": year,
+        "total_consumption_gj": total_gj,
+        "consumption_by_type_gj": dict(zip(VESSEL_KEYS, by_type)),
+        "consumption_by_mix_gj": dict(zip(tables.mix_keys, by_mix)),
+        "cost_by_mix_musd": dict(zip(tables.mix_keys, cost_by_mix)),
+        "total_cost_musd": total_cost,
+        "produced_cost_musd": produced,
+        "procured_cost_musd": procured,
+        "base_fuel_demand_gj": dict(zip(tables.base_names, base_demand)),
+        "fleet_gfi": gfi,
+        "gfi_zone": zone,
+        "gfi_zone_label": fuel_compliance.ZONE_LABELS[zone],
+        "compliance_cost_musd": compliance_cost,
+        "total_cost_incl_compliance_musd": total_cost + compliance_cost,
+    }) for (total_gj, by_type, by_mix, cost_by_mix, total_cost, produced, procured, base_demand, gfi, zone,
+            compliance_cost) in columns]
+
+
+# --- Scoring ---
+class Scorer:
+    """Coalesces scenarios from concurrent requests into vectorized batches; event-loop only."""
+
+    def __init__(self, cache=None, window_ms=DEFAULT_WINDOW_MS, max_batch=DEFAULT_MAX_BATCH, workers=None,
+                 process_rows=DEFAULT_PROCESS_ROWS, max_batches=None, max_queued=DEFAULT_MAX_QUEUED):
+        self.cache = cache or result_cache.ResultCache(max_entries=200_000, max_bytes=256 * 1024 * 1024)
+        self.window_s = window_ms / 1000.0
+        self.max_batch = max_batch
+        self.workers = workers or os.cpu_count() or 1
+        self.process_rows = process_rows
+        self.max_batches = max_batches or 2 * self.workers
+        self.max_queued = max_queued
+        self.threads = ThreadPoolExecutor(self.workers, thread_name_prefix="fuel-api")
+        self._processes = None
+        self._slots = None
+        self._futures = {}    # scenario key -> Future, while pending or in flight
+        self._pending = []
+        self._flush_handle = None
+        self.queued = 0
+
+    def _process_pool(self):
+        if self._processes is None:
+            self._processes = ProcessPoolExecutor(self.workers)
+        return self._processes
+
+    def shutdown(self):
+        self.threads.shutdown(wait=False, cancel_futures=True)
+        if self._processes is not None:
+            self._processes.shutdown(wait=False, cancel_futures=True)
+
+    async def score(self, scenarios):
+        """Serialized result per scenario, in order. Raises BusyError when the queue is full."""
+        loop = asyncio.get_running_loop()
+        results = [self.cache.get(s.key) for s in scenarios]
+        misses = [i for i, r in enumerate(results) if r is None]
+        METRICS.inc("api_scenarios_total", len(scenarios) - len(misses), source="cache")
+        if not misses:
+            return results
+        if self.queued + len(misses) > self.max_queued:
+            raise BusyError(f"{self.queued:,} scenarios queued")
+        waits, coalesced = [], 0
+        for i in misses:
+            scenario = scenarios[i]
+            future = self._futures.get(scenario.key)
+            if future is None:
+                future = self._futures[scenario.key] = loop.create_future()
+                self._pending.append(scenario)
+                self.queued += 1
+            else:
+                coalesced += 1
+            waits.append(future)
+        METRICS.inc("api_scenarios_total", coalesced, source="coalesced")
+        METRICS.inc("api_scenarios_total", len(misses) - coalesced, source="scored")
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._pending and self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.window_s, self._flush)
+        for i, payload in zip(misses, await asyncio.gather(*waits)):
+            results[i] = payload
+        return results
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending = self._pending, []
+        by_year = {}
+        for scenario in pending:
+            by_year.setdefault(scenario.year, []).append(scenario)
+        for year, group in by_year.items():
+            for start in range(0, len(group), self.max_batch):
+                asyncio.ensure_future(self._run(year, group[start:start + self.max_batch]))
+
+    async def _run(self, year, group):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_batches)
+        loop = asyncio.get_running_loop()
+        try:
+            async with self._slots:
+                executor = self._process_pool() if len(group) >= self.process_rows else self.threads
+                start = time.perf_counter()
+                payloads = await loop.run_in_executor(
+                    executor, score_rows, year, np.array([s.counts for s in group]),
+                    np.array([s.mix for s in group]), np.array([s.costs for s in group]))
+                METRICS.observe("api_batch_rows", len(group))
+                METRICS.observe("api_batch_ms", (time.perf_counter() - start) * 1000.0)
+        except Exception as e:  # Fail every waiting request rather than leave it hanging
+            payloads, error = None, e
+        finally:
+            self.queued -= len(group)
+        for i, scenario in enumerate(group):
+            future = self._futures.pop(scenario.key, None)
+            if payloads is not None:
+                self.cache.put(scenario.key, payloads[i])
+            if future is not None and not future.done():
+                if payloads is None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(payloads[i])
+
+
+# --- HTTP ---
+class FuelAPI:
+    """ASGI application; ``scorer`` is shared by all requests."""
+
+    def __init__(self, scorer=None):
+        self.scorer = scorer or Scorer()
+        self.routes = {
+            ("POST", "/v1/calculate"): self.calculate,
+            ("POST", "/v1/calculate/batch"): self.calculate_batch,
+            ("GET", "/v1/config"): self.config,
+            ("GET", "/v1/health"): self.health,
+            ("GET", "/metrics"): self.metrics,
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    self.scorer.shutdown()
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        if scope["type"] != "http":
+            return
+        start = time.perf_counter()
+        route = self.routes.get((scope["method"], scope["path"]))
+        if route is None:
+            allowed = any(path == scope["path"] for _, path in self.routes)
+            status, body = (405, _error("method not allowed")) if allowed else (404, _error("not found"))
+        else:
+            try:
+                status, body = await route(await _read_body(receive))
+            except _HTTPError as e:
+                status, body = e.status, _error(e.message)
+            except BusyError as e:
+                status, body = 503, _error(f"server busy ({e}), retry later")
+            except Exception as e:
+                status, body = 500, _error(f"internal error: {e!r}")
+        content_type = b"text/plain; version=0.0.4" if scope["path"] == "/metrics" else b"application/json"
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"content-type", content_type), (b"content-length", str(len(body)).encode())]})
+        await send({"type": "http.response.body", "body": body})
+        METRICS.inc("api_requests_total", path=scope["path"], status=status)
+        METRICS.observe("api_request_ms", (time.perf_counter() - start) * 1000.0, path=scope["path"])
+
+    async def calculate(self, body):
+        payload = _json(body)
+        try:
+            scenario = parse_scenario(payload)
+        except ValueError as e:
+            raise _HTTPError(400, str(e)) from None
+        return 200, (await self.scorer.score([scenario]))[0]
+
+    async def calculate_batch(self, body):
+        payload = _json(body)
+        items = payload.get("scenarios") if isinstance(payload, dict) else None
+        if not isinstance(items, list):
+            raise _HTTPError(400, 'expected {"scenarios": [...]}')
+        if len(items) > PARSE_INLINE_MAX:
+            parsed = await asyncio.get_running_loop().run_in_executor(self.scorer.threads, parse_many, items)
+        else:
+            parsed = parse_many(items)
+        valid = [p for p in parsed if isinstance(p, Scenario)]
+        scored = iter(await self.scorer.score(valid))
+        parts = [next(scored) if isinstance(p, Scenario) else dumps({"index": i, "error": p})
+                 for i, p in enumerate(parsed)]
+        return 200, b'{"results":[' + b",".join(parts) + b"]}"
+
+    async def config(self, body):
+        return 200, dumps({"years": YEAR_OPTIONS, "vessel_keys": VESSEL_KEYS,
+                           "fuel_mix_keys": {str(year): list(FUEL_MIX_CATEGORIES[year]) for year in YEAR_OPTIONS}})
+
+    async def health(self, body):
+        return 200, dumps({"status": "ok", "queued": self.scorer.queued, "cache": self.scorer.cache.stats()})
+
+    async def metrics(self, body):
+        return 200, METRICS.prometheus_text().encode()
+
+
+class _HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _error(message):
+    return dumps({"error": message})
+
+
+def _json(body):
+    try:
+        return loads(body)
+    except ValueError:
+        raise _HTTPError(400, "body is not valid JSON") from None
+
+
+async def _read_body(receive):
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            raise _HTTPError(413, f"body larger than {MAX_BODY_BYTES:,} bytes")
+        chunks.append(chunk)
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the fleet cost calculation over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind (default: localhost only)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=None, help="Scoring threads/processes (default: all cores)")
+    parser.add_argument("--window-ms", type=float, default=DEFAULT_WINDOW_MS,
+                        help="How long a scenario waits for others to batch with")
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH, help="Scenarios per engine call")
+    parser.add_argument("--max-queued", type=int, default=DEFAULT_MAX_QUEUED,
+                        help="Waiting scenarios before requests get 503")
+    args = parser.parse_args(argv)
+
+    import uvicorn
+    scorer = Scorer(window_ms=args.window_ms, max_batch=args.max_batch, workers=args.workers,
+                    max_queued=args.max_queued)
+    print(f"Serving on http://{args.host}:{args.port} (JSON: {'orjson' if orjson else 'json'})", file=sys.stderr)
+    uvicorn.run(FuelAPI(scorer), host=args.host, port=args.port, log_level="warning", access_log=False,
+                lifespan="on")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""Load generator for fuel_api: keep-alive connections replaying random scenarios.
+
+    python fuel_api_load.py [--url http://127.0.0.1:8600] [--connections 64] [--duration 10]
+                            [--batch-size 1] [--distinct 1000] [--spawn-server]
+
+Each connection sends requests back to back over raw asyncio streams (no client library
+overhead). With ``--distinct N`` requests draw from a pool of N scenarios, so repeats
+exercise the response cache; ``--distinct 0`` makes every scenario new, which exercises
+coalescing and scoring. ``--batch-size`` > 1 posts to ``/v1/calculate/batch`` instead.
+``--spawn-server`` starts ``fuel_api.py`` on the URL's port for the duration of the run.
+"""
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import time
+import urllib.parse
+import urllib.request
+
+import numpy as np
+
+from fuel_config import YEAR_OPTIONS, VESSEL_KEYS, FUEL_MIX_CATEGORIES
+
+
+def random_scenario(rng, years=YEAR_OPTIONS):
+    year = int(rng.choice(years))
+    mix_keys = list(FUEL_MIX_CATEGORIES[year])
+    used = rng.choice(mix_keys, size=min(3, len(mix_keys)), replace=False)
+    shares = np.floor(rng.dirichlet(np.ones(len(used))) * 10_000) / 100
+    shares[0] = round(100 - shares[1:].sum(), 2)
+    return {
+        "year": year,
+        "vessel_counts": {key: int(n) for key, n in zip(VESSEL_KEYS, rng.integers(0, 40, len(VESSEL_KEYS)))},
+        "fuel_mix": {str(key): float(share) for key, share in zip(used, shares)},
+    }
+
+
+class Stats:
+    def __init__(self):
+        self.latencies_ms = []
+        self.statuses = {}
+        self.errors = 0
+        self.scenarios = 0
+
+
+async def _connection(host, port, path, next_body, deadline, stats):
+    reader, writer = await asyncio.open_connection(host, port)
+    prefix = f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n".encode()
+    try:
+        while time.perf_counter() < deadline:
+            body, scenarios = next_body()
+            start = time.perf_counter()
+            writer.write(prefix + b"Content-Length: %d\r\n\r\n" % len(body) + body)
+            await writer.drain()
+            head = await reader.readuntil(b"\r\n\r\n")
+            status = int(head[9:12])
+            length = 0
+            for line in head.split(b"\r\n")[1:]:
+                if line[:15].lower() == b"content-length:":
+                    length = int(line[15:])
+            await reader.readexactly(length)
+            stats.latencies_ms.append((time.perf_counter() - start) * 1000.0)
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            if status == 200:
+                stats.scenarios += scenarios
+    except (OSError, asyncio.IncompleteReadError):
+        stats.errors += 1
+    finally:
+        writer.close()
+
+
+async def run_load(url, connections=64, duration=10.0, batch_size=1, distinct=1000, seed=0):
+    """Drive the API for ``duration`` seconds and return a summary dict."""
+    parsed = urllib.parse.urlsplit(url)
+    rng = np.random.default_rng(seed)
+    pool = [random_scenario(rng) for _ in range(distinct)]
+    path = "/v1/calculate/batch" if batch_size > 1 else "/v1/calculate"
+
+    def next_body():
+        picks = [pool[i] for i in rng.integers(0, len(pool), batch_size)] if pool else \
+            [random_scenario(rng) for _ in range(batch_size)]
+        payload = {"scenarios": picks} if batch_size > 1 else picks[0]
+        return json.dumps(payload).encode(), batch_size
+
+    stats = Stats()
+    start = time.perf_counter()
+    await asyncio.gather(*(_connection(parsed.hostname, parsed.port or 80, path, next_body,
+                                       start + duration, stats) for _ in range(connections)))
+    elapsed = time.perf_counter() - start
+    latencies = np.array(stats.latencies_ms or [np.nan])
+    return {
+        "requests": len(stats.latencies_ms),
+        "requests_per_s": len(stats.latencies_ms) / elapsed,
+        "scenarios_per_s": stats.scenarios / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "max_ms": float(latencies.max()),
+        "statuses": stats.statuses,
+        "connection_errors": stats.errors,
+    }
+
+
+def _wait_healthy(url, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url + "/v1/health", timeout=1) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"API at {url} did not become healthy within {timeout:.0f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the fuel cost HTTP API.")
+    parser.add_argument("--url", default="http://127.0.0.1:8600")
+    parser.add_argument("--connections", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds")
+    parser.add_argument("--batch-size", type=int, default=1, help="Scenarios per request")
+    parser.add_argument("--distinct", type=int, default=1000, help="Scenario pool size; 0 = all new")
+    parser.add_argument("--spawn-server", action="store_true", help="Run fuel_api.py for the test")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.spawn_server:
+        port = urllib.parse.urlsplit(args.url).port or 8600
+        server = subprocess.Popen([sys.executable, "fuel_api.py", "--port", str(port)])
+    try:
+        _wait_healthy(args.url)
+        summary = asyncio.run(run_load(args.url, args.connections, args.duration, args.batch_size,
+                                       args.distinct, args.seed))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    for key, value in summary.items():
+        print(f"{key:>18}: {value:,.1f}" if isinstance(value, float) else f"{key:>18}: {value}")
+    return 0 if set(summary["statuses"]) <= {200} and not summary["connection_errors"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,251 @@
+"""Benchmark suite: engine micro-benchmarks, parser/chart scaling and full-page reruns.
+
+    python fuel_benchmarks.py [-o benchmark_results.json] [--scales 10,100,1000] [--skip-app]
+    python fuel_benchmarks.py --write-thresholds 3.0   # re-baseline at 3x the measured medians
+
+Each benchmark reports the median and best wall time per call (ms). The parser and chart
+builders are also run on synthetic data 10x-1000x the size of the reference tables (more
+sections for the parser, finer time resolution for the charts), and the
+app benchmarks time whole-page reruns through Streamlit's AppTest harness for typical
+interactions. Results are written as JSON alongside the thresholds from
+benchmark_thresholds.json; the exit status is 1 when any benchmark exceeds its threshold.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from fuel_config import YEAR_OPTIONS, VESSEL_KEYS, DEFAULT_OWNED_VESSEL_COUNTS, DEFAULT_FUEL_MIX, REFERENCE_STORE
+from export_data import parse_export_data
+from fuel_format import format_value
+from reference_store import DEFAULT_DATA_DIR
+import fuel_compliance
+import fuel_engine
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "FuelSupplier.py")
+THRESHOLDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_thresholds.json")
+DEFAULT_SCALES = (10, 100, 1000)
+MIN_RUN_SECONDS = 0.02  # Micro-benchmarks loop until one timed run takes at least this long
+
+
+def measure(fn, repeat=5, number=None):
+    """(median ms, best ms) per call of ``fn`` over ``repeat`` timed runs of ``number`` calls."""
+    fn()  # Warm-up: imports, caches, first-call allocations
+    if number is None:
+        number = 1
+        while True:
+            start = time.perf_counter()
+            for _ in range(number):
+                fn()
+            if time.perf_counter() - start >= MIN_RUN_SECONDS or number >= 1_000_000:
+                break
+            number *= 10
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - start) * 1000.0 / number)
+    return statistics.median(times), min(times)
+
+
+# --- Synthetic data ---
+def synthetic_export_text(scale):
+    """The export projections repeated ``scale`` times, each copy's sections renamed."""
+    with open(os.path.join(DEFAULT_DATA_DIR, "export_projections.tsv")) as f:
+        lines = f.read().splitlines()
+    out = []
+    for copy in range(scale):
+        for line in lines:
+            fields = line.split('\t')
+            is_section = fields[0].strip() and not any(x.strip() for x in fields[1:]) and not fields[0][:4].isdigit()
+            out.append(f"{fields[0]} #{copy}" if is_section and copy else line)
+    return "\n".join(out)
+
+
+def synthetic_gfi_trajectory(scale):
+    """The GFI trajectory resampled to ``scale`` points per year."""
+    years, lines = fuel_compliance.gfi_trajectory()
+    fine = np.linspace(years[0], years[-1], (len(years) - 1) * scale + 1)
+    return fine, {name: np.interp(fine, years, values) for name, values in lines.items()}
+
+
+def synthetic_price_projections(scale):
+    """The fuel price projections resampled to ``scale`` points per year."""
+    years, rows = fuel_engine.price_projection_table()
+    fine = np.linspace(years[0], years[-1], (len(years) - 1) * scale + 1)
+    return fine, {name: np.interp(fine, years, prices) for name, prices in rows.items()}
+
+
+def synthetic_export_frame(scale):
+    """The export projections resampled to ``scale`` points per year."""
+    frame = REFERENCE_STORE.table("export_projections").to_frame(index="Year")
+    years = frame.index.to_numpy(dtype=float)
+    fine = np.linspace(years[0], years[-1], (len(years) - 1) * scale + 1)
+    return pd.DataFrame({c: np.interp(fine, years, frame[c]) for c in frame}, index=fine)
+
+
+# --- Benchmarks ---
+def engine_benchmarks():
+    year = YEAR_OPTIONS[0]
+    counts, mix = DEFAULT_OWNED_VESSEL_COUNTS[year], DEFAULT_FUEL_MIX[year]
+    tables = fuel_engine.get_year_tables(year)
+    rng = np.random.default_rng(0)
+    batch_counts = rng.integers(0, 40, size=(10_000, len(VESSEL_KEYS)))
+    batch_mix = rng.dirichlet(np.ones(len(tables.mix_keys)), 10_000) * 100.0
+    yield "engine.compute_results", lambda: fuel_engine.compute_results(year, counts, mix), 7
+    yield "engine.compute_year_batch.10k", lambda: fuel_engine.compute_year_batch(year, batch_counts, batch_mix), 7
+    yield "format_value", lambda: format_value(1234.5678, 3), 7
+
+
+def parser_benchmarks(scales):
+    for scale in (1,) + tuple(scales):
+        text = synthetic_export_text(scale)
+        yield f"parse_export_data.x{scale}", lambda text=text: parse_export_data(text), 5 if scale < 1000 else 3
+
+
+def chart_benchmarks(scales):
+    import fuel_charts
+    import plotly.graph_objects as go
+    import result_charts
+    year = YEAR_OPTIONS[0]
+    results = fuel_engine.compute_results(year, DEFAULT_OWNED_VESSEL_COUNTS[year], DEFAULT_FUEL_MIX[year])
+    output_builders = (result_charts.cost_pie, result_charts.produced_procured_bar,
+                       result_charts.vessel_type_bar, result_charts.base_demand_pie)
+    yield "chart.outputs", lambda: [build(results).to_json() for build in output_builders], 5
+    for scale in (1,) + tuple(scales):
+        repeat = 3 if scale < 1000 else 1
+        trajectory = synthetic_gfi_trajectory(scale)
+        projections = synthetic_price_projections(scale)
+        exports = synthetic_export_frame(scale)
+        yield (f"chart.gfi_compliance.x{scale}",
+               lambda t=trajectory: fuel_charts.figure_to_bytes(fuel_charts.gfi_compliance_figure(trajectory=t)), repeat)
+        yield (f"chart.fuel_price.x{scale}",
+               lambda p=projections: fuel_charts.figure_to_bytes(fuel_charts.fuel_price_figure(p)), repeat)
+        yield (f"chart.export_projection.x{scale}",
+               lambda e=exports: fuel_charts.figure_to_bytes(fuel_charts.export_projection_figure(e)), repeat)
+        line_x, line_y = trajectory[0], next(iter(trajectory[1].values()))
+        yield (f"chart.line_trace.x{scale}",
+               lambda x=line_x, y=line_y: go.Figure(result_charts.line_trace(x, y)).to_json(), repeat)
+
+
+def app_benchmarks(repeat=5):
+    """Whole-page rerun latency for typical interactions, in ms per rerun."""
+    from streamlit.testing.v1 import AppTest
+
+    def fresh():
+        return AppTest.from_file(APP_PATH, default_timeout=300)
+
+    def check(at):
+        if at.exception:
+            raise RuntimeError(f"App raised during benchmark: {at.exception}")
+        return at
+
+    def initial_load():
+        check(fresh().run())
+
+    at = check(fresh().run())
+    years = iter(YEAR_OPTIONS * 1000)
+    first_mix_key = next(iter(DEFAULT_FUEL_MIX[YEAR_OPTIONS[0]]))
+    shares = iter(np.tile([10.0, 20.0], 1000))
+
+    def year_change():
+        check(at.selectbox(key="selected_year").set_value(next(years)).run())
+
+    def mix_edit():
+        if at.session_state.selected_year != YEAR_OPTIONS[0]:
+            check(at.selectbox(key="selected_year").set_value(YEAR_OPTIONS[0]).run())
+        check(at.number_input(key=first_mix_key).set_value(float(next(shares))).run())
+
+    def run_calculation():
+        check(next(b for b in at.button if b.label == "Run Calculation").click().run())
+
+    yield "app.initial_load", initial_load, max(2, repeat // 2)
+    yield "app.year_change", year_change, repeat
+    yield "app.mix_edit", mix_edit, repeat
+    yield "app.run_calculation", run_calculation, repeat
+
+
+def run_benchmarks(scales=DEFAULT_SCALES, include_app=True, progress=None):
+    """{name: {"median_ms", "best_ms", "repeat"}} for every benchmark."""
+    suites = [engine_benchmarks(), parser_benchmarks(scales), chart_benchmarks(scales)]
+    if include_app:
+        suites.append(app_benchmarks())
+    results = {}
+    for suite in suites:
+        for name, fn, repeat in suite:
+            single_shot = name.startswith(("app.", "chart.", "parse_export_data."))
+            median, best = measure(fn, repeat, number=1 if single_shot else None)
+            results[name] = {"median_ms": median, "best_ms": best, "repeat": repeat}
+            if progress:
+                progress(name, median)
+    return results
+
+
+def check_thresholds(results, thresholds):
+    """Annotate results with their threshold; returns the names that regressed."""
+    regressions = []
+    for name, result in results.items():
+        limit = thresholds.get(name)
+        result["threshold_ms"] = limit
+        result["ok"] = limit is None or result["median_ms"] <= limit
+        if not result["ok"]:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the engine, chart builders and app reruns.")
+    parser.add_argument("-o", "--output", default="benchmark_results.json", help="Results JSON file")
+    parser.add_argument("--thresholds", default=THRESHOLDS_PATH, help="Regression thresholds JSON file")
+    parser.add_argument("--scales", default=",".join(map(str, DEFAULT_SCALES)),
+                        help="Synthetic data scales for the parser and chart benchmarks")
+    parser.add_argument("--skip-app", action="store_true", help="Skip the AppTest page-rerun benchmarks")
+    parser.add_argument("--write-thresholds", type=float, metavar="FACTOR",
+                        help="Write thresholds of FACTOR x the measured medians instead of checking")
+    args = parser.parse_args(argv)
+
+    scales = tuple(int(s) for s in args.scales.split(",") if s.strip())
+    results = run_benchmarks(scales, include_app=not args.skip_app,
+                             progress=lambda name, ms: print(f"{name:<40} {ms:12.3f} ms", file=sys.stderr))
+
+    if args.write_thresholds:
+        thresholds = {name: round(r["median_ms"] * args.write_thresholds, 4) for name, r in results.items()}
+        with open(args.thresholds, "w") as f:
+            json.dump(thresholds, f, indent=2, sort_keys=True)
+            f.write("\n")
+    try:
+        with open(args.thresholds) as f:
+            thresholds = json.load(f)
+    except FileNotFoundError:
+        thresholds = {}
+    regressions = check_thresholds(results, thresholds)
+
+    report = {
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "passed": not regressions,
+        "regressions": regressions,
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+        f.write("\n")
+    for name in regressions:
+        print(f"REGRESSION {name}: {results[name]['median_ms']:.3f} ms > {results[name]['threshold_ms']} ms",
+              file=sys.stderr)
+    print(f"{len(results)} benchmarks, {len(regressions)} regressions -> {args.output}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
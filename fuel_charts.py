@@ -0,0 +1,294 @@
+"""Static outlook charts rendered to image bytes.
+
+Figures are built with the object-oriented ``matplotlib.figure.Figure`` API (no pyplot
+global state), rendered once to PNG/SVG bytes and released, so callers can cache and
+serve the bytes directly. The fleet GFI marker is drawn as a cheap raster overlay on a
+pre-rendered base chart, so the base is never redrawn when the marker moves.
+"""
+import textwrap
+from io import BytesIO
+from typing import NamedTuple
+
+import matplotlib
+import matplotlib.ticker as mticker
+from matplotlib.figure import Figure
+from matplotlib import font_manager
+from PIL import Image, ImageDraw, ImageFont
+import numpy as np
+
+import fuel_compliance
+import fuel_engine
+
+CHART_DPI = 110
+MAX_IMAGE_WIDTH_PX = 1460  # Streamlit re-encodes wider images on every rerun
+GFI_CHART_YEARS = (2028, 2050)  # Range over which the fleet marker is plotted
+_GFI_Y_RANGE = (0, 95)
+MAX_YEAR_TICKS = 30  # Denser time axes (e.g. sub-annual data) fall back to automatic ticks
+PAGE_SIZE_IN = (11.69, 8.27)  # A4 landscape, for report table pages
+
+
+class AxesPixelMap(NamedTuple):
+    """Affine map from data coordinates to PNG pixel coordinates (origin top-left)."""
+    x_scale: float
+    x_offset: float
+    y_scale: float
+    y_offset: float
+
+    def to_pixels(self, x, y):
+        return self.x_scale * x + self.x_offset, self.y_scale * y + self.y_offset
+
+
+def _year_ticks(ax, years):
+    if len(years) <= MAX_YEAR_TICKS:
+        ax.set_xticks(years)
+    else:
+        ax.xaxis.set_major_locator(mticker.MaxNLocator(MAX_YEAR_TICKS, integer=True))
+
+
+def figure_to_bytes(fig, fmt="png", dpi=CHART_DPI):
+    buffer = BytesIO()
+    fig.savefig(buffer, format=fmt, dpi=min(dpi, MAX_IMAGE_WIDTH_PX / fig.get_figwidth()))
+    fig.clear()  # Drop artists eagerly; the Figure is not registered with pyplot
+    return buffer.getvalue()
+
+
+def gfi_compliance_figure(calculated_gfi=None, calculation_year=None, trajectory=None, fleet_series=None):
+    """``trajectory`` is (years, {line: values}); defaults to the reference table.
+
+    ``fleet_series`` is {label: (years, fleet GFI)}, drawn as lines over the zones.
+    """
+    years, lines = trajectory or fuel_compliance.gfi_trajectory()
+    gfi_base, gfi_dc, gfi_credit = lines['GFI Base'], lines['GFI DC'], lines['GFI_Credit']
+    min_gfi_plot, max_gfi_plot = _GFI_Y_RANGE
+
+    fig = Figure(figsize=(12, 7))
+    ax = fig.subplots()
+
+    ax.fill_between(years, gfi_base, max_gfi_plot,
+                    color='red', alpha=0.3, label=fuel_compliance.ZONE_LABELS[1])
+    ax.fill_between(years, gfi_dc, gfi_base,
+                    color='orange', alpha=0.4, label=fuel_compliance.ZONE_LABELS[2])
+    ax.fill_between(years, gfi_credit, gfi_dc,
+                    color='lightgreen', alpha=0.5, label=fuel_compliance.ZONE_LABELS[3])
+    ax.fill_between(years, min_gfi_plot, gfi_credit,
+                    color='darkgreen', alpha=0.6, label=fuel_compliance.ZONE_LABELS[4])
+
+    ax.plot(years, gfi_base, color='maroon', linestyle='--', linewidth=1.5, label='GFI Base Line')
+    ax.plot(years, gfi_dc, color='darkorange', linestyle='--', linewidth=1.5, label='GFI DC Line')
+    ax.plot(years, gfi_credit, color='green', linestyle='-', linewidth=2, label='GFI Credit Threshold')
+
+    for label, (series_years, series_gfi) in (fleet_series or {}).items():
+        series_years, series_gfi = np.asarray(series_years), np.asarray(series_gfi)
+        shown = (series_years >= GFI_CHART_YEARS[0]) & (series_years <= GFI_CHART_YEARS[1])
+        ax.plot(series_years[shown], series_gfi[shown], marker='o', markersize=4, linewidth=1.5, label=label, zorder=9)
+
+    if calculated_gfi is not None and calculation_year is not None:
+        if GFI_CHART_YEARS[0] <= calculation_year <= GFI_CHART_YEARS[1]:
+            ax.plot(calculation_year, calculated_gfi,
+                    marker='*', markersize=15, color='blue', markeredgecolor='black',
+                    label=f'Fleet Optimal GFI ({calculation_year}): {calculated_gfi:.1f}', zorder=10)
+            ax.text(calculation_year + 0.5, calculated_gfi, f'{calculated_gfi:.1f}',
+                    color='blue', fontsize=9, va='center', ha='left', fontweight='bold',
+                    bbox=dict(boxstyle='round,pad=0.2', fc='white', alpha=0.7, ec='none'), zorder=11)
+
+    ax.set_xlabel("Year", fontsize=11)
+    ax.set_ylabel("GFI Value", fontsize=11)
+    ax.set_ylim(min_gfi_plot, max_gfi_plot)
+    _year_ticks(ax, years)
+    ax.tick_params(axis='x', rotation=45, labelsize=8)
+    ax.yaxis.set_major_formatter(mticker.FormatStrFormatter('%.0f'))
+    ax.tick_params(axis='y', labelsize=9)
+    ax.legend(loc='upper right', fontsize='x-small')
+    ax.grid(True, linestyle=':', alpha=0.6)
+    fig.tight_layout()
+    return fig
+
+
+def render_gfi_base(dpi=CHART_DPI):
+    """Render the compliance zones without a marker; returns (png bytes, AxesPixelMap)."""
+    fig = gfi_compliance_figure()
+    fig.set_dpi(dpi)
+    fig.canvas.draw()
+    ax = fig.axes[0]
+    (x0, y0), (x1, y1) = ax.transData.transform([(0.0, 0.0), (1.0, 1.0)])
+    height = fig.bbox.height
+    pixel_map = AxesPixelMap(x_scale=x1 - x0, x_offset=x0, y_scale=-(y1 - y0), y_offset=height - y0)
+    return figure_to_bytes(fig, dpi=dpi), pixel_map
+
+
+def _font(size_px, bold=False):
+    return ImageFont.truetype(font_manager.findfont("DejaVu Sans:bold" if bold else "DejaVu Sans"), size=size_px)
+
+
+def _star(cx, cy, outer, inner):
+    angles = np.pi / 2 + np.arange(10) * np.pi / 5
+    radii = np.where(np.arange(10) % 2 == 0, outer, inner)
+    return list(zip(cx + radii * np.cos(angles), cy - radii * np.sin(angles)))
+
+
+def overlay_gfi_marker(base_png, pixel_map, calculation_year, calculated_gfi, dpi=CHART_DPI):
+    """Stamp the fleet GFI star and label onto a pre-rendered base chart."""
+    if not GFI_CHART_YEARS[0] <= calculation_year <= GFI_CHART_YEARS[1]:
+        return base_png
+    image = Image.open(BytesIO(base_png)).convert("RGBA")
+    overlay = Image.new("RGBA", image.size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(overlay)
+    px, py = pixel_map.to_pixels(calculation_year, calculated_gfi)
+    points_to_px = dpi / 72.0
+    outer = 7.5 * points_to_px  # markersize=15 points, as in the native chart
+    draw.polygon(_star(px, py, outer, outer * 0.4), fill=(0, 0, 255, 255), outline=(0, 0, 0, 255))
+
+    font = _font(round(9 * points_to_px), bold=True)
+    label = f'{calculated_gfi:.1f}'
+    tx = pixel_map.to_pixels(calculation_year + 0.5, calculated_gfi)[0]
+    left, top, right, bottom = draw.textbbox((tx, py), label, font=font, anchor="lm")
+    pad = 0.2 * 9 * points_to_px
+    draw.rectangle((left - pad, top - pad, right + pad, bottom + pad), fill=(255, 255, 255, 178))
+    draw.text((tx, py), label, font=font, fill=(0, 0, 255, 255), anchor="lm")
+
+    buffer = BytesIO()
+    Image.alpha_composite(image, overlay).convert("RGB").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def fuel_price_figure(projections=None):
+    """``projections`` is (years, {fuel name: prices}); defaults to the reference table."""
+    years, rows = projections or fuel_engine.price_projection_table()
+
+    fig = Figure(figsize=(15, 8))
+    ax = fig.subplots()
+    for fuel_name, prices in rows.items():
+        ax.plot(years, prices, label=fuel_name, marker='o', linestyle='-', markersize=4)
+
+    ax.set_xlabel("Year", fontsize=11)
+    ax.set_ylabel("Price (USD/GJ)", fontsize=11)
+    _year_ticks(ax, years)
+    ax.tick_params(axis='x', rotation=0, labelsize=9)
+    ax.yaxis.set_major_formatter(mticker.FormatStrFormatter('%.1f'))
+    ax.tick_params(axis='y', labelsize=9)
+    ax.legend(title="Fuel Types", loc='center left', bbox_to_anchor=(1.01, 0.5),
+              fontsize='small', title_fontsize='medium')
+    ax.grid(True, linestyle=':', alpha=0.6)
+    fig.tight_layout(rect=[0, 0, 0.83, 1])
+    return fig
+
+
+def export_projection_figure(df_exports, highlight_years=(2030, 2040, 2050)):
+    fig = Figure(figsize=(15, 8))
+    ax = fig.subplots()
+    if df_exports.empty:
+        ax.text(0.5, 0.5, "Data parsing for Petrobras Exports failed.\nPlease check data format.", ha='center', va='center', fontsize=12, color='red')
+        return fig
+
+    for product_region in df_exports.columns:
+        line, = ax.plot(df_exports.index, df_exports[product_region],
+                        label=product_region, marker='.', linestyle='-', markersize=5)
+
+        for year in highlight_years:
+            if year in df_exports.index:
+                value = df_exports.loc[year, product_region]
+                ax.plot(year, value, marker='o', markersize=8, color=line.get_color(), markeredgecolor='black', zorder=5)
+                ax.text(year, value + (ax.get_ylim()[1] - ax.get_ylim()[0]) * 0.015,
+                        f'{value:.1f}', ha='center', va='bottom', fontsize=7, color=line.get_color(),
+                        bbox=dict(boxstyle='round,pad=0.15', fc='white', alpha=0.6, ec='none'), zorder=6)
+
+    ax.set_xlabel("Year", fontsize=11)
+    ax.set_ylabel("Volume (Million Barrels per Year)", fontsize=11)
+    _year_ticks(ax, df_exports.index[::2])
+    ax.tick_params(axis='x', rotation=45, labelsize=9)
+    ax.yaxis.set_major_formatter(mticker.FormatStrFormatter('%.0f'))
+    ax.tick_params(axis='y', labelsize=9)
+
+    ax.legend(title="Product - Destination", loc='center left', bbox_to_anchor=(1.01, 0.5),
+              fontsize='small', title_fontsize='medium')
+    ax.grid(True, linestyle=':', alpha=0.6)
+    fig.tight_layout(rect=[0, 0, 0.80, 1])
+    return fig
+
+
+def yearly_breakdown_figure(years, base_cost_musd, base_demand_gj, base_names, title=None):
+    """Stacked cost and demand per year by base fuel; ``base_cost_musd``/``base_demand_gj`` are (Y, B)."""
+    base_cost_musd, base_demand_gj = np.asarray(base_cost_musd), np.asarray(base_demand_gj)
+    keep = np.flatnonzero((np.abs(base_cost_musd).sum(axis=0) > 1e-9) | (np.abs(base_demand_gj).sum(axis=0) > 1e-9))
+    positions = np.arange(len(years))
+    colors = matplotlib.colormaps["tab20"]
+
+    fig = Figure(figsize=(15, 8))
+    axes = fig.subplots(1, 2)
+    for ax, values, ylabel in ((axes[0], base_cost_musd, "Cost (Million USD/Year)"),
+                               (axes[1], base_demand_gj, "Demand (GJ/Year)")):
+        bottom = np.zeros(len(years))
+        for n, i in enumerate(keep):
+            ax.bar(positions, values[:, i], bottom=bottom, color=colors(n % 20), label=base_names[i])
+            bottom += values[:, i]
+        if bottom.max() > 0:
+            ax.set_ylim(0, bottom.max() * 1.05)  # Zero-height top layers would pin the limit to the tallest bar
+        ax.set_ylabel(ylabel, fontsize=11)
+        ax.set_xticks(positions[::max(1, -(-len(years) // MAX_YEAR_TICKS))])
+        ax.set_xticklabels([str(y) for y in years][::max(1, -(-len(years) // MAX_YEAR_TICKS))],
+                           rotation=45 if len(years) > 10 else 0, fontsize=8)
+        ax.yaxis.set_major_formatter(mticker.FuncFormatter(lambda v, _: f"{v:,.0f}"))
+        ax.tick_params(axis='y', labelsize=9)
+        ax.grid(True, axis='y', linestyle=':', alpha=0.6)
+    if title:
+        fig.suptitle(title, fontsize=13)
+    if len(keep):
+        fig.legend(*axes[0].get_legend_handles_labels(), title="Fuel Types", loc='center right',
+                   fontsize='small', title_fontsize='medium')
+    fig.subplots_adjust(left=0.07, right=0.86, bottom=0.1, top=0.92 if title else 0.96, wspace=0.22)  # tight_layout doubles the draw time
+    return fig
+
+
+def table_image(columns, rows, title=None, dpi=CHART_DPI, font_pt=8, wrap=14):
+    """PNG bytes of a page-sized table of pre-formatted cell strings (first column left-aligned).
+
+    Drawn directly with Pillow: matplotlib's table measures every cell on each draw and takes
+    ~1 s for a page of a few hundred cells. The font shrinks until the table fits the page.
+    """
+    width, height = round(PAGE_SIZE_IN[0] * dpi), round(PAGE_SIZE_IN[1] * dpi)
+    margin = round(0.4 * dpi)
+    headers = [textwrap.fill(str(c), wrap).split("\n") for c in columns]
+    header_lines = max(len(lines) for lines in headers)
+    size, min_size = round(font_pt * dpi / 72.0), round(6 * dpi / 72.0)
+    while True:
+        font, bold = _font(size), _font(size, bold=True)
+        pad = size // 2
+        col_widths = [max([bold.getlength(line) for line in header] + [font.getlength(row[i]) for row in rows]) + 2 * pad
+                      for i, header in enumerate(headers)]
+        row_height = round(size * 1.6)
+        table_height = row_height * (len(rows) + header_lines)
+        if size <= min_size or (sum(col_widths) <= width - 2 * margin and table_height <= height - 3 * margin):
+            break
+        size -= 1
+
+    image = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(image)
+    top = margin
+    if title:
+        draw.text((margin, top), title, font=_font(round(12 * dpi / 72.0), bold=True), fill="black")
+        top += round(2.2 * 12 * dpi / 72.0)
+    lefts = margin + np.concatenate([[0], np.cumsum(col_widths)])
+    right = lefts[-1]
+    header_height = row_height * header_lines
+    draw.rectangle((margin, top, right, top + header_height), fill="#eef2f7")
+    for i, lines in enumerate(headers):
+        center = (lefts[i] + lefts[i + 1]) / 2
+        for n, line in enumerate(lines):
+            draw.text((center, top + header_height - (len(lines) - n - 0.5) * row_height), line,
+                      font=bold, fill="black", anchor="mm")
+    y = top + header_height
+    for row in rows:
+        for i, cell in enumerate(row):
+            x, anchor = (lefts[i] + pad, "lm") if i == 0 else (lefts[i + 1] - pad, "rm")
+            draw.text((x, y + row_height / 2), cell, font=font, fill="black", anchor=anchor)
+        y += row_height
+        draw.line((margin, y, right, y), fill="lightgrey")
+    for x in lefts:
+        draw.line((x, top, x, y), fill="lightgrey")
+    draw.rectangle((margin, top, right, y), outline="grey")
+    if not rows:
+        draw.text((width / 2, height / 2), "No data.", font=font, fill="grey", anchor="mm")
+
+    buffer = BytesIO()
+    image.save(buffer, format="PNG", optimize=False)
+    return buffer.getvalue()
@@ -0,0 +1,108 @@
+"""Fleet GFI, compliance zone and penalty/credit cost against the GFI trajectory.
+
+The fleet's attained GFI is the share-weighted well-to-wake intensity of its fuel mix. Each
+year it is compared with the trajectory's Base, Direct Compliance (DC) and Credit lines:
+
+* Zone 1, above Base -- tier 1 units cover DC..Base and tier 2 units everything above Base;
+* Zone 2, between DC and Base -- tier 1 units cover the deficit below Base;
+* Zone 3, between Credit and DC -- compliant, no cost;
+* Zone 4, below Credit -- the surplus below the Credit line earns tradeable units.
+
+Deficits and surpluses are in tCO2eq (energy GJ x gCO2eq/MJ gap / 1000) and priced with the
+compliance_prices reference table. All functions broadcast, so a batch of scenarios and a
+range of years are assessed in one pass; years outside the trajectory carry no obligation.
+"""
+from typing import NamedTuple
+
+import numpy as np
+
+from fuel_config import GFI_LINES, REFERENCE_STORE
+
+ZONE_LABELS = {
+    0: "No obligation",
+    1: "Zone 1: Above GFI Base",
+    2: "Zone 2: Penalty Zone",
+    3: "Zone 3: Compliant",
+    4: "Zone 4: Credit Earning",
+}
+
+GFI_DECIMALS = 6
+
+_prices = REFERENCE_STORE.table("compliance_prices")
+# Remedial unit prices and surplus unit value, USD/tCO2eq.
+COMPLIANCE_PRICES_USD_T = dict(zip(_prices["unit"].tolist(), _prices["price_usd_per_tco2eq"].tolist()))
+
+
+class ComplianceResults(NamedTuple):
+    years: np.ndarray            # (Y,)
+    gfi: np.ndarray              # (..., Y) attained GFI, gCO2eq/MJ
+    zone: np.ndarray             # (..., Y) int8, ZONE_LABELS key
+    tier1_deficit_t: np.ndarray  # (..., Y) tCO2eq
+    tier2_deficit_t: np.ndarray  # (..., Y) tCO2eq
+    surplus_t: np.ndarray        # (..., Y) tCO2eq
+    cost: np.ndarray             # (..., Y) USD/year; penalties positive, credits negative
+
+
+def gfi_trajectory():
+    """(years, {line name: values}) as read-only views of the gfi_trajectory table."""
+    table = REFERENCE_STORE.table("gfi_trajectory")
+    return table["Year"], {name: table[name] for name in table if name != "Year"}
+
+
+def gfi_limits(year):
+    """GFI Base/DC/Credit values for ``year`` (linearly interpolated, clamped to the table)."""
+    years, lines = gfi_trajectory()
+    return {name: float(np.interp(year, years, values)) for name, values in lines.items()}
+
+
+def compliance_years():
+    years, _ = gfi_trajectory()
+    return np.arange(int(years[0]), int(years[-1]) + 1)
+
+
+def limit_arrays(years):
+    """(base, dc, credit, in_force) arrays over ``years``."""
+    trajectory_years, lines = gfi_trajectory()
+    years = np.asarray(years)
+    base, dc, credit = (np.interp(years, trajectory_years, lines[GFI_LINES[line]])
+                        for line in ("Base", "DC", "Credit"))
+    in_force = (years >= trajectory_years[0]) & (years <= trajectory_years[-1])
+    return base, dc, credit, in_force
+
+
+def fleet_gfi(fuel_mix, emission_factors):
+    """Attained GFI (gCO2eq/MJ) of (..., F) fuel mixes in percent."""
+    return np.asarray(fuel_mix, dtype=float) @ np.asarray(emission_factors, dtype=float) / 100.0
+
+
+def assess_compliance(gfi, energy_gj, years, prices=None):
+    """Zones, deficits/surplus and cost for attained ``gfi`` over ``years``.
+
+    ``gfi`` and ``energy_gj`` broadcast against the (Y,) year axis: pass (N, 1) to hold a
+    scenario's mix constant across all years, or (N, Y) / (Y,) for year-by-year values.
+    """
+    prices = {**COMPLIANCE_PRICES_USD_T, **(prices or {})}
+    years = np.atleast_1d(years)
+    base, dc, credit, in_force = limit_arrays(years)
+    # Rounded so a mix sitting exactly on a line (e.g. an optimized one) is not charged rounding dust
+    gfi = np.round(np.asarray(gfi, dtype=float), GFI_DECIMALS)
+    gfi, energy_gj, _ = np.broadcast_arrays(gfi, np.asarray(energy_gj, dtype=float), years)
+
+    tonnes_per_unit = np.where(in_force, energy_gj / 1000.0, 0.0)  # GJ x gCO2eq/MJ -> tCO2eq
+    tier2 = np.maximum(gfi - base, 0.0) * tonnes_per_unit
+    tier1 = np.maximum(np.minimum(gfi, base) - dc, 0.0) * tonnes_per_unit
+    surplus = np.maximum(credit - gfi, 0.0) * tonnes_per_unit
+    zone = np.select([~in_force, gfi > base, gfi > dc, gfi >= credit], [0, 1, 2, 3], default=4).astype(np.int8)
+    cost = (tier1 * prices["tier1_remedial"] + tier2 * prices["tier2_remedial"]
+            - surplus * prices["surplus"])
+    return ComplianceResults(years, gfi, zone, tier1, tier2, surplus, cost)
+
+
+def assess_batch(tables, batch, fuel_mix, years=None, prices=None):
+    """Compliance of every scenario in a batch, for ``years`` (default: the batch year).
+
+    Returns (N, Y) results, each scenario's mix and consumption held constant over ``years``.
+    """
+    gfi = fleet_gfi(np.atleast_2d(fuel_mix), tables.emission_factors)
+    years = np.atleast_1d(tables.year if years is None else years)
+    return assess_compliance(gfi[:, None], batch.total_consumption[:, None], years, prices)
@@ -0,0 +1,88 @@
+"""Configuration shared by the Streamlit app and the headless engine.
+
+The reference tables are loaded from the memory-mapped store in ``reference_store`` (see
+reference_data/manifest.json) and exposed here under their historical names. Kept free of
+Streamlit imports so scripts and services can use it directly.
+"""
+import numpy as np
+
+from reference_store import get_store
+
+REFERENCE_STORE = get_store()
+
+
+def _by_year(table, key_column, value_column, cast=float):
+    """``{year: {key: value}}`` from a long table, preserving row order within each year."""
+    out = {}
+    for year, key, value in zip(table["year"].tolist(), table[key_column].tolist(), table[value_column].tolist()):
+        out.setdefault(year, {})[key] = cast(value)
+    return out
+
+
+def _calibrated_factors(reference, observed):
+    """Reference consumption factors rescaled to the observed level of each vessel type.
+
+    Each year takes the type's nearest observed year and scales the reference trajectory
+    (interpolated, held flat outside its years) so it passes through the observation; types
+    without observations keep the reference values.
+    """
+    years = sorted(reference)
+    out = {year: dict(factors) for year, factors in reference.items()}
+    for key in {k for factors in observed.values() for k in factors}:
+        seen = sorted(y for y in observed if key in observed[y])
+        trajectory = [reference[y].get(key, 0.0) for y in years]
+        for year in years:
+            nearest = min(seen, key=lambda y: (abs(y - year), -y))
+            at_nearest = float(np.interp(nearest, years, trajectory))
+            out[year][key] = (observed[nearest][key] * out[year].get(key, 0.0) / at_nearest
+                              if at_nearest > 0 else observed[nearest][key])
+    return out
+
+
+# --- Configuration ---
+_fleet = REFERENCE_STORE.table("fleet")
+_fuel_mix = REFERENCE_STORE.table("fuel_mix")
+_base_fuels = REFERENCE_STORE.table("base_fuels")
+_observed_consumption = REFERENCE_STORE.table("consumption_factors")
+_fuel_lhv = REFERENCE_STORE.table("fuel_lhv")
+
+YEAR_OPTIONS = sorted(set(_fleet["year"].tolist()))
+VESSEL_TYPES_OWNED = list(dict.fromkeys(_fleet["vessel_type"].tolist()))
+MILLION = 1_000_000
+
+DEFAULT_OWNED_VESSEL_COUNTS = _by_year(_fleet, "vessel_key", "default_count", int)
+
+FUEL_MIX_CATEGORIES = _by_year(_fuel_mix, "mix_key", "display_name", str)
+DEFAULT_FUEL_MIX = _by_year(_fuel_mix, "mix_key", "default_share_pct")
+# GJ/year per vessel: the reference trajectory, calibrated to the factors derived from noon
+# reports and voyage logs by ``consumption_logs`` where those exist.
+REFERENCE_CONSUMPTION_FACTORS = _by_year(_fleet, "vessel_key", "consumption_factor_gj")
+OBSERVED_CONSUMPTION_FACTORS = _by_year(_observed_consumption, "vessel_key", "consumption_factor_gj")
+VESSEL_CONSUMPTION_FACTORS = _calibrated_factors(REFERENCE_CONSUMPTION_FACTORS, OBSERVED_CONSUMPTION_FACTORS)
+DEFAULT_FUEL_COSTS_GJ = _by_year(_fuel_mix, "mix_key", "cost_usd_gj")
+ALL_FUEL_MIX_KEYS = set().union(*(d.keys() for d in FUEL_MIX_CATEGORIES.values()))
+
+# GFI compliance trajectory columns (gCO2eq/MJ) used for the compliance zones chart and as mix targets.
+GFI_LINES = {"Base": "GFI Base", "DC": "GFI DC", "Credit": "GFI_Credit"}
+
+# Indicative well-to-wake emission factors (gCO2eq/MJ) per fuel-mix base key.
+FUEL_WTW_EMISSION_FACTORS = dict(zip(_base_fuels["base_key"].tolist(), _base_fuels["wtw_gco2eq_mj"].tolist()))
+
+# Projection table row that drives each fuel-mix base key (key without _prod/_proc).
+FUEL_PRICE_PROJECTION_ROWS = {
+    key: row for key, row in zip(_base_fuels["base_key"].tolist(), _base_fuels["price_projection_row"].tolist()) if row
+}
+
+# Engine capability a vessel needs to burn each fuel-mix base key ("" for drop-in fuels).
+FUEL_ENGINE_CAPABILITIES = dict(zip(_base_fuels["base_key"].tolist(), _base_fuels["engine_capability"].tolist()))
+
+# Lower heating values (GJ/tonne) of fuels as named in noon reports and voyage logs.
+FUEL_LHV_GJ_PER_T = dict(zip(_fuel_lhv["fuel"].tolist(), _fuel_lhv["lhv_gj_per_t"].tolist()))
+
+VESSEL_KEYS = [vessel.lower().replace(' ', '_') for vessel in VESSEL_TYPES_OWNED]
+MIX_SUM_TOLERANCE = 0.1  # Allowed deviation (percentage points) of the fuel mix sum from 100%
+
+
+def config_version():
+    """Short hash of every reference table; changes whenever any of them does."""
+    return REFERENCE_STORE.version
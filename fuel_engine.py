@@ -0,0 +1,223 @@
+"""Headless, vectorized fleet fuel cost engine.
+
+All arrays are laid out as scenarios x vessel types (``V``) or scenarios x fuels (``F``),
+so a whole batch of fleet/mix scenarios is scored with a handful of matrix operations.
+Nothing here imports Streamlit.
+"""
+from functools import lru_cache
+from typing import NamedTuple
+
+import numpy as np
+
+from fuel_config import (
+    VESSEL_TYPES_OWNED, VESSEL_KEYS, MILLION, MIX_SUM_TOLERANCE,
+    FUEL_MIX_CATEGORIES, VESSEL_CONSUMPTION_FACTORS, DEFAULT_FUEL_COSTS_GJ,
+    FUEL_WTW_EMISSION_FACTORS, REFERENCE_STORE,
+)
+import fuel_compliance
+
+
+class YearTables(NamedTuple):
+    year: int
+    mix_keys: tuple           # (F,) internal fuel-mix keys, in FUEL_MIX_CATEGORIES order
+    display_names: tuple      # (F,) display names, e.g. "HVO (Procured)"
+    consumption_factors: np.ndarray  # (V,) GJ/year per vessel
+    fuel_costs_gj: np.ndarray        # (F,) USD/GJ
+    produced_mask: np.ndarray        # (F,) 1.0 where the fuel is produced
+    procured_mask: np.ndarray        # (F,) 1.0 where the fuel is procured
+    base_names: tuple                # (B,) base fuel names in first-seen order
+    base_matrix: np.ndarray          # (F, B) one-hot fuel -> base fuel
+    emission_factors: np.ndarray     # (F,) well-to-wake gCO2eq/MJ
+
+
+class BatchResults(NamedTuple):
+    consumption_by_type: np.ndarray  # (N, V) GJ/year
+    total_consumption: np.ndarray    # (N,) GJ/year
+    consumption_by_mix: np.ndarray   # (N, F) GJ/year
+    cost_by_mix: np.ndarray          # (N, F) USD/year
+    total_cost: np.ndarray           # (N,) USD/year
+    produced_cost: np.ndarray        # (N,) USD/year
+    procured_cost: np.ndarray        # (N,) USD/year
+    base_fuel_demand: np.ndarray     # (N, B) GJ/year
+
+
+class ScenarioResults(NamedTuple):
+    """One calculated scenario as small arrays; labels come from ``tables`` (shared, immutable)."""
+    year: int
+    fuel_mix: np.ndarray             # (F,) percent
+    consumption_by_type: np.ndarray  # (V,) GJ/year
+    consumption_by_mix: np.ndarray   # (F,) GJ/year
+    cost_by_mix_musd: np.ndarray     # (F,) Million USD/year
+    base_fuel_demand: np.ndarray     # (B,) GJ/year
+    total_consumption: float         # GJ/year
+    total_cost_musd: float
+    produced_cost_musd: float
+    procured_cost_musd: float
+    fleet_gfi: float                 # gCO2eq/MJ, well-to-wake
+    gfi_zone: int                    # fuel_compliance.ZONE_LABELS key
+    compliance_cost_musd: float      # Penalty minus surplus credit
+
+    @property
+    def tables(self):
+        return get_year_tables(self.year)
+
+    @property
+    def total_cost_incl_compliance_musd(self):
+        return self.total_cost_musd + self.compliance_cost_musd
+
+    def as_dict(self):
+        """The legacy string-keyed ``results`` dict (display names as keys)."""
+        tables = self.tables
+        return {
+            "fleet_consumption_by_type": dict(zip(VESSEL_TYPES_OWNED, self.consumption_by_type.tolist())),
+            "fuel_mix_percentages": dict(zip(tables.display_names, self.fuel_mix.tolist())),
+            "total_annual_consumption": self.total_consumption,
+            "fuel_consumption_by_mix": dict(zip(tables.display_names, self.consumption_by_mix.tolist())),
+            "fuel_cost_by_mix": dict(zip(tables.display_names, self.cost_by_mix_musd.tolist())),
+            "total_fuel_cost_million": self.total_cost_musd,
+            "prod_vs_proc_cost_million": {'Produced': self.produced_cost_musd, 'Procured': self.procured_cost_musd},
+            "base_fuel_demand_gj": dict(zip(tables.base_names, self.base_fuel_demand.tolist())),
+            "fleet_gfi": self.fleet_gfi,
+            "gfi_zone": self.gfi_zone,
+            "compliance_cost_million": self.compliance_cost_musd,
+            "total_cost_incl_compliance_million": self.total_cost_incl_compliance_musd,
+            "calculated_for_year": self.year,
+        }
+
+
+def base_fuel_name(display_name):
+    return display_name.replace(" (Produced)", "").replace(" (Procured)", "")
+
+
+def fuel_base_key(mix_key):
+    return mix_key.rsplit("_", 1)[0]
+
+
+@lru_cache(maxsize=None)
+def price_projection_table():
+    """(years, {fuel name: prices}) from the fuel_price_projections table; missing values are NaN."""
+    table = REFERENCE_STORE.table("fuel_price_projections")
+    value_columns = [c for c in table if c != "Fuel_Name"]
+    years = np.array([int(c) for c in value_columns])
+    matrix = np.column_stack([table[c] for c in value_columns])
+    matrix.setflags(write=False)
+    years.setflags(write=False)
+    return years, dict(zip(table["Fuel_Name"].tolist(), matrix))
+
+
+def build_year_tables(year, mix_categories, consumption_factors, fuel_costs_gj):
+    mix_keys = tuple(mix_categories.keys())
+    display_names = tuple(mix_categories.values())
+    base_names = tuple(dict.fromkeys(base_fuel_name(name) for name in display_names))
+    base_matrix = np.zeros((len(mix_keys), len(base_names)))
+    for i, name in enumerate(display_names):
+        base_matrix[i, base_names.index(base_fuel_name(name))] = 1.0
+
+    arrays = dict(
+        consumption_factors=np.array([consumption_factors.get(k, 0.0) for k in VESSEL_KEYS], dtype=float),
+        fuel_costs_gj=np.array([fuel_costs_gj.get(k, 0.0) for k in mix_keys], dtype=float),
+        produced_mask=np.array(["(Produced)" in name for name in display_names], dtype=float),
+        procured_mask=np.array(["(Procured)" in name for name in display_names], dtype=float),
+        base_matrix=base_matrix,
+        emission_factors=np.array([FUEL_WTW_EMISSION_FACTORS.get(fuel_base_key(k), 0.0) for k in mix_keys], dtype=float),
+    )
+    for arr in arrays.values():
+        arr.setflags(write=False)
+    return YearTables(year=year, mix_keys=mix_keys, display_names=display_names,
+                      base_names=base_names, **arrays)
+
+
+@lru_cache(maxsize=None)
+def get_year_tables(year):
+    mix_categories = FUEL_MIX_CATEGORIES.get(year)
+    consumption_factors = VESSEL_CONSUMPTION_FACTORS.get(year)
+    fuel_costs_gj = DEFAULT_FUEL_COSTS_GJ.get(year)
+    if not mix_categories or not consumption_factors or not fuel_costs_gj:
+        raise KeyError(f"Configuration missing for {year}.")
+    return build_year_tables(year, mix_categories, consumption_factors, fuel_costs_gj)
+
+
+def compute_batch(vessel_counts, fuel_mix, consumption_factors, fuel_costs_gj,
+                  produced_mask, procured_mask, base_matrix):
+    """Score N scenarios at once.
+
+    ``vessel_counts`` is (N, V) and ``fuel_mix`` is (N, F) in percent. Factors and
+    costs may be shared 1-D rows or per-scenario 2-D arrays; they are broadcast.
+    """
+    vessel_counts = np.atleast_2d(np.asarray(vessel_counts, dtype=float))
+    fuel_mix = np.atleast_2d(np.asarray(fuel_mix, dtype=float))
+
+    consumption_by_type = vessel_counts * consumption_factors
+    total_consumption = consumption_by_type.sum(axis=-1)
+    consumption_by_mix = total_consumption[..., None] * (fuel_mix / 100.0)
+    cost_by_mix = consumption_by_mix * fuel_costs_gj
+    return BatchResults(
+        consumption_by_type=consumption_by_type,
+        total_consumption=total_consumption,
+        consumption_by_mix=consumption_by_mix,
+        cost_by_mix=cost_by_mix,
+        total_cost=cost_by_mix.sum(axis=-1),
+        produced_cost=cost_by_mix @ produced_mask,
+        procured_cost=cost_by_mix @ procured_mask,
+        base_fuel_demand=consumption_by_mix @ base_matrix,
+    )
+
+
+def compute_year_batch(year, vessel_counts, fuel_mix, fuel_costs_gj=None, tables=None):
+    tables = tables or get_year_tables(year)
+    costs = tables.fuel_costs_gj if fuel_costs_gj is None else np.asarray(fuel_costs_gj, dtype=float)
+    return compute_batch(vessel_counts, fuel_mix, tables.consumption_factors, costs,
+                         tables.produced_mask, tables.procured_mask, tables.base_matrix)
+
+
+def mix_sums_ok(fuel_mix):
+    fuel_mix = np.asarray(fuel_mix, dtype=float)
+    return np.isclose(fuel_mix.sum(axis=-1), 100.0, atol=MIX_SUM_TOLERANCE)
+
+
+def counts_vector(owned_counts):
+    return np.array([owned_counts.get(k, 0) for k in VESSEL_KEYS], dtype=float)
+
+
+def mix_vector(year, fuel_mix):
+    return np.array([fuel_mix.get(k, 0.0) for k in get_year_tables(year).mix_keys], dtype=float)
+
+
+def scenario_results(tables, batch, fuel_mix, index=0):
+    """Row ``index`` of a batch as ``ScenarioResults`` (copies, so the batch can be freed)."""
+    fuel_mix = np.atleast_2d(np.asarray(fuel_mix, dtype=float))
+    compliance = fuel_compliance.assess_compliance(
+        fuel_compliance.fleet_gfi(fuel_mix[index], tables.emission_factors),
+        batch.total_consumption[index], tables.year,
+    )
+    return ScenarioResults(
+        year=tables.year,
+        fuel_mix=fuel_mix[index].copy(),
+        consumption_by_type=batch.consumption_by_type[index].copy(),
+        consumption_by_mix=batch.consumption_by_mix[index].copy(),
+        cost_by_mix_musd=batch.cost_by_mix[index] / MILLION,
+        base_fuel_demand=batch.base_fuel_demand[index].copy(),
+        total_consumption=float(batch.total_consumption[index]),
+        total_cost_musd=float(batch.total_cost[index] / MILLION),
+        produced_cost_musd=float(batch.produced_cost[index] / MILLION),
+        procured_cost_musd=float(batch.procured_cost[index] / MILLION),
+        fleet_gfi=float(compliance.gfi[0]),
+        gfi_zone=int(compliance.zone[0]),
+        compliance_cost_musd=float(compliance.cost[0]) / MILLION,
+    )
+
+
+def results_dict(tables, batch, fuel_mix, index=0):
+    """Row ``index`` of a batch in the legacy string-keyed ``results`` structure."""
+    return scenario_results(tables, batch, fuel_mix, index).as_dict()
+
+
+def compute_results(year, owned_counts, fuel_mix):
+    """Single-scenario convenience wrapper returning ``ScenarioResults``.
+
+    ``owned_counts`` is keyed by VESSEL_KEYS and ``fuel_mix`` by fuel-mix key (percent).
+    """
+    tables = get_year_tables(year)
+    mix = mix_vector(year, fuel_mix)
+    batch = compute_year_batch(year, counts_vector(owned_counts), mix, tables=tables)
+    return scenario_results(tables, batch, mix)
@@ -0,0 +1,8 @@
+"""Number formatting shared by the app and anything that renders its figures."""
+import math
+
+
+def format_value(value, sig_figs=3):
+    if value is None or math.isnan(value) or abs(value) < 1e-9: return "0.00"
+    try: return f"{value:.{sig_figs}g}"
+    except (ValueError, TypeError): return str(value)
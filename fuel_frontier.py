@@ -0,0 +1,158 @@
+"""Cost-vs-GFI Pareto frontier over the fuel-mix simplex of a year.
+
+A mix's cost per GJ (``p . m / 100``) and GFI (``e . m / 100``) are both linear in the
+shares, so every feasible mix maps into the convex hull of the individual fuels in the
+(GFI, cost) plane and the frontier is its lower-left boundary. It is found in two steps:
+
+* sampling -- Dirichlet draws over the simplex in fixed-size chunks (so millions of
+  candidates need bounded memory), reduced after each chunk by an O(n log n)
+  non-dominated filter;
+* refinement -- the frontier's extreme points, solved exactly with the LP in
+  ``fuel_optimizer`` by weighted-sum bisection (each weight is the slope of the chord
+  between two known extreme points; a cheaper point below the chord is a new one). The
+  frontier is piecewise linear between them, and samples that fall on or above it are
+  dropped, so the result is exact even under availability caps.
+
+Only frontier mixes are kept, so any point can be loaded back into the inputs.
+"""
+from typing import NamedTuple
+
+import numpy as np
+
+import fuel_engine
+import fuel_optimizer
+
+DEFAULT_SAMPLES = 200_000
+DEFAULT_CHUNK = 100_000
+DEFAULT_SEGMENT_POINTS = 8  # Blended mixes shown between neighbouring extreme points
+_DIRICHLET_ALPHAS = (1.0, 0.3, 0.1)  # Flat, sparse and near-vertex draws
+
+
+class Frontier(NamedTuple):
+    year: int
+    mix_keys: tuple
+    gfi: np.ndarray           # (K,) gCO2eq/MJ, ascending
+    cost_per_gj: np.ndarray   # (K,) USD/GJ, descending
+    mixes: np.ndarray         # (K, F) percent
+    from_lp: np.ndarray       # (K,) bool, exact (LP vertex or blend of two) rather than a sample
+    n_candidates: int         # mixes evaluated (sampled + LP)
+    cloud_gfi: np.ndarray     # (S,) a subsample of the candidates, for display
+    cloud_cost_per_gj: np.ndarray
+
+
+def pareto_mask(gfi, cost):
+    """Points not dominated in (lower GFI, lower cost); O(n log n) via a sort and a running minimum."""
+    gfi = np.asarray(gfi, dtype=float)
+    cost = np.asarray(cost, dtype=float)
+    order = np.lexsort((cost, gfi))
+    sorted_cost = cost[order]
+    best_before = np.minimum.accumulate(np.concatenate([[np.inf], sorted_cost[:-1]]))
+    mask = np.zeros(len(gfi), dtype=bool)
+    mask[order] = sorted_cost < best_before
+    return mask
+
+
+def _feasible(mixes, caps, produced_mask, produced_share):
+    produced = mixes @ produced_mask
+    return ((mixes <= caps + 1e-9).all(axis=1)
+            & (produced >= produced_share[0] - 1e-9) & (produced <= produced_share[1] + 1e-9))
+
+
+def _extreme_mixes(year, tables, costs, availability_caps, produced_share):
+    """Mixes at the frontier's extreme points, ordered by ascending GFI ((0, F) if infeasible)."""
+    def solve(weight, gfi_target=None, objective=None):
+        try:
+            result = fuel_optimizer.optimize_fuel_mix(
+                year, gfi_line=None, gfi_target=gfi_target, availability_caps=availability_caps,
+                produced_share=produced_share,
+                fuel_costs_gj=costs + weight * tables.emission_factors if objective is None else objective)
+        except ValueError:
+            return None
+        mix = np.array([result.fuel_mix[k] for k in tables.mix_keys])
+        return mix, float(mix @ tables.emission_factors / 100.0), float(mix @ costs / 100.0)
+
+    cheapest = solve(1e-9)
+    if cheapest is None:
+        return np.empty((0, len(tables.mix_keys)))
+    min_gfi = solve(None, objective=tables.emission_factors)[1]
+    cleanest = solve(0.0, gfi_target=min_gfi + 1e-9)
+    points = [cleanest, cheapest]
+    segments = [(0, 1)] if cleanest[1] < cheapest[1] - 1e-9 else []
+    while segments:
+        i, j = segments.pop()
+        (_, left_gfi, left_cost), (_, right_gfi, right_cost) = points[i], points[j]
+        slope = (left_cost - right_cost) / (right_gfi - left_gfi)
+        candidate = solve(slope)
+        if candidate and candidate[2] + slope * candidate[1] < left_cost + slope * left_gfi - 1e-9:
+            points.append(candidate)
+            segments += [(i, len(points) - 1), (len(points) - 1, j)]
+    if len(points) == 2 and not cleanest[1] < cheapest[1] - 1e-9:
+        points = [cheapest]
+    return np.array([mix for mix, _, _ in sorted(points, key=lambda p: p[1])])
+
+
+def _blend(vertices, per_segment):
+    """Vertices plus ``per_segment`` evenly spaced blends on each segment between neighbours."""
+    if len(vertices) < 2:
+        return vertices
+    t = np.linspace(0.0, 1.0, per_segment + 2)[:-1, None, None]
+    blends = (1 - t) * vertices[:-1] + t * vertices[1:]          # (per_segment + 1, S, F)
+    return np.vstack([blends.transpose(1, 0, 2).reshape(-1, vertices.shape[1]), vertices[-1:]])
+
+
+def pareto_frontier(year, n_samples=DEFAULT_SAMPLES, availability_caps=None, produced_share=(0.0, 100.0),
+                    fuel_costs_gj=None, segment_points=DEFAULT_SEGMENT_POINTS, chunk=DEFAULT_CHUNK, seed=0,
+                    cloud_size=5_000):
+    """Sample ``n_samples`` mixes for ``year`` and return the refined cost-vs-GFI Frontier.
+
+    ``availability_caps`` and ``produced_share`` restrict the mixes as in
+    ``fuel_optimizer.optimize_fuel_mix``; infeasible samples are discarded.
+    """
+    tables = fuel_engine.get_year_tables(year)
+    costs = tables.fuel_costs_gj if fuel_costs_gj is None else np.asarray(fuel_costs_gj, dtype=float)
+    caps = np.array([float((availability_caps or {}).get(k, 100.0)) for k in tables.mix_keys])
+    rng = np.random.default_rng(seed)
+    n_fuels = len(tables.mix_keys)
+
+    best_mix = np.empty((0, n_fuels))
+    cloud = []
+    n_candidates = 0
+    for start in range(0, n_samples, chunk):
+        size = min(chunk, n_samples - start)
+        alpha = _DIRICHLET_ALPHAS[(start // chunk) % len(_DIRICHLET_ALPHAS)]
+        mixes = rng.dirichlet(np.full(n_fuels, alpha), size) * 100.0
+        mixes = mixes[_feasible(mixes, caps, tables.produced_mask, produced_share)]
+        n_candidates += len(mixes)
+        cloud.append(mixes[:max(1, cloud_size * size // n_samples)])
+        mixes = np.vstack([best_mix, mixes])
+        best_mix = mixes[pareto_mask(mixes @ tables.emission_factors, mixes @ costs)]
+
+    lp_mix = _extreme_mixes(year, tables, costs, availability_caps, produced_share)
+    n_candidates += len(lp_mix)
+    if len(lp_mix):
+        # Blends of two feasible mixes are feasible, so the chords between the frontier's
+        # extreme points are attainable: samples on or above them are dominated.
+        lp_gfi, lp_cost = lp_mix @ tables.emission_factors / 100.0, lp_mix @ costs / 100.0
+        sample_gfi = best_mix @ tables.emission_factors / 100.0
+        chord = np.interp(sample_gfi, lp_gfi, lp_cost, left=np.inf, right=np.inf)
+        best_mix = best_mix[best_mix @ costs / 100.0 < chord - 1e-9]
+        lp_mix = _blend(lp_mix, segment_points)
+
+    mixes = np.vstack([best_mix, lp_mix])
+    from_lp = np.arange(len(mixes)) >= len(best_mix)
+    gfi = mixes @ tables.emission_factors / 100.0
+    cost = mixes @ costs / 100.0
+    keep = pareto_mask(np.round(gfi, 9), np.round(cost, 9))
+    order = np.flatnonzero(keep)[np.argsort(gfi[keep], kind="stable")]
+    cloud = np.vstack(cloud) if cloud else np.empty((0, n_fuels))
+    return Frontier(
+        year=year,
+        mix_keys=tables.mix_keys,
+        gfi=gfi[order],
+        cost_per_gj=cost[order],
+        mixes=mixes[order],
+        from_lp=from_lp[order],
+        n_candidates=n_candidates,
+        cloud_gfi=cloud @ tables.emission_factors / 100.0,
+        cloud_cost_per_gj=cloud @ costs / 100.0,
+    )
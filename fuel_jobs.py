@@ -0,0 +1,423 @@
+"""Background scenario sweeps on a shared, bounded worker pool.
+
+A job is split into fixed-size work units (chunks of scenarios) that run on a process pool,
+so sweeps never block a Streamlit script thread and CPU-heavy work does not contend for
+the server's GIL. The workers run at a lower OS priority and take at most
+``max_workers`` units at a time, dispatched round-robin across jobs: a million-scenario
+sweep shares the pool with everyone else's jobs instead of queueing ahead of them.
+
+Each unit writes its scored rows to ``<jobs dir>/<job id>/unit_<n>.pkl`` and reports a
+small summary, so progress and partial results are available while the job runs and any
+session (or a restarted server) can fetch a job by id. Cancelling stops dispatching new
+units; resuming runs only the units that have not finished. Jobs left running when the
+process exited are reloaded as ``interrupted`` and can be resumed. Beyond ``max_jobs`` the
+oldest completed, cancelled or failed jobs and their files are removed, then, if there are
+still too many, the oldest interrupted ones.
+
+Units are pickled, so the jobs directory must be private to the server's user: the default
+is ``<temp dir>/fuel_supplier_jobs-<uid>``, and any directory is created with mode 0700 and
+refused if another user owns it or can write to it (``private_dirs.private_dir``).
+
+Sweep kinds (``SWEEP_KINDS``):
+
+* ``price_sweep`` -- one year's fleet and mix under ``n_scenarios`` random fuel prices,
+  each drawn uniformly within ±``price_range_pct`` of the reference price (seeded per unit,
+  so a resumed sweep draws the same scenarios);
+* ``scenario_file`` -- an uploaded ``fuel_batch`` scenario file (any mix of years), scored
+  with ``fuel_batch.score_scenarios``.
+"""
+import functools
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from fuel_config import MILLION, VESSEL_KEYS
+import fuel_batch
+import fuel_compliance
+import fuel_engine
+from private_dirs import private_dir, user_dir
+
+SWEEP_KINDS = ("price_sweep", "scenario_file")
+STATES = ("running", "completed", "cancelled", "interrupted", "failed")
+FINISHED_STATES = ("completed", "cancelled", "failed")  # Pruned first; interrupted jobs await a resume
+DEFAULT_UNIT_ROWS = 100_000
+MAX_JOBS = 64  # Finished jobs kept (with their files) before the oldest are removed
+WORKER_NICENESS = 10  # Sweep workers yield the CPU to the app's script threads
+_SUMMARY_COLUMN = "total_cost_incl_compliance_musd"
+
+
+class JobStatus(NamedTuple):
+    job_id: str
+    kind: str
+    label: str
+    state: str              # STATES entry
+    units_done: int
+    n_units: int
+    rows: int               # scenarios scored so far
+    invalid: int            # scenario_file rows that failed validation
+    cost_mean_musd: float   # over valid scored rows, total incl. compliance; nan until any are scored
+    cost_min_musd: float
+    cost_max_musd: float
+    zone_counts: dict       # fuel_compliance.ZONE_LABELS key -> scenarios
+    created: float          # epoch seconds
+    error: str
+
+    @property
+    def progress(self):
+        return self.units_done / self.n_units if self.n_units else 1.0
+
+
+def _write_json(path, payload):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(payload, f)
+    os.replace(tmp, path)
+
+
+# --- Work units (run in the worker processes) ---
+def _lower_priority():
+    try:
+        os.nice(WORKER_NICENESS)
+    except (AttributeError, OSError):
+        pass
+
+
+def _price_sweep_unit(job_dir, params, unit):
+    start = unit * params["unit_rows"]
+    n = min(params["unit_rows"], params["n_scenarios"] - start)
+    year = params["year"]
+    tables = fuel_engine.get_year_tables(year)
+    rng = np.random.default_rng([params["seed"], unit])
+    spread = params["price_range_pct"] / 100.0
+    prices = tables.fuel_costs_gj * rng.uniform(1.0 - spread, 1.0 + spread, (n, len(tables.mix_keys)))
+    counts = np.broadcast_to(np.asarray(params["vessel_counts"], dtype=float), (n, len(VESSEL_KEYS)))
+    mix = np.broadcast_to(np.asarray(params["fuel_mix"], dtype=float), (n, len(tables.mix_keys)))
+    batch = fuel_engine.compute_year_batch(year, counts, mix, fuel_costs_gj=prices, tables=tables)
+    compliance = fuel_compliance.assess_batch(tables, batch, mix)
+    frame = pd.DataFrame({f"price_{k}": prices[:, i] for i, k in enumerate(tables.mix_keys)})
+    frame.insert(0, "scenario", np.arange(start, start + n))
+    frame["total_cost_musd"] = batch.total_cost / MILLION
+    frame["fleet_gfi"] = compliance.gfi[:, 0]
+    frame["gfi_zone"] = compliance.zone[:, 0]
+    frame["compliance_cost_musd"] = compliance.cost[:, 0] / MILLION
+    frame[_SUMMARY_COLUMN] = frame["total_cost_musd"] + frame["compliance_cost_musd"]
+    return frame
+
+
+def _scenario_file_unit(job_dir, params, unit):
+    return fuel_batch.score_scenarios(pd.read_pickle(os.path.join(job_dir, f"input_{unit}.pkl")))
+
+
+_UNIT_FUNCTIONS = {"price_sweep": _price_sweep_unit, "scenario_file": _scenario_file_unit}
+
+
+def run_unit(job_dir, kind, params, unit):
+    """Score one unit, write its rows to the job directory and return its summary."""
+    frame = _UNIT_FUNCTIONS[kind](job_dir, params, unit)
+    frame.to_pickle(os.path.join(job_dir, f"unit_{unit}.pkl"))
+    valid = frame[frame["status"] == "ok"] if "status" in frame else frame
+    cost = valid[_SUMMARY_COLUMN].to_numpy()
+    zones = valid["gfi_zone"].value_counts()
+    return {
+        "rows": len(frame),
+        "invalid": len(frame) - len(valid),
+        "cost_sum": float(cost.sum()),
+        "cost_min": float(cost.min()) if cost.size else None,
+        "cost_max": float(cost.max()) if cost.size else None,
+        "zones": {str(zone): int(count) for zone, count in zones.items()},
+    }
+
+
+# --- Runner ---
+class _Job:
+    def __init__(self, record, job_dir):
+        self.record = record      # JSON-serialisable state, persisted as job.json
+        self.dir = job_dir
+        self.pending = deque()    # units not yet dispatched
+        self.in_flight = {}       # unit -> Future
+
+    @property
+    def id(self):
+        return self.record["id"]
+
+    def queue_remaining(self):
+        done = set(map(int, self.record["units"]))
+        self.pending = deque(u for u in range(self.record["n_units"]) if u not in done and u not in self.in_flight)
+
+    def save(self):
+        _write_json(os.path.join(self.dir, "job.json"), self.record)
+
+
+class JobRunner:
+    """Process-wide job queue; safe to share between sessions and threads."""
+
+    def __init__(self, jobs_dir=None, max_workers=None, max_jobs=MAX_JOBS):
+        self.jobs_dir = private_dir(jobs_dir or user_dir("fuel_supplier_jobs"))
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 1) - 1)
+        self.max_jobs = max_jobs
+        self._lock = threading.RLock()  # Future callbacks may run while submit holds it
+        self._pool = None
+        self._order = deque()           # running job ids, rotated for round-robin dispatch
+        self._jobs = {}
+        self._load()
+
+    def _load(self):
+        for name in sorted(os.listdir(self.jobs_dir)):
+            try:
+                with open(os.path.join(self.jobs_dir, name, "job.json")) as f:
+                    record = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if record["state"] == "running":
+                record["state"] = "interrupted"
+            self._jobs[record["id"]] = _Job(record, os.path.join(self.jobs_dir, name))
+        self._prune()
+
+    def _prune(self):
+        by_age = sorted(self._jobs.values(), key=lambda job: job.record["created"])
+        finished = [job for job in by_age if job.record["state"] in FINISHED_STATES]
+        interrupted = [job for job in by_age if job.record["state"] == "interrupted"]
+        for job in (finished + interrupted)[:max(0, len(self._jobs) - self.max_jobs)]:
+            del self._jobs[job.id]
+            shutil.rmtree(job.dir, ignore_errors=True)
+
+    def _executor(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_lower_priority)
+        return self._pool
+
+    def _in_flight(self):
+        return sum(len(job.in_flight) for job in self._jobs.values())
+
+    def _dispatch(self):
+        """Fill free worker slots, one unit per running job in turn."""
+        with self._lock:
+            while self._order and self._in_flight() < self.max_workers:
+                job = self._jobs[self._order[0]]
+                self._order.rotate(-1)
+                if job.record["state"] != "running" or not job.pending:
+                    self._order.remove(job.id)
+                    continue
+                unit = job.pending.popleft()
+                try:
+                    future = self._executor().submit(run_unit, job.dir, job.record["kind"], job.record["params"], unit)
+                except BrokenProcessPool:
+                    self._pool = None
+                    job.pending.appendleft(unit)
+                    continue
+                except RuntimeError:  # The pool was shut down (server stopping); resumable later
+                    job.pending.appendleft(unit)
+                    return
+                job.in_flight[unit] = future
+                future.add_done_callback(functools.partial(self._unit_done, job, unit))
+
+    def _unit_done(self, job, unit, future):
+        with self._lock:
+            job.in_flight.pop(unit, None)
+            record = job.record
+            if future.cancelled():
+                pass
+            elif future.exception() is not None:
+                if isinstance(future.exception(), BrokenProcessPool):
+                    self._pool = None
+                record["state"] = "failed"
+                record["error"] = f"unit {unit}: {future.exception()!r}"
+                for pending in job.in_flight.values():
+                    pending.cancel()
+            else:
+                record["units"][str(unit)] = future.result()
+                if len(record["units"]) == record["n_units"]:
+                    record["state"] = "completed"
+                    record["finished"] = time.time()
+            job.save()
+            self._dispatch()
+
+    def _start(self, job):
+        job.record["state"] = "running"
+        job.record["error"] = ""
+        job.queue_remaining()
+        job.save()
+        if job.id not in self._order:
+            self._order.append(job.id)
+        self._dispatch()
+
+    def _new_job(self, kind, label, params, n_units):
+        job_id = uuid.uuid4().hex[:12]
+        job_dir = os.path.join(self.jobs_dir, job_id)
+        os.makedirs(job_dir)
+        record = {"id": job_id, "kind": kind, "label": label, "params": params, "n_units": n_units,
+                  "state": "running", "units": {}, "created": time.time(), "error": ""}
+        return _Job(record, job_dir)
+
+    # --- Submitting ---
+    def submit_price_sweep(self, year, vessel_counts, fuel_mix, n_scenarios, price_range_pct, seed=0,
+                           unit_rows=DEFAULT_UNIT_ROWS, label=None):
+        """Queue a price sweep; ``vessel_counts``/``fuel_mix`` are ``{key: value}`` dicts. Returns the job id."""
+        tables = fuel_engine.get_year_tables(year)
+        mix = fuel_engine.mix_vector(year, fuel_mix)
+        if not fuel_engine.mix_sums_ok(mix):
+            raise ValueError("Fuel mix must sum to 100%.")
+        if n_scenarios < 1 or not 0 <= price_range_pct < 100:
+            raise ValueError("A sweep needs at least one scenario and a price range below 100%.")
+        params = {"year": int(year), "vessel_counts": fuel_engine.counts_vector(vessel_counts).tolist(),
+                  "fuel_mix": mix.tolist(), "n_scenarios": int(n_scenarios),
+                  "price_range_pct": float(price_range_pct), "seed": int(seed), "unit_rows": int(unit_rows),
+                  "mix_keys": list(tables.mix_keys)}
+        label = label or f"{year} price sweep: {n_scenarios:,} scenarios, ±{price_range_pct:g}%"
+        job = self._new_job("price_sweep", label, params, -(-int(n_scenarios) // int(unit_rows)))
+        with self._lock:
+            self._jobs[job.id] = job
+            self._start(job)
+            self._prune()
+        return job.id
+
+    def submit_scenario_file(self, data, name, unit_rows=DEFAULT_UNIT_ROWS, label=None):
+        """Queue scoring of an uploaded ``fuel_batch`` scenario file (CSV or Parquet bytes). Returns the job id."""
+        job = self._new_job("scenario_file", label or f"Scenario file: {name}", {"unit_rows": int(unit_rows)}, 0)
+        input_path = os.path.join(job.dir, "input.parquet" if fuel_batch._is_parquet(name) else "input.csv")
+        try:
+            with open(input_path, "wb") as f:
+                f.write(data)
+            for unit, chunk in enumerate(fuel_batch.read_scenario_chunks(input_path, unit_rows)):
+                chunk.to_pickle(os.path.join(job.dir, f"input_{unit}.pkl"))
+                job.record["n_units"] = unit + 1
+        except BaseException:
+            shutil.rmtree(job.dir, ignore_errors=True)  # Without job.json it would never be loaded or pruned
+            raise
+        with self._lock:
+            self._jobs[job.id] = job
+            self._start(job)
+            self._prune()
+        return job.id
+
+    # --- Control ---
+    def _job(self, job_id):
+        try:
+            return self._jobs[job_id]
+        except KeyError:
+            raise KeyError(f"No job with id {job_id!r}.") from None
+
+    def cancel(self, job_id):
+        """Stop dispatching the job's units; units already running finish and are kept."""
+        with self._lock:
+            job = self._job(job_id)
+            if job.record["state"] != "running":
+                return
+            job.record["state"] = "cancelled"
+            job.pending.clear()
+            for future in list(job.in_flight.values()):
+                future.cancel()
+            job.save()
+
+    def resume(self, job_id):
+        """Run a cancelled, interrupted or failed job's unfinished units."""
+        with self._lock:
+            job = self._job(job_id)
+            if job.record["state"] in ("cancelled", "interrupted", "failed"):
+                self._start(job)
+
+    def shutdown(self):
+        """Cancel queued units and stop the pool (running jobs are resumable after a restart)."""
+        with self._lock:
+            for job in self._jobs.values():
+                job.pending.clear()
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    # --- Results ---
+    def status(self, job_id):
+        with self._lock:
+            record = dict(self._job(job_id).record)
+            units = list(record["units"].values())
+        rows = sum(u["rows"] for u in units)
+        invalid = sum(u["invalid"] for u in units)
+        lows = [u["cost_min"] for u in units if u["cost_min"] is not None]
+        highs = [u["cost_max"] for u in units if u["cost_max"] is not None]
+        zones = {}
+        for u in units:
+            for zone, count in u["zones"].items():
+                zones[int(zone)] = zones.get(int(zone), 0) + count
+        return JobStatus(
+            job_id=record["id"], kind=record["kind"], label=record["label"], state=record["state"],
+            units_done=len(units), n_units=record["n_units"], rows=rows, invalid=invalid,
+            cost_mean_musd=sum(u["cost_sum"] for u in units) / (rows - invalid) if rows > invalid else float("nan"),
+            cost_min_musd=min(lows, default=float("nan")), cost_max_musd=max(highs, default=float("nan")),
+            zone_counts=dict(sorted(zones.items())), created=record["created"], error=record["error"],
+        )
+
+    def jobs(self):
+        """Statuses of every known job, newest first."""
+        with self._lock:
+            ids = sorted(self._jobs, key=lambda i: -self._jobs[i].record["created"])
+        return [self.status(job_id) for job_id in ids]
+
+    def _finished_units(self, job_id):
+        with self._lock:
+            job = self._job(job_id)
+            return job, sorted(map(int, job.record["units"]))
+
+    def iter_results(self, job_id):
+        """Scored rows of the finished units, one unit's frame at a time, in scenario order."""
+        job, units = self._finished_units(job_id)
+        for unit in units:
+            yield pd.read_pickle(os.path.join(job.dir, f"unit_{unit}.pkl"))
+
+    def results(self, job_id):
+        """All scored rows of the finished units (partial while the job runs).
+
+        Holds the whole job in memory; large sweeps should go through ``iter_results``.
+        """
+        frames = list(self.iter_results(job_id))
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def iter_scenarios(self, job_id):
+        """Valid scored scenarios with their inputs in the ``fuel_batch`` layout, one unit's frame at a time."""
+        job, units = self._finished_units(job_id)
+        kind, params = job.record["kind"], job.record["params"]
+        for unit in units:
+            scored = pd.read_pickle(os.path.join(job.dir, f"unit_{unit}.pkl"))
+            if kind == "price_sweep":
+                inputs = pd.DataFrame({"year": params["year"], **dict(zip(VESSEL_KEYS, params["vessel_counts"])),
+                                       **dict(zip(params["mix_keys"], params["fuel_mix"]))}, index=scored.index)
+                scored = scored.rename(columns={f"price_{k}": f"cost_{k}" for k in params["mix_keys"]})
+            else:
+                inputs = pd.read_pickle(os.path.join(job.dir, f"input_{unit}.pkl")).rename(columns=fuel_batch._normalize_column)
+                inputs = inputs.reindex(columns=[c for c in inputs if c in ("year", *VESSEL_KEYS, *fuel_batch.MIX_KEYS)])
+                scored = scored[scored["status"] == "ok"].drop(columns=["row", "year", "status", "error"])
+            yield inputs.join(scored, how="inner")
+
+    def scenarios(self, job_id):
+        """All of ``iter_scenarios`` (e.g. for ``scenario_store``) in one frame; holds the whole job in memory."""
+        frames = list(self.iter_scenarios(job_id))
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def nsmallest(frames, n, column=_SUMMARY_COLUMN):
+    """The ``n`` rows of ``frames`` with the smallest ``column``, reduced one frame at a time.
+
+    Equal to ``pd.concat(frames).nsmallest(n, column)`` (with a fresh index) while holding at
+    most ``n`` rows plus one frame.
+    """
+    kept = None
+    for frame in frames:
+        combined = frame if kept is None else pd.concat([kept, frame], ignore_index=True)
+        kept = combined.nsmallest(n, column).reset_index(drop=True)
+    return kept if kept is not None else pd.DataFrame()
+
+
+def write_csv(frames, f):
+    """Write ``frames`` as one CSV (header from the first) to the text file ``f``, one frame at a time."""
+    for i, frame in enumerate(frames):
+        frame.to_csv(f, header=i == 0, index=False)
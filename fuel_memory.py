@@ -0,0 +1,120 @@
+"""Per-session memory harness: bytes each browser session holds and how many fit in a RAM budget.
+
+    python fuel_memory.py [--sessions 10] [--workflow calculate] [--ram-gb 8] [-o memory_report.json]
+
+Runs ``--sessions`` independent app sessions through Streamlit's AppTest harness, each
+taking the same workflow (``load``, ``calculate`` or ``explore``), and keeps only their
+session state alive afterwards, as the server does between a user's reruns. It reports:
+
+* ``state_bytes`` -- deep size of one session's ``st.session_state``, with its largest keys;
+* ``retained_bytes`` -- traced heap growth per live session (session state, widget metadata,
+  fragments), measured with ``tracemalloc``; allocations only the test harness makes (its
+  own compiled copy of the script, queued messages, element tree) are excluded;
+* ``shared_rss_bytes`` -- process RSS after a warm-up session, i.e. code, reference tables
+  and the shared, bounded caches every session reuses;
+* ``max_sessions`` -- sessions that fit in ``--ram-gb`` next to the shared memory.
+
+Every session computes the same inputs, so shared caches are filled once by the warm-up
+session and only per-session growth is counted.
+"""
+import argparse
+import datetime
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+from fuel_config import YEAR_OPTIONS
+import instrumentation
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "FuelSupplier.py")
+TRACE_DEPTH = 64
+# A server compiles the script once for all sessions and streams messages out; AppTest does neither
+HARNESS_ONLY = [tracemalloc.Filter(False, pattern, all_frames=True) for pattern in (
+    "*/scriptrunner/script_cache.py", "*/runtime/forward_msg_queue.py", "*/testing/v1/element_tree.py",
+)]
+
+
+def _click(at, label):
+    return next(b for b in at.button if b.label == label).click().run()
+
+
+WORKFLOWS = {
+    "load": [],
+    "calculate": [lambda at: _click(at, "Run Calculation")],
+    "explore": [
+        lambda at: _click(at, "Run Calculation"),
+        lambda at: at.selectbox(key="selected_year").set_value(YEAR_OPTIONS[-1]).run(),
+        lambda at: _click(at, "Run Calculation"),
+        lambda at: at.toggle(key="live_mode").set_value(True).run(),
+    ],
+}
+
+
+def run_session(workflow):
+    """Run one session through ``workflow``; returns its SafeSessionState."""
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(APP_PATH, default_timeout=300).run()
+    for step in [lambda at: at, *WORKFLOWS[workflow]]:
+        at = step(at)
+        if at.exception:
+            raise RuntimeError(f"App raised during the {workflow!r} workflow: {at.exception}")
+    return at.session_state._state  # What the server keeps per session once the script run has finished
+
+
+def measure_sessions(sessions=10, workflow="calculate", ram_budget_bytes=8 * 2**30):
+    """Per-session footprint and the concurrency ``ram_budget_bytes`` supports; returns a report dict."""
+    run_session(workflow)  # Warm-up: imports, reference tables, shared caches
+    gc.collect()
+    shared_rss = instrumentation.process_rss_bytes()
+
+    tracemalloc.start(TRACE_DEPTH)
+    gc.collect()
+    before = tracemalloc.take_snapshot().filter_traces(HARNESS_ONLY)
+    states = [run_session(workflow) for _ in range(sessions)]
+    gc.collect()
+    after = tracemalloc.take_snapshot().filter_traces(HARNESS_ONLY)
+    tracemalloc.stop()
+    retained = sum(stat.size_diff for stat in after.compare_to(before, "filename")) / sessions
+
+    keys = instrumentation.session_memory(states[0].filtered_state)
+    per_session = max(retained, 1.0)
+    return {
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "workflow": workflow,
+        "sessions": sessions,
+        "state_bytes": sum(keys.values()),
+        "largest_keys": dict(list(keys.items())[:10]),
+        "retained_bytes": round(retained),
+        "shared_rss_bytes": shared_rss,
+        "ram_budget_bytes": ram_budget_bytes,
+        "max_sessions": max(int((ram_budget_bytes - shared_rss) // per_session), 0),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure per-session memory and supported concurrency.")
+    parser.add_argument("--sessions", type=int, default=10, help="Live sessions to measure")
+    parser.add_argument("--workflow", choices=list(WORKFLOWS), default="calculate")
+    parser.add_argument("--ram-gb", type=float, default=8.0, help="RAM budget for the server process")
+    parser.add_argument("-o", "--output", help="Also write the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = measure_sessions(args.sessions, args.workflow, int(args.ram_gb * 2**30))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+    print(f"Workflow {report['workflow']!r}, {report['sessions']} sessions")
+    print(f"  session_state:    {report['state_bytes'] / 1024:10,.1f} KiB")
+    for key, size in list(report["largest_keys"].items())[:5]:
+        print(f"    {key:<24}{size / 1024:10,.1f} KiB")
+    print(f"  retained/session: {report['retained_bytes'] / 1024:10,.1f} KiB")
+    print(f"  shared (RSS):     {report['shared_rss_bytes'] / 2**20:10,.1f} MiB")
+    print(f"  max sessions in {args.ram_gb:g} GiB: {report['max_sessions']:,}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
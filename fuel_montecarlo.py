@@ -0,0 +1,165 @@
+"""Monte Carlo fuel-price uncertainty for a fixed fleet and fuel mix.
+
+Prices follow correlated geometric random walks from the projection-table start year to
+the target year, centred (in expectation) on DEFAULT_FUEL_COSTS_GJ. Draws are generated
+in seeded, fixed-size chunks and reduced to histograms inside each worker, so memory is
+bounded by ``chunk_size`` and the bin count, never by ``n_draws``.
+"""
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+import numpy as np
+
+from fuel_config import FUEL_PRICE_PROJECTION_ROWS
+import fuel_engine
+
+DEFAULT_ANNUAL_VOLATILITY = 0.08  # For fuels without a projection-table row
+MIN_ANNUAL_VOLATILITY = 0.02
+DEFAULT_FUEL_CORRELATION = 0.6
+DEFAULT_CHUNK_SIZE = 100_000
+HISTOGRAM_BINS = 20_000
+_TAIL_SIGMAS = 7.0  # Histogram range covers +/- this many standard deviations per fuel
+
+
+class MonteCarloSummary(NamedTuple):
+    year: int
+    n_draws: int
+    percentiles: tuple             # e.g. (5, 50, 95)
+    total_cost_percentiles: np.ndarray  # (P,) USD/year
+    total_cost_mean: float              # USD/year
+    fuel_cost_percentiles: np.ndarray   # (F, P) USD/year
+    display_names: tuple                # (F,)
+
+
+def annual_volatilities(tables):
+    """Per-fuel annual log-price volatility, calibrated from the projection table.
+
+    Uses the RMS of the 5-yearly log changes of the fuel's projection row, scaled to one year.
+    """
+    years, rows = fuel_engine.price_projection_table()
+    step = float(np.diff(years).mean())
+    vols = np.full(len(tables.mix_keys), DEFAULT_ANNUAL_VOLATILITY)
+    for i, key in enumerate(tables.mix_keys):
+        row = rows.get(FUEL_PRICE_PROJECTION_ROWS.get(fuel_engine.fuel_base_key(key), ""))
+        if row is None:
+            continue
+        log_changes = np.diff(np.log(row[~np.isnan(row)]))
+        if log_changes.size:
+            vols[i] = max(np.sqrt(np.mean(log_changes ** 2) / step), MIN_ANNUAL_VOLATILITY)
+    return vols
+
+
+def shock_loadings(tables, correlation=DEFAULT_FUEL_CORRELATION):
+    """(F, B) loading matrix mapping independent normals onto correlated per-fuel shocks.
+
+    Produced and procured variants of a base fuel share a shock; distinct base fuels are
+    correlated with ``correlation``.
+    """
+    n_base = len(tables.base_names)
+    corr = np.full((n_base, n_base), correlation) + np.eye(n_base) * (1.0 - correlation)
+    return tables.base_matrix @ np.linalg.cholesky(corr)
+
+
+def _histogram_range(expected_cost, sigma):
+    low = expected_cost * np.exp(-_TAIL_SIGMAS * sigma - 0.5 * sigma ** 2)
+    high = expected_cost * np.exp(_TAIL_SIGMAS * sigma - 0.5 * sigma ** 2)
+    return low, high
+
+
+def _bin_index(values, low, high):
+    width = np.where(high > low, (high - low) / HISTOGRAM_BINS, 1.0)
+    return np.clip(((values - low) / width).astype(np.int64), 0, HISTOGRAM_BINS - 1)
+
+
+def _simulate_chunk(args):
+    seed_seq, n, expected_cost, sigma, loadings, fuel_low, fuel_high = args
+    rng = np.random.default_rng(seed_seq)
+    z = rng.standard_normal((n, loadings.shape[1])) @ loadings.T
+    fuel_costs = expected_cost * np.exp(sigma * z - 0.5 * sigma ** 2)
+    totals = fuel_costs.sum(axis=1)
+
+    n_fuels = fuel_costs.shape[1]
+    total_hist = np.bincount(_bin_index(totals, fuel_low.sum(), fuel_high.sum()),
+                             minlength=HISTOGRAM_BINS)
+    fuel_idx = _bin_index(fuel_costs, fuel_low, fuel_high) + np.arange(n_fuels) * HISTOGRAM_BINS
+    fuel_hist = np.bincount(fuel_idx.ravel(), minlength=n_fuels * HISTOGRAM_BINS)
+    return total_hist, fuel_hist.reshape(n_fuels, HISTOGRAM_BINS), totals.sum()
+
+
+def _histogram_percentiles(hist, edges, percentiles):
+    cdf = np.cumsum(hist) / hist.sum()
+    out = []
+    for p in percentiles:
+        i = int(np.searchsorted(cdf, p / 100.0))
+        lo, hi = edges[i], edges[i + 1]
+        prev = cdf[i - 1] if i else 0.0
+        frac = (p / 100.0 - prev) / (cdf[i] - prev) if cdf[i] > prev else 0.5
+        out.append(lo + frac * (hi - lo))
+    return np.array(out)
+
+
+def _run_chunks(tasks, workers):
+    """Yield chunk results, keeping at most ``2 * workers`` chunks in flight."""
+    if workers <= 1:
+        yield from map(_simulate_chunk, tasks)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.submit(_simulate_chunk, task))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def simulate_cost_distribution(year, consumption_by_mix_gj, n_draws=1_000_000,
+                               correlation=DEFAULT_FUEL_CORRELATION, seed=0,
+                               percentiles=(5, 50, 95), chunk_size=DEFAULT_CHUNK_SIZE,
+                               max_workers=None, fuel_costs_gj=None):
+    """Sample fuel-price paths and return cost percentiles for one fleet/mix scenario.
+
+    ``consumption_by_mix_gj`` is the (F,) GJ/year per fuel in the year's FUEL_MIX_CATEGORIES
+    order. Results are reproducible for a given ``seed`` and ``chunk_size`` regardless of
+    ``max_workers``.
+    """
+    tables = fuel_engine.get_year_tables(year)
+    prices = tables.fuel_costs_gj if fuel_costs_gj is None else np.asarray(fuel_costs_gj, dtype=float)
+    expected_cost = np.asarray(consumption_by_mix_gj, dtype=float) * prices
+    horizon = max(year - int(fuel_engine.price_projection_table()[0][0]), 1)
+    sigma = annual_volatilities(tables) * np.sqrt(horizon)
+    loadings = shock_loadings(tables, correlation)
+
+    fuel_low, fuel_high = _histogram_range(expected_cost, sigma)
+
+    n_chunks = -(-n_draws // chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+    tasks = ((seeds[i], min(chunk_size, n_draws - i * chunk_size), expected_cost, sigma,
+              loadings, fuel_low, fuel_high) for i in range(n_chunks))
+
+    total_hist = np.zeros(HISTOGRAM_BINS, dtype=np.int64)
+    fuel_hist = np.zeros((len(expected_cost), HISTOGRAM_BINS), dtype=np.int64)
+    total_sum = 0.0
+    for t_hist, f_hist, t_sum in _run_chunks(tasks, min(max_workers or os.cpu_count() or 1, n_chunks)):
+        total_hist += t_hist
+        fuel_hist += f_hist
+        total_sum += t_sum
+
+    bin_edges = np.linspace(0.0, 1.0, HISTOGRAM_BINS + 1)
+    total_edges = fuel_low.sum() + bin_edges * (fuel_high.sum() - fuel_low.sum())
+    fuel_edges = fuel_low[:, None] + bin_edges * (fuel_high - fuel_low)[:, None]
+    return MonteCarloSummary(
+        year=year,
+        n_draws=n_draws,
+        percentiles=tuple(percentiles),
+        total_cost_percentiles=_histogram_percentiles(total_hist, total_edges, percentiles),
+        total_cost_mean=total_sum / n_draws,
+        fuel_cost_percentiles=np.array([
+            _histogram_percentiles(fuel_hist[f], fuel_edges[f], percentiles)
+            if expected_cost[f] > 0 else np.zeros(len(percentiles))
+            for f in range(len(expected_cost))
+        ]),
+        display_names=tables.display_names,
+    )
@@ -0,0 +1,118 @@
+"""Least-cost fuel mix for a year, subject to a GFI target and supply limits.
+
+Fleet consumption is fixed by the vessel counts, so minimizing total cost is the same as
+minimizing the share-weighted fuel price. That makes the problem a small linear programme
+over the year's FUEL_MIX_CATEGORIES, solved with HiGHS in well under a millisecond.
+"""
+from typing import NamedTuple
+
+import numpy as np
+from scipy.optimize import linprog
+
+from fuel_config import GFI_LINES
+import fuel_compliance
+import fuel_engine
+
+
+class MixOptimization(NamedTuple):
+    year: int
+    fuel_mix: dict           # fuel-mix key -> percent
+    cost_per_gj: float       # share-weighted USD/GJ
+    gfi: float               # resulting fleet GFI, gCO2eq/MJ
+    gfi_target: float        # None when the GFI was not capped
+    compliance_cost_per_gj: float = 0.0  # USD/GJ, penalties positive, surplus credits negative
+
+
+def optimize_fuel_mix(year, gfi_line="DC", gfi_target=None, availability_caps=None,
+                      produced_share=(0.0, 100.0), fuel_costs_gj=None,
+                      include_compliance_cost=False, compliance_prices=None, tables=None, share_caps=()):
+    """Return the cheapest fuel mix for ``year``.
+
+    ``gfi_line`` picks the target from the compliance trajectory ("Base", "DC" or "Credit")
+    unless an explicit ``gfi_target`` is given; ``gfi_line=None`` leaves the GFI uncapped.
+    ``availability_caps`` maps fuel-mix keys to a maximum share in percent, and
+    ``produced_share`` bounds the produced (vs. procured) share, and ``share_caps`` is a
+    sequence of (fuel mask, maximum percent) limits on groups of fuels. With
+    ``include_compliance_cost`` the objective adds the GFI penalty/credit cost per GJ.
+    ``tables`` overrides the snapshot tables for ``year`` (e.g. an interpolated timeline year).
+    Raises ValueError when no mix satisfies the constraints.
+    """
+    tables = tables or fuel_engine.get_year_tables(year)
+    if gfi_target is None and gfi_line is not None:
+        gfi_target = fuel_compliance.gfi_limits(year)[GFI_LINES[gfi_line]]
+    costs = tables.fuel_costs_gj if fuel_costs_gj is None else np.asarray(fuel_costs_gj, dtype=float)
+    caps = availability_caps or {}
+    bounds = [(0.0, float(caps.get(key, 100.0))) for key in tables.mix_keys]
+
+    min_produced, max_produced = produced_share
+    a_ub = np.vstack([tables.produced_mask, -tables.produced_mask])
+    b_ub = np.array([max_produced, -min_produced])
+    for mask, max_share in share_caps:
+        a_ub = np.vstack([a_ub, np.asarray(mask, dtype=float)])
+        b_ub = np.append(b_ub, max_share)
+    if gfi_target is not None:
+        a_ub = np.vstack([a_ub, tables.emission_factors])
+        b_ub = np.append(b_ub, gfi_target * 100.0)
+
+    base, dc, credit, in_force = fuel_compliance.limit_arrays([year])
+    if include_compliance_cost and in_force[0]:
+        candidates = _compliance_candidates(costs, tables.emission_factors, a_ub, b_ub, bounds,
+                                            float(base[0]), float(dc[0]), float(credit[0]),
+                                            {**fuel_compliance.COMPLIANCE_PRICES_USD_T, **(compliance_prices or {})})
+    else:
+        candidates = [(_linprog(costs / 100.0, a_ub, b_ub, bounds), 0.0)]
+    solved = [(solution.fun + offset, solution) for solution, offset in candidates if solution.status == 0]
+    if not solved:
+        target = f"GFI {gfi_target:.2f}" if gfi_target is not None else "the constraints"
+        raise ValueError(f"No fuel mix for {year} meets {target} with the given limits "
+                         f"({candidates[0][0].message})")
+    solution = min(solved, key=lambda pair: pair[0])[1]
+
+    shares = np.clip(solution.x[:len(tables.mix_keys)], 0.0, None)
+    cost_per_gj = float(costs @ shares / 100.0)
+    gfi = float(tables.emission_factors @ shares / 100.0)
+    compliance_per_gj = 0.0
+    if include_compliance_cost:
+        compliance_per_gj = float(fuel_compliance.assess_compliance(gfi, 1.0, year, compliance_prices).cost[0])
+    return MixOptimization(
+        year=year,
+        fuel_mix=dict(zip(tables.mix_keys, np.round(shares, 6).tolist())),
+        cost_per_gj=cost_per_gj,
+        gfi=gfi,
+        gfi_target=None if gfi_target is None else float(gfi_target),
+        compliance_cost_per_gj=compliance_per_gj,
+    )
+
+
+def _linprog(objective, a_ub, b_ub, bounds):
+    """Minimize over the fuel shares (summing to 100) plus any trailing auxiliary variables >= 0."""
+    n_aux = len(objective) - len(bounds)
+    a_eq = np.zeros((1, len(objective)))
+    a_eq[0, :len(bounds)] = 1.0
+    a_ub = np.hstack([a_ub, np.zeros((len(a_ub), len(objective) - a_ub.shape[1]))])
+    return linprog(objective, A_ub=a_ub, b_ub=b_ub, A_eq=a_eq, b_eq=[100.0],
+                   bounds=bounds + [(0.0, None)] * n_aux, method="highs")
+
+
+def _compliance_candidates(costs, emission_factors, a_ub, b_ub, bounds, base, dc, credit, prices):
+    """(solution, objective offset) pairs; the cheaper optimum minimizes fuel plus compliance USD/GJ.
+
+    Penalties are convex in the GFI (tier 1 slope from DC, steeper tier 2 slope from Base),
+    so they are linear with two deficit variables ``u1 >= G - DC`` and ``u2 >= G - Base``.
+    The surplus credit makes the cost concave at the Credit line, so mixes at or below it
+    are solved separately with the (linear) credit. A gCO2eq/MJ gap costs price / 1000 per GJ.
+    """
+    gfi_row = emission_factors / 100.0
+    tier1, tier2, surplus = (prices[unit] / 1000.0 for unit in ("tier1_remedial", "tier2_remedial", "surplus"))
+    zeros = np.zeros((len(a_ub), 2))
+    penalty = _linprog(
+        np.concatenate([costs / 100.0, [tier1, tier2 - tier1]]),
+        np.vstack([np.hstack([a_ub, zeros]),
+                   np.concatenate([gfi_row, [-1.0, 0.0]]),
+                   np.concatenate([gfi_row, [0.0, -1.0]])]),
+        np.concatenate([b_ub, [dc, base]]),
+        bounds,
+    )
+    credit_earning = _linprog(costs / 100.0 + gfi_row * surplus, np.vstack([a_ub, gfi_row]),
+                              np.append(b_ub, credit), bounds)
+    return [(penalty, 0.0), (credit_earning, -surplus * credit)]
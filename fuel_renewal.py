@@ -0,0 +1,360 @@
+"""Fleet renewal planning over the 2025-2050 timeline by dynamic programming.
+
+The fleet follows the vessel-count trajectory of the timeline (snapshot counts held until
+the next snapshot); vessels leaving the fleet are retired conventional-first. A plan
+commits the fleet to one alternative-fuel engine capability (a ``fleet_capex`` pathway,
+e.g. methanol) and decides, year by year and per vessel type, how many vessels to
+convert: retrofits, limited by ``max_retrofits_per_year`` dry-dock slots per type, or
+capability newbuilds at a premium where the fleet grows. Each year's fuel mix is the
+least-cost one -- fuel plus GFI penalty/credit, via ``fuel_optimizer`` -- whose pathway
+fuels stay within the capable vessels' share of fleet energy. Low-carbon drop-in fuels
+(any engine) are supply-limited to their share of the reference mix, interpolated over the
+timeline; fossil diesel, the most carbon-intensive drop-in, is not. Plans minimize the NPV
+of fuel, compliance and conversion capex; every pathway is planned and the cheapest wins.
+
+The state is the number of converted vessels per type, a grid of at most
+``prod(max count + 1)`` cells, and the DP stays tractable because:
+
+* transitions are separable -- conversion limits and capex are per type, so the best
+  predecessor of every state is found with one small min-plus pass per vessel type over
+  the whole grid, instead of enumerating every combination of per-type moves;
+* the year's fuel cost depends on a state only through its capable energy share, a
+  piecewise-linear function of that share which is memoized per year and pathway from a
+  handful of LP solves (tangent-intersection refinement finds its breakpoints);
+* dominated states are pruned -- more converted vessels never raise the cost-to-go, so a
+  state reached at no lower cost than a state with at least as many conversions of every
+  type is dropped -- and each year's min-plus passes, cost evaluation and pruning run only
+  over the bounding box of the states still reachable, not the whole grid.
+"""
+import time
+from functools import lru_cache
+from typing import NamedTuple
+
+import numpy as np
+
+from fuel_config import (
+    YEAR_OPTIONS, VESSEL_KEYS, FUEL_MIX_CATEGORIES, DEFAULT_OWNED_VESSEL_COUNTS, DEFAULT_FUEL_MIX,
+    FUEL_ENGINE_CAPABILITIES, FUEL_WTW_EMISSION_FACTORS, MILLION, REFERENCE_STORE, config_version,
+)
+import fuel_engine
+import fuel_optimizer
+import fuel_timeline
+
+DEFAULT_MAX_RETROFITS_PER_YEAR = 2  # Per vessel type
+MAX_GRID_STATES = 5_000_000
+_SLOPE_STEP = 1e-3      # Capable-share step for one-sided slopes of the cost curve
+_CURVE_TOLERANCE = 1e-6  # USD/GJ
+
+_capex = REFERENCE_STORE.table("fleet_capex")
+CAPABILITIES = tuple(dict.fromkeys(_capex["capability"].tolist()))
+
+
+class RenewalPlan(NamedTuple):
+    capability: str
+    years: np.ndarray            # (Y,)
+    vessel_counts: np.ndarray    # (Y, V) fleet in service
+    converted: np.ndarray        # (Y, V) of which capable of the pathway fuels
+    retrofits: np.ndarray        # (Y, V) conversions at the start of each year
+    newbuilds: np.ndarray        # (Y, V) capability newbuilds (fleet growth)
+    capable_share: np.ndarray    # (Y,) capable share of fleet energy, 0-1
+    fuel_mix: np.ndarray         # (Y, F) percent, over the timeline mix keys
+    fuel_cost: np.ndarray        # (Y,) USD
+    compliance_cost: np.ndarray  # (Y,) USD; penalties positive, credits negative
+    capex: np.ndarray            # (Y,) USD
+    npv: float                   # USD, discounted to the first year
+    npv_fuel_cost: float
+    npv_compliance_cost: float
+    npv_capex: float
+    states_evaluated: int        # reachable (year, state) pairs
+    states_pruned: int           # of which dominated
+
+
+class RenewalResults(NamedTuple):
+    best: RenewalPlan
+    plans: dict                  # capability -> RenewalPlan, cheapest first
+    mix_keys: tuple
+    display_names: tuple
+    discount_rate: float
+    elapsed_s: float
+
+
+def capex_usd(capability):
+    """(retrofit, newbuild premium) USD per vessel, ordered like VESSEL_KEYS."""
+    rows = {key: (retrofit, premium) for key, cap, retrofit, premium in zip(
+        _capex["vessel_key"].tolist(), _capex["capability"].tolist(),
+        _capex["retrofit_musd"].tolist(), _capex["newbuild_premium_musd"].tolist()) if cap == capability}
+    if not rows:
+        raise KeyError(f"No capex data for capability {capability!r}.")
+    return tuple(np.array([rows.get(k, (np.inf, np.inf))[i] for k in VESSEL_KEYS]) * MILLION for i in (0, 1))
+
+
+def offered_fuels(year):
+    """Fuel-mix keys on offer in ``year``: those of every snapshot year up to it."""
+    first = min(YEAR_OPTIONS)
+    return {key for snapshot in YEAR_OPTIONS if snapshot <= max(year, first) for key in FUEL_MIX_CATEGORIES[snapshot]}
+
+
+def capability_mask(mix_keys, capability):
+    return np.array([FUEL_ENGINE_CAPABILITIES.get(fuel_engine.fuel_base_key(k), "") == capability for k in mix_keys])
+
+
+@lru_cache(maxsize=None)
+def drop_in_supply_caps():
+    """(Y, F) percent caps on low-carbon drop-in fuels over the timeline (inf where unlimited)."""
+    timeline = fuel_timeline.get_timeline_tables()
+    keys = timeline.tables.mix_keys
+    drop_in = [FUEL_ENGINE_CAPABILITIES.get(fuel_engine.fuel_base_key(k), "") == "" for k in keys]
+    intensity = [FUEL_WTW_EMISSION_FACTORS.get(fuel_engine.fuel_base_key(k), 0.0) for k in keys]
+    fossil = max(i for i, d in zip(intensity, drop_in) if d)
+    limited = np.array([d and i < fossil for d, i in zip(drop_in, intensity)])
+    caps = np.where(limited, fuel_timeline.interpolate_snapshots(DEFAULT_FUEL_MIX, keys), np.inf)
+    caps.setflags(write=False)
+    return caps
+
+
+def _year_caps(year_index, mix_keys, capability, availability_caps):
+    """Per-fuel caps: drop-in supply limits, with fuels not on offer or needing another engine excluded.
+
+    ``availability_caps`` entries replace the drop-in supply limits.
+    """
+    year = int(fuel_timeline.TIMELINE_YEARS[year_index])
+    offered = offered_fuels(year)
+    supply = drop_in_supply_caps()[year_index]
+    caps = {key: float(cap) for key, cap in zip(mix_keys, supply) if np.isfinite(cap)}
+    caps.update(availability_caps)
+    for key in mix_keys:
+        needs = FUEL_ENGINE_CAPABILITIES.get(fuel_engine.fuel_base_key(key), "")
+        if key not in offered or needs not in ("", capability):
+            caps[key] = 0.0
+    return caps
+
+
+def _optimize(year_index, capability, share, availability_caps, produced_share):
+    timeline = fuel_timeline.get_timeline_tables()
+    year = int(timeline.years[year_index])
+    tables = timeline.tables
+    return fuel_optimizer.optimize_fuel_mix(
+        year, gfi_line=None, availability_caps=_year_caps(year_index, tables.mix_keys, capability, availability_caps),
+        produced_share=produced_share, fuel_costs_gj=timeline.fuel_costs_gj[year_index],
+        include_compliance_cost=True, tables=tables,
+        share_caps=[(capability_mask(tables.mix_keys, capability), 100.0 * share)],
+    )
+
+
+@lru_cache(maxsize=1024)
+def cost_curve(year_index, capability, availability_caps=(), produced_share=(0.0, 100.0), data_version=None):
+    """(breakpoints, USD/GJ) of the least fuel-plus-compliance cost vs. the capable energy share.
+
+    The cost is nonincreasing and piecewise linear in the share (an LP's optimal value in
+    one right-hand side). Breakpoints are found by intersecting the tangents at the ends of
+    each interval: if the curve passes through the intersection it is linear on both sides.
+    ``data_version`` only keys the cache.
+    """
+    caps = dict(availability_caps)
+
+    def cost(share):
+        result = _optimize(year_index, capability, min(max(share, 0.0), 1.0), caps, produced_share)
+        return result.cost_per_gj + result.compliance_cost_per_gj
+
+    values = {0.0: cost(0.0), 1.0: cost(1.0)}
+    if values[1.0] >= values[0.0] - _CURVE_TOLERANCE:
+        return np.array([0.0, 1.0]), np.array([values[0.0], values[0.0]])
+    right = {0.0: (cost(_SLOPE_STEP) - values[0.0]) / _SLOPE_STEP}
+    left = {1.0: (values[1.0] - cost(1.0 - _SLOPE_STEP)) / _SLOPE_STEP}
+    intervals = [(0.0, 1.0)]
+    while intervals:
+        a, b = intervals.pop()
+        slope_a, slope_b = right[a], left[b]
+        if b - a <= 4 * _SLOPE_STEP or slope_b - slope_a <= _CURVE_TOLERANCE:
+            continue
+        x = (values[b] - values[a] + slope_a * a - slope_b * b) / (slope_a - slope_b)
+        x = min(max(x, a + 2 * _SLOPE_STEP), b - 2 * _SLOPE_STEP)
+        values[x] = cost(x)
+        if values[x] <= values[a] + slope_a * (x - a) + _CURVE_TOLERANCE:
+            continue
+        left[x] = (values[x] - cost(x - _SLOPE_STEP)) / _SLOPE_STEP
+        right[x] = (cost(x + _SLOPE_STEP) - values[x]) / _SLOPE_STEP
+        intervals += [(a, x), (x, b)]
+    shares = np.array(sorted(values))
+    return shares, np.array([values[s] for s in shares])
+
+
+# --- Grid DP ---
+def _shift(values, axis, step):
+    """out[k] = values[k - step e_axis], padded with inf."""
+    out = np.full_like(values, np.inf)
+    src = [slice(None)] * values.ndim
+    dst = [slice(None)] * values.ndim
+    n = values.shape[axis]
+    src[axis], dst[axis] = (slice(0, n - step), slice(step, None)) if step >= 0 else (slice(-step, None), slice(0, n + step))
+    out[tuple(dst)] = values[tuple(src)]
+    return out
+
+
+def _min_plus(values, axis, step_costs):
+    """out[k] = min_d values[k - d e_axis] + step_costs[d]; also returns the argmin d."""
+    out = values + step_costs[0]
+    choice = np.zeros(values.shape, dtype=np.int16)
+    for d in range(1, len(step_costs)):
+        candidate = _shift(values, axis, d) + step_costs[d]
+        better = candidate < out
+        out[better] = candidate[better]
+        choice[better] = d
+    return out, choice
+
+
+def _finite_box(values):
+    """Per-axis slices bounding the finite (reachable) states."""
+    finite = np.isfinite(values)
+    box = []
+    for axis in range(values.ndim):
+        index = np.flatnonzero(finite.any(axis=tuple(i for i in range(values.ndim) if i != axis)))
+        box.append(slice(int(index[0]), int(index[-1]) + 1) if len(index) else slice(0, 0))
+    return box
+
+
+def _retire(values, axis, limit):
+    """Fold states above ``limit`` on ``axis`` onto it (converted vessels retire last)."""
+    if limit >= values.shape[axis] - 1:
+        return values, None
+    index = [slice(None)] * values.ndim
+    index[axis] = slice(limit, None)
+    tail = values[tuple(index)]
+    origin = np.argmin(tail, axis=axis) + limit
+    out = np.full_like(values, np.inf)
+    keep = [slice(None)] * values.ndim
+    keep[axis] = slice(0, limit)
+    out[tuple(keep)] = values[tuple(keep)]
+    index[axis] = limit
+    out[tuple(index)] = tail.min(axis=axis)
+    return out, origin
+
+
+def _prune_dominated(values):
+    """Drop states whose cost is matched by a state with at least as many conversions of every type."""
+    best_above = values.copy()
+    for axis in range(values.ndim):
+        best_above = np.flip(np.minimum.accumulate(np.flip(best_above, axis), axis=axis), axis)
+    # Any other state with at least as many conversions has one more on some axis
+    dominating = np.full_like(values, np.inf)
+    for axis in range(values.ndim):
+        dominating = np.minimum(dominating, _shift(best_above, axis, -1))
+    pruned = np.isfinite(values) & (dominating <= values)
+    values[pruned] = np.inf
+    return int(pruned.sum())
+
+
+def plan_pathway(capability, owned_counts_by_year=None, initial_converted=None,
+                 max_retrofits_per_year=DEFAULT_MAX_RETROFITS_PER_YEAR,
+                 discount_rate=fuel_timeline.DEFAULT_DISCOUNT_RATE, availability_caps=None,
+                 produced_share=(0.0, 100.0)):
+    """Least-NPV conversion plan for one engine capability (see the module docstring).
+
+    ``owned_counts_by_year`` overrides snapshot fleet counts as in ``fuel_timeline``;
+    ``initial_converted`` maps vessel keys to vessels already capable in the first year.
+    """
+    timeline = fuel_timeline.get_timeline_tables()
+    years = timeline.years
+    counts = fuel_timeline.step_snapshots({**DEFAULT_OWNED_VESSEL_COUNTS, **(owned_counts_by_year or {})},
+                                          VESSEL_KEYS).astype(int)
+    energy = counts * timeline.consumption_factors               # (Y, V) GJ
+    total_energy = energy.sum(axis=1)
+    retrofit_usd, premium_usd = capex_usd(capability)
+    discount = (1.0 + discount_rate) ** -(years - years[0])
+    caps_key = tuple(sorted((availability_caps or {}).items()))
+    produced_share = tuple(produced_share)
+
+    shape = tuple(int(n) + 1 for n in counts.max(axis=0))
+    if np.prod(shape, dtype=float) > MAX_GRID_STATES:
+        raise ValueError(f"Fleet too large to plan ({np.prod(shape, dtype=float):,.0f} states).")
+    start = tuple(min(int((initial_converted or {}).get(k, 0)), int(n)) for k, n in zip(VESSEL_KEYS, counts[0]))
+    values = np.full(shape, np.inf)
+    values[start] = 0.0
+    axes = [np.arange(n) for n in shape]
+
+    history = []  # per year: (retire origins, per-type step choices)
+    evaluated = pruned = 0
+    curves = {}
+    for y in range(len(years)):
+        origins = []
+        for t in range(len(shape)):
+            values, origin = _retire(values, t, int(counts[y, t]))
+            origins.append(origin)
+        growth = np.maximum(counts[y] - (counts[y - 1] if y else counts[y]), 0)
+        # Everything outside ``box`` is unreachable (inf), so the passes below work inside it,
+        # growing it by each type's conversions up to that type's fleet count
+        box = _finite_box(values)
+        choices = []
+        for t in range(len(shape)):
+            steps = np.arange(max_retrofits_per_year + growth[t] + 1)
+            step_costs = (premium_usd[t] * np.minimum(steps, growth[t])
+                          + retrofit_usd[t] * np.maximum(steps - growth[t], 0)) * discount[y]
+            box[t] = slice(box[t].start, max(box[t].start, min(box[t].stop + len(steps) - 1, int(counts[y, t]) + 1)))
+            choice = np.zeros(shape, dtype=np.int16)
+            values[tuple(box)], choice[tuple(box)] = _min_plus(values[tuple(box)], t,
+                                                               np.where(np.isfinite(step_costs), step_costs, np.inf))
+            choices.append(choice)
+        history.append((origins, choices))
+
+        reachable = values[tuple(box)]  # A view: updated in place
+        if total_energy[y] > 0:
+            capable = sum(np.reshape(axes[t][box[t]] * timeline.consumption_factors[y, t],
+                                     [-1 if i == t else 1 for i in range(len(shape))]) for t in range(len(shape)))
+            curves[y] = cost_curve(y, capability, caps_key, produced_share, config_version())
+            reachable += np.interp(np.minimum(capable / total_energy[y], 1.0), *curves[y]) * total_energy[y] * discount[y]
+        evaluated += int(np.isfinite(reachable).sum())
+        pruned += _prune_dominated(reachable)
+
+    # Backtrack from the cheapest final state
+    state = list(np.unravel_index(np.argmin(values), shape))
+    converted = np.zeros_like(counts)
+    conversions = np.zeros_like(counts)
+    for y in range(len(years) - 1, -1, -1):
+        origins, choices = history[y]
+        converted[y] = state
+        for t in range(len(shape) - 1, -1, -1):
+            d = int(choices[t][tuple(state)])
+            conversions[y, t] = d
+            state[t] -= d
+        for t in range(len(shape) - 1, -1, -1):
+            if origins[t] is not None and state[t] == counts[y, t]:
+                state[t] = int(origins[t][tuple(s for i, s in enumerate(state) if i != t)])
+    growth = np.maximum(np.diff(counts, axis=0, prepend=counts[:1]), 0)
+    newbuilds = np.minimum(conversions, growth)
+    retrofits = conversions - newbuilds
+    capex = (retrofits * retrofit_usd + newbuilds * premium_usd).sum(axis=1)
+
+    capable_share = np.divide((converted * timeline.consumption_factors).sum(axis=1), total_energy,
+                              out=np.zeros(len(years)), where=total_energy > 0)
+    tables = timeline.tables
+    fuel_mix = np.zeros((len(years), len(tables.mix_keys)))
+    fuel_cost = np.zeros(len(years))
+    compliance_cost = np.zeros(len(years))
+    for y in range(len(years)):
+        result = _optimize(y, capability, min(capable_share[y], 1.0), dict(caps_key), produced_share)
+        fuel_mix[y] = [result.fuel_mix[k] for k in tables.mix_keys]
+        fuel_cost[y] = result.cost_per_gj * total_energy[y]
+        compliance_cost[y] = result.compliance_cost_per_gj * total_energy[y]
+    return RenewalPlan(
+        capability=capability, years=years, vessel_counts=counts, converted=converted,
+        retrofits=retrofits, newbuilds=newbuilds, capable_share=capable_share, fuel_mix=fuel_mix,
+        fuel_cost=fuel_cost, compliance_cost=compliance_cost, capex=capex,
+        npv=float((fuel_cost + compliance_cost + capex) @ discount),
+        npv_fuel_cost=float(fuel_cost @ discount), npv_compliance_cost=float(compliance_cost @ discount),
+        npv_capex=float(capex @ discount), states_evaluated=evaluated, states_pruned=pruned,
+    )
+
+
+def plan_fleet_renewal(capabilities=CAPABILITIES, **kwargs):
+    """Plan every pathway in ``capabilities``; returns RenewalResults with the cheapest as ``best``."""
+    start = time.perf_counter()
+    plans = sorted((plan_pathway(capability, **kwargs) for capability in capabilities), key=lambda p: p.npv)
+    if not plans:
+        raise ValueError("Select at least one engine capability to plan.")
+    tables = fuel_timeline.get_timeline_tables().tables
+    return RenewalResults(
+        best=plans[0], plans={plan.capability: plan for plan in plans},
+        mix_keys=tables.mix_keys, display_names=tables.display_names,
+        discount_rate=kwargs.get("discount_rate", fuel_timeline.DEFAULT_DISCOUNT_RATE),
+        elapsed_s=time.perf_counter() - start,
+    )
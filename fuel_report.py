@@ -0,0 +1,473 @@
+"""Multi-year, multi-scenario report export (Excel workbook and PDF), built in the background.
+
+    runner = fuel_report.ReportRunner()
+    report_id = runner.submit([fuel_report.ReportScenario("Reference")], years="timeline")
+    runner.status(report_id).state        # "running" -> "completed"
+    runner.path(report_id, "pdf")         # the finished file
+
+Each scenario is scored over the whole timeline in one engine pass
+(``fuel_timeline.compute_timeline``); the report keeps either the snapshot years
+(``YEAR_OPTIONS``) or every timeline year. It contains:
+
+* a summary per scenario, yearly totals with the fleet GFI and compliance cost, the fuel
+  breakdown by source and the demand by base fuel, and the price and export projections
+  (workbook sheets; the PDF has the same tables as pages, with the breakdown by base fuel);
+* the GFI compliance chart with every scenario's fleet GFI (and the current calculation's
+  marker), a cost/demand chart per scenario, and the price and export projection charts.
+
+Builds never run on a Streamlit script thread: a small thread pool assembles the tables
+while the charts, the workbook and the PDF are rendered on a low-priority process pool,
+like the sweep workers in ``fuel_jobs``. Rendered chart bytes are kept in a process-wide
+``fuel_session.FigureCache`` keyed by chart kind and data, so charts another report (or the
+app, via ``prerendered``) has drawn already are reused. The workbook and the PDF embed the
+same PNG bytes; PDF pages are assembled by Pillow. Finished files are written to the
+reports directory (private to the server's user, like the jobs directory; by default
+``<temp dir>/fuel_supplier_reports-<uid>``) with a ``report.json`` record, so a restarted
+server reloads them as ``JobRunner`` does its jobs; directories of builds cut short by a
+restart are removed, and the oldest reports beyond ``max_reports``.
+"""
+import importlib.util
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from fuel_config import YEAR_OPTIONS, MILLION, REFERENCE_STORE, config_version
+import fuel_compliance
+import fuel_engine
+import fuel_jobs
+import fuel_session
+import fuel_timeline
+import instrumentation
+from private_dirs import private_dir, user_dir
+
+REPORT_FORMATS = ("xlsx", "pdf")
+YEAR_SCOPES = ("snapshots", "timeline")
+STATES = ("running", "completed", "failed")
+MAX_SCENARIOS = 12
+MAX_REPORTS = 32              # Finished reports kept on disk
+MAX_CONCURRENT_BUILDS = 2     # Report builds assembling at once; their charts share the process pool
+CACHED_CHARTS = 256
+MIME_TYPES = {"xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "pdf": "application/pdf"}
+IMAGE_ROW_PX = 20             # Default worksheet row height, for stacking chart images
+# The workbook needs one of these; the PDF only needs matplotlib and Pillow
+EXCEL_ENGINE = next((name for name in ("xlsxwriter", "openpyxl") if importlib.util.find_spec(name)), None)
+
+
+class ReportScenario(NamedTuple):
+    name: str
+    owned_counts_by_year: dict = None  # {snapshot year: {vessel key: count}}, replacing the defaults
+    fuel_mix_by_year: dict = None      # {snapshot year: {mix key: percent}}
+
+
+class ReportStatus(NamedTuple):
+    report_id: str
+    label: str
+    state: str             # STATES entry
+    charts_done: int
+    n_charts: int
+    cached_charts: int     # charts reused from the chart cache instead of rendered
+    formats: tuple         # REPORT_FORMATS entries requested
+    created: float         # epoch seconds
+    seconds: float         # build time so far, or in total once finished
+    error: str
+
+    @property
+    def progress(self):
+        return self.charts_done / self.n_charts if self.n_charts else 0.0
+
+
+class ReportTables(NamedTuple):
+    summary: pd.DataFrame             # one row per scenario
+    yearly: pd.DataFrame              # one row per scenario and year
+    fuel_breakdown: pd.DataFrame      # one row per scenario, year and fuel source used
+    base_demand: pd.DataFrame         # one row per scenario and year, GJ per base fuel
+    fuel_prices: pd.DataFrame         # index: year, USD/GJ per fuel
+    export_projections: pd.DataFrame  # index: year
+
+
+class ChartTask(NamedTuple):
+    name: str      # page title
+    kind: str      # _CHART_KINDS entry or "table"
+    payload: dict  # render_chart input; also the chart cache key
+
+
+# --- Tables ---
+def score_scenarios(scenarios, years="snapshots", discount_rate=fuel_timeline.DEFAULT_DISCOUNT_RATE):
+    """[(scenario, TimelineResults, row indices of the report years)] for each scenario."""
+    if years not in YEAR_SCOPES:
+        raise ValueError(f"Report years must be one of {YEAR_SCOPES}, not {years!r}.")
+    scored = []
+    for scenario in scenarios:
+        timeline = fuel_timeline.compute_timeline(scenario.owned_counts_by_year, scenario.fuel_mix_by_year,
+                                                  discount_rate=discount_rate)
+        rows = np.flatnonzero(np.isin(timeline.years, YEAR_OPTIONS)) if years == "snapshots" \
+            else np.arange(len(timeline.years))
+        scored.append((scenario, timeline, rows))
+    return scored
+
+
+def report_tables(scored):
+    """``ReportTables`` of the scored scenarios (from ``score_scenarios``)."""
+    summary, yearly, breakdown, demand = [], [], [], []
+    for scenario, timeline, rows in scored:
+        batch, compliance, tables = timeline.batch, timeline.compliance, timeline.tables
+        years = timeline.years[rows]
+        yearly.append(pd.DataFrame({
+            "Scenario": scenario.name,
+            "Year": years,
+            "Total Consumption (GJ/Year)": batch.total_consumption[rows],
+            "Total Cost (Million USD/Year)": batch.total_cost[rows] / MILLION,
+            "Produced Cost (Million USD/Year)": batch.produced_cost[rows] / MILLION,
+            "Procured Cost (Million USD/Year)": batch.procured_cost[rows] / MILLION,
+            "Fleet GFI (gCO2eq/MJ)": compliance.gfi[rows],
+            "GFI Zone": [fuel_compliance.ZONE_LABELS[z] for z in compliance.zone[rows]],
+            "Compliance Cost (Million USD/Year)": compliance.cost[rows] / MILLION,
+            "Total incl. Compliance (Million USD/Year)": (batch.total_cost[rows] + compliance.cost[rows]) / MILLION,
+        }))
+        year_idx, fuel_idx = np.nonzero(batch.consumption_by_mix[rows] > 1e-9)
+        breakdown.append(pd.DataFrame({
+            "Scenario": scenario.name,
+            "Year": years[year_idx],
+            "Fuel Source": np.asarray(tables.display_names, dtype=object)[fuel_idx],
+            "Consumption (GJ/Year)": batch.consumption_by_mix[rows][year_idx, fuel_idx],
+            "Cost (Million USD/Year)": batch.cost_by_mix[rows][year_idx, fuel_idx] / MILLION,
+        }))
+        demand.append(pd.DataFrame(batch.base_fuel_demand[rows], columns=list(tables.base_names))
+                      .assign(Scenario=scenario.name, Year=years))
+        summary.append({
+            "Scenario": scenario.name,
+            "Years": f"{years[0]}–{years[-1]}" if len(years) > 1 else str(years[0]),
+            "Vessels (first year)": int(timeline.vessel_counts[rows[0]].sum()),
+            "Consumption (GJ)": float(batch.total_consumption[rows].sum()),
+            "Fuel Cost (Million USD)": float(batch.total_cost[rows].sum() / MILLION),
+            "Compliance Cost (Million USD)": float(compliance.cost[rows].sum() / MILLION),
+            f"NPV Fuel Cost {timeline.years[0]}–{timeline.years[-1]} (Million USD)": timeline.npv_cost / MILLION,
+            "NPV Compliance Cost (Million USD)": timeline.npv_compliance_cost / MILLION,
+            "Mean Fleet GFI (gCO2eq/MJ)": float(compliance.gfi[rows].mean()),
+        })
+    demand = pd.concat(demand, ignore_index=True)
+    demand = demand[["Scenario", "Year", *[c for c in demand if c not in ("Scenario", "Year")]]]
+    price_years, price_rows = fuel_engine.price_projection_table()
+    return ReportTables(
+        summary=pd.DataFrame(summary),
+        yearly=pd.concat(yearly, ignore_index=True),
+        fuel_breakdown=pd.concat(breakdown, ignore_index=True),
+        base_demand=demand.loc[:, (demand != 0).any() | demand.columns.isin(["Scenario", "Year"])],
+        fuel_prices=pd.DataFrame(price_rows, index=pd.Index(price_years, name="Year")),
+        export_projections=REFERENCE_STORE.table("export_projections").to_frame(index="Year"),
+    )
+
+
+def _format_spec(column):
+    if "Million USD" in column:
+        return ",.2f"
+    if "GJ" in column:
+        return ",.0f"
+    if "GFI" in column and "Zone" not in column:
+        return ".2f"
+    return None
+
+
+def _cells(frame, value_spec=None):
+    """Rows of display strings; numbers formatted by their column's unit, or with ``value_spec``."""
+    columns = []
+    for column in frame:
+        spec = _format_spec(column) if value_spec is None or column == "Year" else value_spec
+        columns.append(frame[column].map(lambda v, spec=spec: format(v, spec) if spec else str(v)))
+    return [list(row) for row in zip(*columns)]
+
+
+# --- Charts ---
+def chart_tasks(scored, tables, calculated_gfi=None, calculation_year=None):
+    """The report's charts and table pages, in PDF page order."""
+    tasks = [ChartTask("Summary", "table", {
+        "columns": list(tables.summary.columns), "rows": _cells(tables.summary), "title": "Scenario Summary",
+    })]
+    tasks.append(ChartTask("GFI Compliance Zones", "gfi_compliance", {
+        "fleet_series": {scenario.name: (timeline.years[rows].tolist(), timeline.compliance.gfi[rows].tolist())
+                         for scenario, timeline, rows in scored},
+        "calculated_gfi": calculated_gfi, "calculation_year": calculation_year, "data_version": config_version(),
+    }))
+    for scenario, timeline, rows in scored:
+        years = timeline.years[rows]
+        base_names = list(timeline.tables.base_names)
+        base_cost_musd = (timeline.batch.cost_by_mix[rows] @ timeline.tables.base_matrix) / MILLION
+        base_demand_gj = timeline.batch.base_fuel_demand[rows]
+        tasks.append(ChartTask(f"{scenario.name}: Cost and Demand by Base Fuel", "yearly_breakdown", {
+            "years": years.tolist(), "base_names": base_names, "base_cost_musd": base_cost_musd,
+            "base_demand_gj": base_demand_gj, "title": scenario.name,
+        }))
+        yearly = tables.yearly[tables.yearly["Scenario"] == scenario.name].drop(columns="Scenario")
+        tasks.append(ChartTask(f"{scenario.name}: Yearly Totals", "table", {
+            "columns": list(yearly.columns), "rows": _cells(yearly), "title": f"{scenario.name}: Yearly Totals",
+        }))
+        # By base fuel: the produced/procured split of every source is too wide for a page (it is in the workbook)
+        used = np.flatnonzero(np.abs(base_demand_gj).sum(axis=0) > 1e-9)
+        for title, values in (("Fuel Cost by Base Fuel (Million USD/Year)", base_cost_musd),
+                              ("Fuel Demand by Base Fuel (GJ/Year)", base_demand_gj)):
+            pivot = pd.DataFrame(values[:, used], columns=[base_names[i] for i in used]).assign(Year=years)
+            pivot = pivot[["Year", *pivot.columns[:-1]]]
+            tasks.append(ChartTask(f"{scenario.name}: {title}", "table", {
+                "columns": list(pivot.columns), "rows": _cells(pivot, _format_spec(title)),
+                "title": f"{scenario.name}: {title}",
+            }))
+    tasks.append(ChartTask("Fuel Price Projections", "fuel_prices", {"data_version": config_version()}))
+    tasks.append(ChartTask("Petrobras Major Export Products Projection", "export_projections",
+                           {"data_version": config_version()}))
+    return tasks
+
+
+def _render_gfi_compliance(fuel_charts, payload):
+    series = {label: tuple(values) for label, values in payload["fleet_series"].items()}
+    return fuel_charts.gfi_compliance_figure(payload["calculated_gfi"], payload["calculation_year"],
+                                             fleet_series=series)
+
+
+def _render_yearly_breakdown(fuel_charts, payload):
+    return fuel_charts.yearly_breakdown_figure(payload["years"], payload["base_cost_musd"], payload["base_demand_gj"],
+                                               payload["base_names"], title=payload["title"])
+
+
+def _render_export_projections(fuel_charts, payload):
+    return fuel_charts.export_projection_figure(REFERENCE_STORE.table("export_projections").to_frame(index="Year"))
+
+
+_CHART_KINDS = {
+    "gfi_compliance": _render_gfi_compliance,
+    "yearly_breakdown": _render_yearly_breakdown,
+    "fuel_prices": lambda fuel_charts, payload: fuel_charts.fuel_price_figure(),
+    "export_projections": _render_export_projections,
+}
+
+
+def render_chart(kind, payload):
+    """PNG bytes of one chart or table page (runs in the worker processes)."""
+    fuel_charts = instrumentation.lazy_import("fuel_charts")
+    if kind == "table":
+        return fuel_charts.table_image(payload["columns"], payload["rows"], title=payload["title"])
+    return fuel_charts.figure_to_bytes(_CHART_KINDS[kind](fuel_charts, payload))
+
+
+# --- Files ---
+def _image_rows(png):
+    from PIL import Image
+    return -(-Image.open(BytesIO(png)).height // IMAGE_ROW_PX) + 2
+
+
+def write_workbook(path, tables, charts):
+    """Write the report tables, one sheet each, and the ``[(title, png)]`` charts to an .xlsx file."""
+    if EXCEL_ENGINE is None:
+        raise ValueError("Excel export needs xlsxwriter or openpyxl; install one or export the PDF only.")
+    sheets = {"Summary": tables.summary, "Yearly": tables.yearly, "Fuel Breakdown": tables.fuel_breakdown,
+              "Base Fuel Demand": tables.base_demand}
+    with pd.ExcelWriter(path, engine=EXCEL_ENGINE) as writer:
+        for name, frame in sheets.items():
+            frame.to_excel(writer, sheet_name=name, index=False, freeze_panes=(1, 0))
+        tables.fuel_prices.to_excel(writer, sheet_name="Fuel Prices", freeze_panes=(1, 1))
+        tables.export_projections.to_excel(writer, sheet_name="Export Projections", freeze_panes=(1, 1))
+        row = 0
+        if EXCEL_ENGINE == "xlsxwriter":
+            sheet = writer.book.add_worksheet("Charts")
+            for title, png in charts:
+                sheet.write(row, 0, title)
+                sheet.insert_image(row + 1, 0, f"{title}.png", {"image_data": BytesIO(png)})
+                row += _image_rows(png)
+        else:
+            from openpyxl.drawing.image import Image as SheetImage
+            sheet = writer.book.create_sheet("Charts")
+            for title, png in charts:
+                sheet.cell(row=row + 1, column=1, value=title)
+                sheet.add_image(SheetImage(BytesIO(png)), f"A{row + 2}")
+                row += _image_rows(png)
+    return path
+
+
+def write_pdf(path, pages):
+    """Write the PNG ``pages`` as one PDF, a page per image."""
+    from PIL import Image
+    images = [Image.open(BytesIO(png)).convert("RGB") for png in pages]
+    images[0].save(path, format="PDF", save_all=True, append_images=images[1:], resolution=100.0)
+    return path
+
+
+# --- Runner ---
+class ReportRunner:
+    """Process-wide report builder; safe to share between sessions and threads."""
+
+    def __init__(self, reports_dir=None, max_workers=None, max_reports=MAX_REPORTS):
+        self.reports_dir = private_dir(reports_dir or user_dir("fuel_supplier_reports"))
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 1) - 1)
+        self.max_reports = max_reports
+        self.chart_cache = fuel_session.FigureCache(max_entries=CACHED_CHARTS)
+        self._lock = threading.Lock()
+        self._builders = ThreadPoolExecutor(MAX_CONCURRENT_BUILDS, thread_name_prefix="fuel-report")
+        self._pool = None
+        self._reports = OrderedDict()  # id -> record dict, oldest first
+        self._load()
+
+    def _load(self):
+        records = []
+        for name in os.listdir(self.reports_dir):
+            report_dir = os.path.join(self.reports_dir, name)
+            if not os.path.isdir(report_dir):
+                continue
+            try:
+                with open(os.path.join(report_dir, "report.json")) as f:
+                    record = json.load(f)
+            except (OSError, ValueError):  # A build the previous process did not finish
+                shutil.rmtree(report_dir, ignore_errors=True)
+                continue
+            records.append(dict(record, formats=tuple(record["formats"]), dir=report_dir))
+        for record in sorted(records, key=lambda r: r["created"]):
+            self._reports[record["id"]] = record
+        self._prune()
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers, initializer=fuel_jobs._lower_priority)
+            return self._pool
+
+    def submit(self, scenarios, years="snapshots", formats=REPORT_FORMATS,
+               discount_rate=fuel_timeline.DEFAULT_DISCOUNT_RATE, calculated_gfi=None, calculation_year=None,
+               prerendered=None, label=None):
+        """Queue a report of ``scenarios`` (``ReportScenario``); returns the report id.
+
+        ``prerendered`` maps chart kinds without inputs (``fuel_prices``, ``export_projections``)
+        to PNG bytes the caller already holds for the current data version.
+        """
+        scenarios = list(scenarios)
+        formats = tuple(f for f in REPORT_FORMATS if f in formats)
+        if not scenarios or len(scenarios) > MAX_SCENARIOS:
+            raise ValueError(f"A report needs between 1 and {MAX_SCENARIOS} scenarios.")
+        if not formats:
+            raise ValueError(f"Choose at least one report format of {REPORT_FORMATS}.")
+        if "xlsx" in formats and EXCEL_ENGINE is None:
+            raise ValueError("Excel export needs xlsxwriter or openpyxl; install one or export the PDF only.")
+        if years not in YEAR_SCOPES:
+            raise ValueError(f"Report years must be one of {YEAR_SCOPES}, not {years!r}.")
+        for scenario in scenarios:
+            for year, mix in (scenario.fuel_mix_by_year or {}).items():
+                if not fuel_engine.mix_sums_ok(fuel_engine.mix_vector(year, mix)):
+                    raise ValueError(f"{scenario.name}: the {year} fuel mix must sum to 100%.")
+        names = {}
+        for i, scenario in enumerate(scenarios):  # Unique names: they label sheets rows and pages
+            names[scenario.name] = names.get(scenario.name, 0) + 1
+            if names[scenario.name] > 1:
+                scenarios[i] = scenario._replace(name=f"{scenario.name} ({names[scenario.name]})")
+        for kind, png in (prerendered or {}).items():
+            self.chart_cache.put(kind, {"data_version": config_version()}, png)
+
+        report_id = uuid.uuid4().hex[:12]
+        record = {"id": report_id, "state": "running", "formats": formats, "n_charts": 0, "charts_done": 0,
+                  "cached": 0, "created": time.time(), "finished": None, "error": "",
+                  "dir": os.path.join(self.reports_dir, report_id),
+                  "label": label or f"{len(scenarios)} scenario{'s' * (len(scenarios) > 1)}, "
+                                    f"{'snapshot years' if years == 'snapshots' else 'full timeline'}"}
+        os.makedirs(record["dir"])
+        with self._lock:
+            self._reports[report_id] = record
+            self._prune()
+        self._builders.submit(self._build, record, scenarios, years, discount_rate, calculated_gfi, calculation_year)
+        return report_id
+
+    def _build(self, record, scenarios, years, discount_rate, calculated_gfi, calculation_year):
+        try:
+            scored = score_scenarios(scenarios, years, discount_rate)
+            tables = report_tables(scored)
+            tasks = chart_tasks(scored, tables, calculated_gfi, calculation_year)
+            with self._lock:
+                record["n_charts"] = len(tasks)
+            charts = [self.chart_cache.get(task.kind, task.payload) for task in tasks]
+            futures = {}
+            for i, task in enumerate(tasks):
+                if charts[i] is not None:
+                    self._chart_done(record, cached=True)
+                    continue
+                futures[i] = self._executor().submit(render_chart, task.kind, task.payload)
+                futures[i].add_done_callback(lambda future: self._chart_done(record))
+            for i, future in futures.items():
+                charts[i] = future.result()
+                self.chart_cache.put(tasks[i].kind, tasks[i].payload, charts[i])
+
+            files = []
+            if "xlsx" in record["formats"]:
+                titled = [(task.name, png) for task, png in zip(tasks, charts) if task.kind != "table"]
+                files.append(self._executor().submit(write_workbook, os.path.join(record["dir"], "report.xlsx"),
+                                                     tables, titled))
+            if "pdf" in record["formats"]:
+                files.append(self._executor().submit(write_pdf, os.path.join(record["dir"], "report.pdf"), charts))
+            wait(files)
+            for future in files:
+                future.result()
+            state, error = "completed", ""
+        except Exception as e:  # Reported on the status; the server keeps running
+            if isinstance(e, BrokenProcessPool):
+                with self._lock:
+                    self._pool = None
+            state, error = "failed", f"{type(e).__name__}: {e}"
+        with self._lock:
+            record.update(state=state, error=error, finished=time.time())
+            fuel_jobs._write_json(os.path.join(record["dir"], "report.json"),
+                                  {key: value for key, value in record.items() if key != "dir"})
+        instrumentation.METRICS.inc("reports_total", state=state)
+        instrumentation.METRICS.observe("report_build_seconds", record["finished"] - record["created"])
+
+    def _chart_done(self, record, cached=False):
+        with self._lock:
+            record["charts_done"] += 1
+            record["cached"] += cached
+        instrumentation.METRICS.inc("report_charts_total", source="cache" if cached else "rendered")
+
+    def _prune(self):
+        finished = [r for r in self._reports.values() if r["state"] != "running"]
+        for record in finished[:max(0, len(self._reports) - self.max_reports)]:
+            del self._reports[record["id"]]
+            shutil.rmtree(record["dir"], ignore_errors=True)
+
+    def _record(self, report_id):
+        try:
+            return self._reports[report_id]
+        except KeyError:
+            raise KeyError(f"No report with id {report_id!r}.") from None
+
+    def status(self, report_id):
+        with self._lock:
+            record = dict(self._record(report_id))
+        return ReportStatus(
+            report_id=record["id"], label=record["label"], state=record["state"],
+            charts_done=record["charts_done"], n_charts=record["n_charts"], cached_charts=record["cached"],
+            formats=record["formats"], created=record["created"],
+            seconds=(record["finished"] or time.time()) - record["created"], error=record["error"],
+        )
+
+    def path(self, report_id, fmt):
+        """Path of a completed report's file in ``fmt`` (a REPORT_FORMATS entry)."""
+        with self._lock:
+            record = self._record(report_id)
+            if record["state"] != "completed" or fmt not in record["formats"]:
+                raise KeyError(f"Report {report_id!r} has no finished {fmt} file.")
+            return os.path.join(record["dir"], f"report.{fmt}")
+
+    def data(self, report_id, fmt):
+        """Bytes of a completed report's file in ``fmt``."""
+        with open(self.path(report_id, fmt), "rb") as f:
+            return f.read()
+
+    def shutdown(self):
+        self._builders.shutdown(wait=True, cancel_futures=True)
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
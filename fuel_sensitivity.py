@@ -0,0 +1,149 @@
+"""Closed-form sensitivities of fuel expenditure and base-fuel demand.
+
+Per scenario, fuel expenditure is ``C = T * sum_f (m_f / 100) * p_f`` and base-fuel demand is
+``D_b = T * sum_f (m_f / 100) * B_fb``, with fleet consumption ``T = sum_v n_v * c_v``. Both
+are linear in each vessel count, price and mix share, so the Jacobian below is exact and a
+±X% swing of any one input is just ``derivative * X% * value`` -- no re-simulation.
+
+Mix shares are perturbed with the other fuels rebalanced in proportion to their shares, so
+the mix keeps summing to 100%, and a share's swing stops at 0% and 100%; their derivatives
+are per percentage point. Everything is
+vectorized over a leading scenario/year axis, so all years are analysed in one pass.
+"""
+from typing import NamedTuple
+
+import numpy as np
+
+from fuel_config import VESSEL_TYPES_OWNED
+import fuel_engine
+import fuel_timeline
+
+PARAMETER_GROUPS = ("Vessel count", "Fuel price", "Mix share")
+COST_OUTPUT = "Fuel expenditure"
+
+
+class Sensitivity(NamedTuple):
+    outputs: tuple          # (O,) COST_OUTPUT then "<base fuel> demand"
+    parameters: tuple       # (P,) input labels
+    groups: tuple           # (P,) PARAMETER_GROUPS entry of each input
+    values: np.ndarray      # (N, P) input values: vessels, USD/GJ, percent
+    base: np.ndarray        # (N, O) output values: USD/year, GJ/year
+    jacobian: np.ndarray    # (N, O, P) exact partial derivatives d output / d input
+
+
+def jacobian(vessel_counts, consumption_factors, fuel_mix, fuel_costs_gj, base_matrix):
+    """(base outputs (N, 1 + B), Jacobian (N, 1 + B, V + 2F)) in closed form.
+
+    Input columns are vessel counts (V), fuel prices (F) and mix shares (F); output rows
+    are fuel expenditure and the demand for each base fuel.
+    """
+    counts = np.atleast_2d(np.asarray(vessel_counts, dtype=float))
+    factors = np.broadcast_to(np.asarray(consumption_factors, dtype=float), counts.shape)
+    mix = np.atleast_2d(np.asarray(fuel_mix, dtype=float))
+    prices = np.broadcast_to(np.asarray(fuel_costs_gj, dtype=float), mix.shape)
+    n, f = mix.shape
+    b = base_matrix.shape[1]
+
+    total = (counts * factors).sum(axis=-1)          # (N,) GJ/year
+    shares = mix / 100.0
+    unit_cost = (shares * prices).sum(axis=-1)       # (N,) USD/GJ
+    unit_base = shares @ base_matrix                 # (N, B) GJ per GJ
+    # Share-weighted price / base fraction of the *other* fuels, which absorb a share change
+    rest = 100.0 - mix
+    rest_cost = np.divide(unit_cost[:, None] * 100.0 - mix * prices, rest, out=np.zeros_like(mix), where=rest > 0)
+    rest_base = np.divide(unit_base[:, None, :] * 100.0 - mix[:, :, None] * base_matrix, rest[:, :, None],
+                          out=np.zeros((n, f, b)), where=rest[:, :, None] > 0)  # (N, F, B)
+
+    d_cost = np.concatenate([
+        factors * unit_cost[:, None],                      # per vessel
+        total[:, None] * shares,                           # per USD/GJ
+        total[:, None] * (prices - rest_cost) / 100.0,     # per percentage point
+    ], axis=1)
+    d_demand = np.concatenate([
+        factors[:, None, :] * unit_base[:, :, None],
+        np.zeros((n, b, f)),
+        (total[:, None, None] * (base_matrix - rest_base) / 100.0).transpose(0, 2, 1),
+    ], axis=2)
+    base = np.column_stack([total * unit_cost, total[:, None] * unit_base])
+    return base, np.concatenate([d_cost[:, None, :], d_demand], axis=1)
+
+
+def sensitivity(tables, vessel_counts, fuel_mix, consumption_factors=None, fuel_costs_gj=None):
+    """Sensitivity of N scenarios sharing ``tables`` (one row per scenario or year)."""
+    factors = tables.consumption_factors if consumption_factors is None else consumption_factors
+    prices = tables.fuel_costs_gj if fuel_costs_gj is None else fuel_costs_gj
+    base, jac = jacobian(vessel_counts, factors, fuel_mix, prices, tables.base_matrix)
+    n = base.shape[0]
+    values = np.column_stack([
+        np.broadcast_to(np.asarray(vessel_counts, dtype=float), (n, len(VESSEL_TYPES_OWNED))),
+        np.broadcast_to(np.asarray(prices, dtype=float), (n, len(tables.mix_keys))),
+        np.broadcast_to(np.asarray(fuel_mix, dtype=float), (n, len(tables.mix_keys))),
+    ])
+    parameters = (tuple(VESSEL_TYPES_OWNED) + tuple(tables.display_names) + tuple(tables.display_names))
+    groups = tuple(np.repeat(PARAMETER_GROUPS, [len(VESSEL_TYPES_OWNED), len(tables.mix_keys), len(tables.mix_keys)]))
+    outputs = (COST_OUTPUT,) + tuple(f"{name} demand" for name in tables.base_names)
+    return Sensitivity(outputs, parameters, groups, values, base, jac)
+
+
+def year_sensitivity(year, vessel_counts, fuel_mix, consumption_factors=None):
+    """One-row Sensitivity for a snapshot year (``fuel_mix`` ordered like the year's mix keys)."""
+    return sensitivity(fuel_engine.get_year_tables(year), vessel_counts, fuel_mix, consumption_factors)
+
+
+def timeline_sensitivity(timeline):
+    """One row per year of a ``fuel_timeline.TimelineResults``."""
+    inputs = fuel_timeline.get_timeline_tables()
+    return sensitivity(timeline.tables, timeline.vessel_counts, timeline.fuel_mix,
+                       inputs.consumption_factors, inputs.fuel_costs_gj)
+
+
+def input_steps(sens, pct):
+    """(down, up) input changes for a ±``pct``% swing, each (N, P) and non-negative.
+
+    Mix shares stay within [0, 100]: a share can rise by at most ``100 - m`` and fall by at
+    most ``m`` points, so swings of large or small shares are asymmetric.
+    """
+    step = np.abs(sens.values) * pct / 100.0
+    down, up = step.copy(), step.copy()
+    shares = np.array(sens.groups) == "Mix share"
+    up[:, shares] = np.minimum(step[:, shares], 100.0 - sens.values[:, shares])
+    down[:, shares] = np.minimum(step[:, shares], sens.values[:, shares])
+    return down, up
+
+
+def swings(sens, pct, aggregate=False):
+    """Change in each output for a -``pct``% and a +``pct``% change of each input, two (N, O, P) arrays.
+
+    The model is linear in every single input, so without a mix-share bound the two are
+    exact negatives. With ``aggregate`` the rows are summed: each input moves by ``pct``% in
+    every year at once.
+    """
+    down, up = input_steps(sens, pct)
+    low, high = -sens.jacobian * down[:, None, :], sens.jacobian * up[:, None, :]
+    if aggregate:
+        return low.sum(axis=0, keepdims=True), high.sum(axis=0, keepdims=True)
+    return low, high
+
+
+def tornado(sens, output, pct, aggregate=False, row=0, top=None):
+    """Inputs ranked by swing size for one output: [(label, at -pct%, at +pct%, derivative)].
+
+    With ``aggregate`` the outputs are totals over all rows and the derivative is the
+    response of that total to the same absolute change of the input in every row. Mix
+    shares whose swing is cut short at 0% or 100% are labelled so.
+    """
+    o = sens.outputs.index(output)
+    r = slice(None) if aggregate else slice(row, row + 1)
+    low, high = (delta[0 if aggregate else row, o] for delta in swings(sens, pct, aggregate))
+    base = sens.base[:, o].sum() if aggregate else sens.base[row, o]
+    derivative = sens.jacobian[:, o].sum(axis=0) if aggregate else sens.jacobian[row, o]
+    down, up = input_steps(sens, pct)
+    step = np.abs(sens.values[r]) * pct / 100.0
+    capped = (up[r] < step).any(axis=0)
+    floored = (down[r] < step).any(axis=0)
+    size = np.maximum(np.abs(low), np.abs(high))
+    order = np.argsort(-size, kind="stable")
+    order = order[size[order] > 0][:top]
+    label = lambda i: (f"{sens.groups[i]}: {sens.parameters[i]}" + (" (capped at 100%)" if capped[i] else "")
+                       + (" (floored at 0%)" if floored[i] else ""))
+    return [(label(i), float(base + low[i]), float(base + high[i]), float(derivative[i])) for i in order]
@@ -0,0 +1,92 @@
+"""Compact per-session model: what each browser session keeps in ``st.session_state``.
+
+Server memory grows with what every concurrent session holds, so sessions keep only:
+
+* inputs -- the vessel-count widgets and the fuel-mix widgets of the selected year (other
+  years' mix keys are dropped by ``prune_mix_keys``), read as fixed-layout arrays against the
+  shared ``fuel_engine.YearTables`` by ``read_inputs``;
+* results -- one ``fuel_engine.ScenarioResults`` of small arrays, labelled from the year
+  tables when rendered instead of stored as string-keyed dicts;
+* no derived objects -- chart figures live in one process-wide ``FigureCache`` shared by all
+  sessions, and display tables are built from the result arrays on demand.
+
+``python fuel_memory.py`` measures the resulting bytes per session.
+"""
+import hashlib
+import pickle
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from fuel_config import VESSEL_KEYS, FUEL_MIX_CATEGORIES, ALL_FUEL_MIX_KEYS
+
+_MISS = object()  # FigureCache miss; builders may return None (e.g. nothing to plot)
+
+
+def vessel_widget_key(vessel_key):
+    return f"owned_{vessel_key}"
+
+
+def read_inputs(state, year):
+    """(vessel counts (V,), fuel mix (F,) in the year's mix-key order) from the session's widgets."""
+    counts = np.array([state.get(vessel_widget_key(k), 0) for k in VESSEL_KEYS], dtype=float)
+    mix = np.array([state.get(k, 0.0) for k in FUEL_MIX_CATEGORIES.get(year, {})], dtype=float)
+    return counts, mix
+
+
+def prune_mix_keys(state, year):
+    """Drop fuel-mix widget values of years other than ``year``; they are reset on a year change anyway."""
+    keep = FUEL_MIX_CATEGORIES.get(year, {})
+    for key in ALL_FUEL_MIX_KEYS:
+        if key not in keep and key in state:
+            del state[key]
+
+
+def data_digest(data):
+    """Content hash of a chart's source data (dicts, arrays, scalars)."""
+    return hashlib.blake2b(pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL), digest_size=16).hexdigest()
+
+
+class FigureCache:
+    """Process-wide LRU of built chart figures (or rendered chart bytes) keyed by chart name and source data.
+
+    Figures are shared by every session that draws the same data, so callers must treat
+    them as read-only. Building happens outside the lock; two sessions racing on the same
+    new key may both build, and the last one wins.
+    """
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, name, data, default=None):
+        """The cached figure for ``(name, data)``, or ``default``."""
+        key = (name, data_digest(data))
+        with self._lock:
+            figure = self._entries.get(key, _MISS)
+            if figure is _MISS:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return figure
+
+    def put(self, name, data, figure):
+        with self._lock:
+            self._entries[(name, data_digest(data))] = figure
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_build(self, name, data, build):
+        figure = self.get(name, data, _MISS)
+        if figure is _MISS:
+            figure = build()
+            self.put(name, data, figure)
+        return figure
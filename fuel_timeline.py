@@ -0,0 +1,130 @@
+"""Annual 2025-2050 timeline built from the snapshot-year configuration.
+
+Snapshot tables (YEAR_OPTIONS) are interpolated onto every year once; the whole trajectory
+is then scored in a single engine call with one row per year.
+"""
+from functools import lru_cache
+from typing import NamedTuple
+
+import numpy as np
+
+from fuel_config import (
+    YEAR_OPTIONS, VESSEL_KEYS, FUEL_MIX_CATEGORIES, DEFAULT_FUEL_MIX, DEFAULT_OWNED_VESSEL_COUNTS,
+    VESSEL_CONSUMPTION_FACTORS, DEFAULT_FUEL_COSTS_GJ, FUEL_PRICE_PROJECTION_ROWS,
+)
+import fuel_compliance
+import fuel_engine
+
+TIMELINE_YEARS = np.arange(2025, 2051)
+DEFAULT_DISCOUNT_RATE = 0.08
+
+
+class TimelineTables(NamedTuple):
+    years: np.ndarray                # (Y,)
+    tables: fuel_engine.YearTables   # fuel axis is the union of all snapshot-year fuels
+    consumption_factors: np.ndarray  # (Y, V) GJ/year per vessel
+    fuel_costs_gj: np.ndarray        # (Y, F) USD/GJ
+
+
+class TimelineResults(NamedTuple):
+    years: np.ndarray
+    tables: fuel_engine.YearTables
+    vessel_counts: np.ndarray        # (Y, V)
+    fuel_mix: np.ndarray             # (Y, F) percent
+    batch: fuel_engine.BatchResults  # one row per year
+    cumulative_cost: np.ndarray      # (Y,) USD, running total
+    npv_cost: float                  # USD, discounted to the first timeline year
+    discount_rate: float
+    compliance: fuel_compliance.ComplianceResults  # (Y,) GFI, zone and penalty/credit cost per year
+    npv_compliance_cost: float       # USD, discounted like npv_cost
+
+
+def interpolate_snapshots(snapshots, keys, years=TIMELINE_YEARS):
+    """Linearly interpolate ``{snapshot year: {key: value}}`` onto ``years`` as a (Y, K) array.
+
+    Keys missing from a snapshot count as 0; years outside the snapshots are held flat.
+    """
+    anchor_years = sorted(snapshots)
+    anchors = np.array([[snapshots[y].get(k, 0.0) for k in keys] for y in anchor_years], dtype=float)
+    return np.column_stack([np.interp(years, anchor_years, anchors[:, i]) for i in range(len(keys))])
+
+
+def step_snapshots(snapshots, keys, years=TIMELINE_YEARS):
+    """Hold each snapshot's values until the next snapshot year (integer fleet counts)."""
+    anchor_years = np.array(sorted(snapshots))
+    anchors = np.array([[snapshots[y].get(k, 0) for k in keys] for y in anchor_years], dtype=float)
+    idx = np.clip(np.searchsorted(anchor_years, years, side="right") - 1, 0, len(anchor_years) - 1)
+    return anchors[idx]
+
+
+def _projected_prices(mix_keys, years):
+    proj_years, rows = fuel_engine.price_projection_table()
+    prices = np.empty((len(years), len(mix_keys)))
+    for i, key in enumerate(mix_keys):
+        anchor_years = [y for y in YEAR_OPTIONS if key in DEFAULT_FUEL_COSTS_GJ.get(y, {})]
+        anchor_prices = np.array([DEFAULT_FUEL_COSTS_GJ[y][key] for y in anchor_years])
+        row = rows.get(FUEL_PRICE_PROJECTION_ROWS.get(fuel_engine.fuel_base_key(key), ""))
+        if row is None:
+            prices[:, i] = np.interp(years, anchor_years, anchor_prices)
+            continue
+        # Follow the projection curve's shape, scaled to match the snapshot prices.
+        valid = ~np.isnan(row)
+        curve = lambda y: np.interp(y, proj_years[valid], row[valid])
+        ratio = np.interp(years, anchor_years, anchor_prices / curve(np.array(anchor_years)))
+        prices[:, i] = curve(years) * ratio
+    return prices
+
+
+@lru_cache(maxsize=None)
+def get_timeline_tables():
+    categories = {}
+    for year in sorted(FUEL_MIX_CATEGORIES):
+        categories.update(FUEL_MIX_CATEGORIES[year])
+    first_year = min(VESSEL_CONSUMPTION_FACTORS)
+    tables = fuel_engine.build_year_tables(
+        None, categories, VESSEL_CONSUMPTION_FACTORS[first_year], DEFAULT_FUEL_COSTS_GJ[first_year]
+    )
+    consumption_factors = interpolate_snapshots(VESSEL_CONSUMPTION_FACTORS, VESSEL_KEYS)
+    fuel_costs_gj = _projected_prices(tables.mix_keys, TIMELINE_YEARS)
+    for arr in (consumption_factors, fuel_costs_gj):
+        arr.setflags(write=False)
+    return TimelineTables(TIMELINE_YEARS, tables, consumption_factors, fuel_costs_gj)
+
+
+def compute_timeline(owned_counts_by_year=None, fuel_mix_by_year=None,
+                     discount_rate=DEFAULT_DISCOUNT_RATE):
+    """Score every year of the timeline in one vectorized engine pass.
+
+    The optional ``{snapshot year: {...}}`` overrides replace the defaults for those snapshot
+    years before interpolation (e.g. the user's inputs for the selected year). Raises ValueError
+    if an override mix does not sum to 100%.
+    """
+    timeline = get_timeline_tables()
+    tables = timeline.tables
+    for year, mix in (fuel_mix_by_year or {}).items():
+        if not fuel_engine.mix_sums_ok(fuel_engine.mix_vector(year, mix)):
+            raise ValueError(f"The {year} fuel mix must sum to 100%.")
+    counts_snapshots = {**DEFAULT_OWNED_VESSEL_COUNTS, **(owned_counts_by_year or {})}
+    mix_snapshots = {**DEFAULT_FUEL_MIX, **(fuel_mix_by_year or {})}
+    vessel_counts = step_snapshots(counts_snapshots, VESSEL_KEYS)
+    fuel_mix = interpolate_snapshots(mix_snapshots, tables.mix_keys)
+
+    batch = fuel_engine.compute_batch(vessel_counts, fuel_mix, timeline.consumption_factors,
+                                      timeline.fuel_costs_gj, tables.produced_mask,
+                                      tables.procured_mask, tables.base_matrix)
+    discount = (1.0 + discount_rate) ** -(timeline.years - timeline.years[0])
+    compliance = fuel_compliance.assess_compliance(
+        fuel_compliance.fleet_gfi(fuel_mix, tables.emission_factors), batch.total_consumption, timeline.years
+    )
+    return TimelineResults(
+        years=timeline.years,
+        tables=tables,
+        vessel_counts=vessel_counts,
+        fuel_mix=fuel_mix,
+        batch=batch,
+        cumulative_cost=np.cumsum(batch.total_cost),
+        npv_cost=float(batch.total_cost @ discount),
+        discount_rate=discount_rate,
+        compliance=compliance,
+        npv_compliance_cost=float(compliance.cost @ discount),
+    )
@@ -0,0 +1,301 @@
+"""Lightweight timing and metrics helpers for the Streamlit app.
+
+Import timings are process-wide (a module is only imported once per server process);
+section timings are measured per script run with a lap timer. ``METRICS`` aggregates
+section spans, cache calls/misses, figure payload sizes and memory across all sessions of
+the process. Counting is always on (a dict update per event); the costlier measurements
+and the exports -- JSON log lines (``FUEL_METRICS_LOG``) and a Prometheus text file
+(``FUEL_METRICS_PROM``, for a textfile collector) -- only run when enabled.
+"""
+import functools
+import importlib
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+PROCESS_START = time.perf_counter()
+METRICS_LOG = os.environ.get("FUEL_METRICS_LOG")    # "1" for stderr, or a log file path
+METRICS_PROM_FILE = os.environ.get("FUEL_METRICS_PROM")
+PROM_WRITE_INTERVAL_S = float(os.environ.get("FUEL_METRICS_PROM_INTERVAL", "10"))
+EXPORT_ENABLED = bool(METRICS_LOG or METRICS_PROM_FILE)
+METRIC_PREFIX = "fuel_supplier_"
+IMPORT_TIMINGS_MS = {}  # module name -> first import duration in this process
+_import_lock = threading.Lock()
+
+# Per-section budgets for the first render of a session, in milliseconds.
+SECTION_BUDGETS_MS = {
+    "Imports": 300.0,
+    "Session State": 20.0,
+    "Inputs": 150.0,
+    "Calculation": 100.0,
+    "Outputs": 300.0,
+    "Timeline": 150.0,
+    "Renewal": 100.0,
+    "Sensitivity": 50.0,
+    "Frontier": 400.0,
+    "Sweeps": 30.0,
+    "Scenarios": 30.0,
+    "Outlook Charts": 500.0,
+    "Reports": 30.0,
+}
+
+
+def lazy_import(module_name):
+    """Import ``module_name`` on first use, recording how long the cold import took."""
+    module = sys.modules.get(module_name)
+    if module is not None:
+        return module
+    with _import_lock:
+        start = time.perf_counter()
+        module = importlib.import_module(module_name)
+        IMPORT_TIMINGS_MS.setdefault(module_name, (time.perf_counter() - start) * 1000.0)
+    return module
+
+
+class SectionTimer:
+    """Lap timer: ``lap(name)`` records the time since the previous lap (or construction)."""
+
+    def __init__(self, start=None):
+        self._last = time.perf_counter() if start is None else start
+        self.laps_ms = {}
+
+    def lap(self, name):
+        now = time.perf_counter()
+        self.laps_ms[name] = self.laps_ms.get(name, 0.0) + (now - self._last) * 1000.0
+        self._last = now
+
+    def skip(self):
+        """Restart the lap without attributing the elapsed time (e.g. unrelated UI)."""
+        self._last = time.perf_counter()
+
+    @property
+    def total_ms(self):
+        return sum(self.laps_ms.values())
+
+
+def startup_report(first_render_ms, last_render_ms, budgets=SECTION_BUDGETS_MS):
+    """Rows of (section, first render ms, last rerun ms, budget ms, within budget)."""
+    rows = []
+    for section in dict.fromkeys([*first_render_ms, *last_render_ms]):
+        first = first_render_ms.get(section)
+        budget = budgets.get(section)
+        rows.append({
+            "Section": section,
+            "First Render (ms)": first,
+            "Last Rerun (ms)": last_render_ms.get(section),
+            "Budget (ms)": budget,
+            "Within Budget": None if first is None or budget is None else first <= budget,
+        })
+    return rows
+
+
+# --- Metrics ---
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+class Metrics:
+    """Thread-safe process-wide counters, gauges and summaries (count/sum/max), by name and labels."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}   # (name, labels) -> value
+        self.gauges = {}     # (name, labels) -> value
+        self.summaries = {}  # (name, labels) -> [count, sum, max]
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self.gauges[(name, _label_key(labels))] = value
+
+    def observe(self, name, value, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            summary = self.summaries.setdefault(key, [0, 0.0, value])
+            summary[0] += 1
+            summary[1] += value
+            summary[2] = max(summary[2], value)
+
+    def rows(self, name):
+        """[(labels dict, value)] for a counter/gauge, or [(labels dict, [count, sum, max])]."""
+        with self._lock:
+            items = [*self.counters.items(), *self.gauges.items(), *self.summaries.items()]
+        return [(dict(labels), value if not isinstance(value, list) else list(value))
+                for (metric, labels), value in items if metric == name]
+
+    def prometheus_text(self):
+        def fmt(labels):
+            if not labels:
+                return ""
+            return "{" + ",".join(f'{k}="{str(v).replace(chr(34), chr(39))}"' for k, v in labels) + "}"
+
+        def num(value):
+            return str(int(value)) if float(value).is_integer() else f"{value:.6g}"
+
+        with self._lock:
+            groups = [("counter", self.counters), ("gauge", self.gauges), ("summary", self.summaries)]
+            lines = []
+            for kind, values in groups:
+                for name in sorted({name for name, _ in values}):
+                    metric = METRIC_PREFIX + name
+                    lines.append(f"# TYPE {metric} {kind}")
+                    for (n, labels), value in sorted(values.items()):
+                        if n != name:
+                            continue
+                        if kind == "summary":
+                            lines.append(f"{metric}_count{fmt(labels)} {value[0]}")
+                            lines.append(f"{metric}_sum{fmt(labels)} {num(value[1])}")
+                        else:
+                            lines.append(f"{metric}{fmt(labels)} {num(value)}")
+                    if kind == "summary":
+                        lines.append(f"# TYPE {metric}_max gauge")
+                        lines.extend(f"{metric}_max{fmt(labels)} {num(value[2])}"
+                                     for (n, labels), value in sorted(values.items()) if n == name)
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Metrics()
+
+
+def counted_cache(cache_decorator):
+    """Wrap a cache decorator (e.g. ``st.cache_data(...)``) to count calls and misses per function.
+
+    The inner function only runs on a cache miss, so hits are calls minus misses.
+    """
+    def decorate(fn):
+        name = fn.__name__
+
+        @functools.wraps(fn)
+        def on_miss(*args, **kwargs):
+            METRICS.inc("cache_misses_total", cache=name)
+            return fn(*args, **kwargs)
+
+        cached = cache_decorator(on_miss)
+
+        @functools.wraps(fn)
+        def call(*args, **kwargs):
+            METRICS.inc("cache_calls_total", cache=name)
+            return cached(*args, **kwargs)
+
+        call.clear = cached.clear
+        return call
+    return decorate
+
+
+def cache_stats():
+    """Rows of (cache, calls, misses, hit rate) from the counted caches."""
+    misses = {labels["cache"]: value for labels, value in METRICS.rows("cache_misses_total")}
+    rows = []
+    for labels, calls in sorted(METRICS.rows("cache_calls_total"), key=lambda row: row[0]["cache"]):
+        miss = misses.get(labels["cache"], 0)
+        rows.append({"Cache": labels["cache"], "Calls": calls, "Misses": miss,
+                     "Hit Rate": (calls - miss) / calls if calls else None})
+    return rows
+
+
+# --- Sizes ---
+def approx_size(obj, _seen=None):
+    """Approximate deep size in bytes of plain containers, NumPy arrays and pandas objects."""
+    _seen = set() if _seen is None else _seen
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+    nbytes = getattr(obj, "nbytes", None)
+    if isinstance(nbytes, int) and hasattr(obj, "dtype"):
+        return nbytes + sys.getsizeof(obj) if obj.base is None else sys.getsizeof(obj)
+    if hasattr(obj, "memory_usage") and hasattr(obj, "index"):  # pandas Series/DataFrame
+        usage = obj.memory_usage(deep=True)
+        return int(usage.sum() if hasattr(usage, "sum") else usage)
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(approx_size(k, _seen) + approx_size(v, _seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(approx_size(item, _seen) for item in obj)
+    elif hasattr(obj, "__dict__"):
+        size += approx_size(vars(obj), _seen)
+    return size
+
+
+def session_memory(state):
+    """{session_state key: approximate bytes}, largest first."""
+    sizes = {str(key): approx_size(value) for key, value in state.items()}
+    return dict(sorted(sizes.items(), key=lambda item: -item[1]))
+
+
+def process_rss_bytes():
+    """Current resident set size of this process (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+# --- Export ---
+_logger = logging.getLogger("fuel_supplier.metrics")
+_export_lock = threading.Lock()
+_last_prom_write = 0.0
+
+
+def _log_handler():
+    if METRICS_LOG in ("1", "stderr"):
+        return logging.StreamHandler(sys.stderr)
+    return logging.FileHandler(METRICS_LOG)
+
+
+def write_prometheus(path):
+    """Atomically replace ``path`` with the current metrics in Prometheus text format."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".metrics-")
+    with os.fdopen(fd, "w") as f:
+        f.write(METRICS.prometheus_text())
+    os.replace(tmp, path)
+
+
+def record_figure(name, payload_bytes):
+    METRICS.observe("figure_payload_bytes", payload_bytes, figure=name)
+
+
+def record_run(section_ms, session_id=None, figure_bytes=None, session_bytes=None):
+    """Fold one script run into METRICS and, when enabled, emit a JSON log line / Prometheus file.
+
+    ``figure_bytes`` (already recorded per figure) only goes into the log line.
+    """
+    global _last_prom_write
+    for section, ms in section_ms.items():
+        METRICS.observe("section_duration_ms", ms, section=section)
+    METRICS.observe("run_duration_ms", sum(section_ms.values()))
+    if session_bytes is not None:
+        METRICS.observe("session_state_bytes", sum(session_bytes.values()))
+    if not EXPORT_ENABLED:
+        return
+    METRICS.set("process_resident_bytes", process_rss_bytes())
+    if METRICS_LOG:
+        with _export_lock:
+            if not _logger.handlers:
+                _logger.addHandler(_log_handler())
+                _logger.setLevel(logging.INFO)
+                _logger.propagate = False
+        _logger.info(json.dumps({
+            "event": "script_run", "ts": time.time(), "session": session_id,
+            "sections_ms": {k: round(v, 3) for k, v in section_ms.items()},
+            "total_ms": round(sum(section_ms.values()), 3),
+            "figure_bytes": figure_bytes or {},
+            "session_state_bytes": sum(session_bytes.values()) if session_bytes else None,
+            "rss_bytes": METRICS.gauges.get(("process_resident_bytes", ())),
+        }))
+    now = time.monotonic()
+    if METRICS_PROM_FILE and now - _last_prom_write >= PROM_WRITE_INTERVAL_S:
+        with _export_lock:
+            _last_prom_write = now
+            write_prometheus(METRICS_PROM_FILE)
@@ -0,0 +1,110 @@
+"""Incremental recalculation of a single scenario as its inputs change.
+
+The outputs form a small dependency graph (``DEPENDENCIES``). When inputs change, only the
+changed elements are pushed through it: editing one fuel's share recomputes that fuel's
+consumption/cost row, the cost totals and its base-fuel bucket, while a vessel-count edit
+changes total consumption and therefore every fuel row. Each output carries a version that
+is bumped only when its values actually change, so views can skip redrawing the rest.
+"""
+import numpy as np
+
+import fuel_engine
+
+INPUTS = ("vessel_counts", "consumption_factors", "fuel_mix", "fuel_costs_gj")
+# output -> inputs/outputs it is computed from, in topological order
+DEPENDENCIES = {
+    "consumption_by_type": ("vessel_counts", "consumption_factors"),
+    "total_consumption": ("consumption_by_type",),
+    "consumption_by_mix": ("total_consumption", "fuel_mix"),
+    "cost_by_mix": ("consumption_by_mix", "fuel_costs_gj"),
+    "total_cost": ("cost_by_mix",),
+    "produced_cost": ("cost_by_mix",),
+    "procured_cost": ("cost_by_mix",),
+    "base_fuel_demand": ("consumption_by_mix",),
+}
+_VECTOR_OUTPUTS = ("consumption_by_type", "consumption_by_mix", "cost_by_mix", "base_fuel_demand")
+_ALL = slice(None)
+
+
+class LiveCalculation:
+    def __init__(self, tables, vessel_counts, fuel_mix, consumption_factors=None, fuel_costs_gj=None):
+        self.tables = tables
+        self.values = {
+            "vessel_counts": np.array(vessel_counts, dtype=float),
+            "consumption_factors": np.array(tables.consumption_factors if consumption_factors is None
+                                            else consumption_factors, dtype=float),
+            "fuel_mix": np.array(fuel_mix, dtype=float),
+            "fuel_costs_gj": np.array(tables.fuel_costs_gj if fuel_costs_gj is None else fuel_costs_gj, dtype=float),
+        }
+        self._base_index = tables.base_matrix.argmax(axis=1)  # fuel -> base fuel bucket
+        self.versions = dict.fromkeys(DEPENDENCIES, 0)
+        self._propagate({name: _ALL for name in INPUTS})
+
+    def update(self, **inputs):
+        """Apply new input vectors (any of INPUTS); returns the names of outputs that changed."""
+        changed = {}
+        for name, new in inputs.items():
+            if new is None:
+                continue
+            new = np.asarray(new, dtype=float)
+            idx = np.flatnonzero(new != self.values[name])
+            if idx.size:
+                self.values[name][idx] = new[idx]
+                changed[name] = idx
+        return self._propagate(changed)
+
+    def _propagate(self, changed):
+        """Recompute the changed elements of each output; ``changed`` maps node -> indices."""
+        v = self.values
+        t = self.tables
+        updated = set()
+
+        def mark(name, idx, new):
+            old = v.get(name)
+            if old is not None and np.array_equal(old[idx], new):
+                return
+            if old is None or idx is _ALL:
+                v[name] = np.array(new, dtype=float)
+            else:
+                old[idx] = new
+            changed[name] = idx
+            updated.add(name)
+            self.versions[name] += 1
+
+        def touched(*names):
+            indices = [changed[n] for n in names if n in changed]
+            if any(i is _ALL for i in indices):
+                return _ALL
+            return np.unique(np.concatenate(indices)) if indices else None
+
+        idx = touched("vessel_counts", "consumption_factors")
+        if idx is not None:
+            mark("consumption_by_type", idx, v["vessel_counts"][idx] * v["consumption_factors"][idx])
+        if "consumption_by_type" in changed:
+            mark("total_consumption", _ALL, np.atleast_1d(v["consumption_by_type"].sum()))
+        idx = _ALL if "total_consumption" in changed else touched("fuel_mix")
+        if idx is not None:
+            mark("consumption_by_mix", idx, v["total_consumption"][0] * (v["fuel_mix"][idx] / 100.0))
+        idx = touched("consumption_by_mix", "fuel_costs_gj")
+        if idx is not None:
+            mark("cost_by_mix", idx, v["consumption_by_mix"][idx] * v["fuel_costs_gj"][idx])
+        if "cost_by_mix" in changed:
+            mark("total_cost", _ALL, np.atleast_1d(v["cost_by_mix"].sum()))
+            mark("produced_cost", _ALL, np.atleast_1d(v["cost_by_mix"] @ t.produced_mask))
+            mark("procured_cost", _ALL, np.atleast_1d(v["cost_by_mix"] @ t.procured_mask))
+        idx = touched("consumption_by_mix")
+        if idx is not None:
+            buckets = _ALL if idx is _ALL else np.unique(self._base_index[idx])
+            mark("base_fuel_demand", buckets, v["consumption_by_mix"] @ t.base_matrix[:, buckets])
+        return updated
+
+    def batch(self):
+        """The current outputs as a one-row ``fuel_engine.BatchResults``."""
+        return fuel_engine.BatchResults(**{
+            name: self.values[name][None] if name in _VECTOR_OUTPUTS else self.values[name]
+            for name in fuel_engine.BatchResults._fields
+        })
+
+    def results(self):
+        """``fuel_engine.ScenarioResults`` for the current inputs."""
+        return fuel_engine.scenario_results(self.tables, self.batch(), self.values["fuel_mix"])
@@ -0,0 +1,35 @@
+"""Per-user private directories for pickled and compiled files.
+
+Job units, cached results and compiled reference data are loaded back from disk, and
+unpickling runs code, so each such directory must be writable only by the server's user.
+Deliberately free of project imports, so any module can use it without import cycles.
+"""
+import getpass
+import os
+import stat
+import tempfile
+
+
+def user_dir(name):
+    """Per-user default directory ``<temp dir>/<name>-<uid>`` (not yet created)."""
+    user = os.getuid() if hasattr(os, "getuid") else getpass.getuser()
+    return os.path.join(tempfile.gettempdir(), f"{name}-{user}")
+
+
+def private_dir(path):
+    """Create ``path`` (mode 0700) if needed and check that only the current user can write to it.
+
+    Raises PermissionError for a directory owned by another user or writable by group or others.
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode):
+        raise PermissionError(f"{path} is not a directory")
+    if hasattr(os, "getuid"):
+        if info.st_uid != os.getuid():
+            raise PermissionError(f"{path} is owned by uid {info.st_uid}, not the current user")
+        if info.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+            raise PermissionError(f"{path} is writable by other users")
+        if info.st_mode & 0o077:
+            os.chmod(path, 0o700)
+    return path
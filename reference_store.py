@@ -0,0 +1,244 @@
+"""Versioned, memory-mapped reference data.
+
+The source tables live as TSV files next to a ``manifest.json`` that declares each table's
+columns and types. On first use they are compiled to one ``.npy`` file per column under
+``<data dir>/.compiled/<version>/``, where the version is a hash of the manifest and every
+source file. If the data directory is read-only (e.g. a packaged deploy), the compiled
+versions go to a per-user directory ``<temp dir>/fuel_supplier_reference-<uid>/`` instead,
+private to the user like the jobs directory. A new compile removes the superseded versions.
+Columns are then memory-mapped read-only, so all sessions in a server process share one
+copy and separate worker processes share the OS page cache instead of each parsing and
+holding their own.
+
+Point ``FUEL_REFERENCE_DATA_DIR`` at another directory to swap in different datasets
+without code changes.
+"""
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+from collections.abc import Mapping
+from functools import lru_cache
+
+import numpy as np
+
+from private_dirs import private_dir, user_dir
+
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reference_data")
+MANIFEST_FILE = "manifest.json"
+SCHEMA_FILE = "schema.json"
+_DTYPE_KINDS = {"int": "i", "float": "f", "str": "U"}
+
+
+class ReferenceDataError(ValueError):
+    pass
+
+
+class ReferenceTable(Mapping):
+    """Read-only mapping of column name -> 1-D array, all of equal length."""
+
+    def __init__(self, name, columns):
+        self.name = name
+        self._columns = columns
+
+    def __getitem__(self, column):
+        return self._columns[column]
+
+    def __iter__(self):
+        return iter(self._columns)
+
+    def __len__(self):
+        return len(self._columns)
+
+    @property
+    def n_rows(self):
+        return len(next(iter(self._columns.values()))) if self._columns else 0
+
+    def to_frame(self, index=None):
+        import pandas as pd
+        df = pd.DataFrame({name: np.asarray(col) for name, col in self._columns.items()})
+        return df.set_index(index) if index else df
+
+
+class ReferenceStore:
+    def __init__(self, data_dir, version, tables):
+        self.data_dir = data_dir
+        self.version = version
+        self.tables = tables
+
+    def table(self, name):
+        try:
+            return self.tables[name]
+        except KeyError:
+            raise ReferenceDataError(f"Reference table '{name}' not found in {self.data_dir}") from None
+
+
+def _read_manifest(data_dir):
+    with open(os.path.join(data_dir, MANIFEST_FILE)) as f:
+        return json.load(f)
+
+
+def data_version(data_dir):
+    """Hash of the manifest and all source files it references."""
+    manifest = _read_manifest(data_dir)
+    digest = hashlib.sha256(json.dumps(manifest, sort_keys=True).encode())
+    for name in sorted(manifest["tables"]):
+        with open(os.path.join(data_dir, manifest["tables"][name]["file"]), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def _convert(table, column, values, dtype):
+    try:
+        if dtype == "str":
+            return np.array([v.strip() for v in values], dtype=str)
+        if dtype == "int":
+            return np.array(values, dtype=np.int64)
+        return np.array([v.strip() or "nan" for v in values], dtype=np.float64)
+    except ValueError as e:
+        raise ReferenceDataError(f"{table}.{column}: cannot convert to {dtype} ({e})") from None
+
+
+def _read_tsv(path, table):
+    with open(path, newline="") as f:
+        rows = [line.rstrip("\r\n").split("\t") for line in f if line.strip()]
+    header, *body = rows
+    for i, row in enumerate(body, start=2):
+        if len(row) != len(header):
+            raise ReferenceDataError(f"{table}: row {i} has {len(row)} fields, expected {len(header)}")
+    return [h.strip() for h in header], [list(col) for col in zip(*body)] if body else [[] for _ in header]
+
+
+def _compile_table(data_dir, name, spec):
+    path = os.path.join(data_dir, spec["file"])
+    if spec.get("format") == "sectioned":
+        from export_data import parse_export_data
+        with open(path) as f:
+            frame, malformed = parse_export_data(f)
+        if malformed:
+            details = "; ".join(f"line {row.line_number}: {row.reason}" for row in malformed[:5])
+            raise ReferenceDataError(f"{name}: {len(malformed)} malformed rows in {spec['file']} ({details})")
+        (index_column, index_dtype), = spec["columns"].items()
+        columns = {index_column: _convert(name, index_column, [str(p) for p in frame.index], index_dtype)}
+        columns.update({str(c): frame[c].to_numpy(dtype=np.float64) for c in frame.columns})
+        return columns
+
+    header, raw = _read_tsv(path, name)
+    declared = spec.get("columns", {})
+    missing = [c for c in declared if c not in header]
+    if missing:
+        raise ReferenceDataError(f"{name}: missing columns {missing} in {spec['file']}")
+    value_dtype = spec.get("value_columns")
+    columns = {}
+    for column, values in zip(header, raw):
+        dtype = declared.get(column, value_dtype)
+        if dtype is None:
+            raise ReferenceDataError(f"{name}: unexpected column '{column}' in {spec['file']}")
+        columns[column] = _convert(name, column, values, dtype)
+    return columns
+
+
+def _user_compiled_root(data_dir):
+    """Per-user compiled directory for a read-only ``data_dir``, refused if others can write to it."""
+    root = private_dir(user_dir("fuel_supplier_reference"))
+    # One subdirectory per data directory, so pruning one's old versions leaves the others alone
+    return os.path.join(root, hashlib.sha256(os.path.abspath(data_dir).encode()).hexdigest()[:16])
+
+
+def compiled_root_for(data_dir):
+    """``<data dir>/.compiled``, or the per-user directory if that cannot be written."""
+    local = os.path.join(data_dir, ".compiled")
+    if os.access(local if os.path.isdir(local) else data_dir, os.W_OK):
+        return local
+    return _user_compiled_root(data_dir)
+
+
+def _remove_superseded(compiled_root, version):
+    for name in os.listdir(compiled_root):
+        if name != version and not name.startswith("."):  # Dot-prefixed: another compiler's staging
+            shutil.rmtree(os.path.join(compiled_root, name), ignore_errors=True)
+
+
+def compile_reference_data(data_dir=DEFAULT_DATA_DIR, compiled_root=None):
+    """Compile the TSV sources to per-column .npy files; returns the compiled directory.
+
+    A no-op if this version is already compiled; otherwise superseded versions are removed
+    once it is in place. Safe against concurrent compilers: each writes to a private
+    temporary directory that is atomically renamed into place.
+    """
+    version = data_version(data_dir)
+    compiled_root = compiled_root or compiled_root_for(data_dir)
+    target = os.path.join(compiled_root, version)
+    if os.path.exists(os.path.join(target, SCHEMA_FILE)):
+        return target
+
+    os.makedirs(compiled_root, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=f".{version}-", dir=compiled_root)
+    manifest = _read_manifest(data_dir)
+    schema = {"version": version, "tables": {}}
+    for name, spec in manifest["tables"].items():
+        os.makedirs(os.path.join(staging, name))
+        table_schema = []
+        for i, (column, values) in enumerate(_compile_table(data_dir, name, spec).items()):
+            filename = f"c{i:04d}.npy"
+            np.save(os.path.join(staging, name, filename), values)
+            table_schema.append({"name": column, "file": filename, "dtype": values.dtype.str,
+                                 "rows": int(values.shape[0])})
+        schema["tables"][name] = table_schema
+    with open(os.path.join(staging, SCHEMA_FILE), "w") as f:
+        json.dump(schema, f, indent=1)
+    try:
+        os.rename(staging, target)
+    except OSError:  # Another process compiled the same version first
+        shutil.rmtree(staging, ignore_errors=True)
+    else:
+        _remove_superseded(compiled_root, version)
+    return target
+
+
+def _load_column(path):
+    try:
+        return np.load(path, mmap_mode="r")
+    except ValueError:  # Zero-length arrays cannot be memory-mapped
+        return np.load(path)
+
+
+def _validate(manifest, schema, compiled_dir):
+    for name, spec in manifest["tables"].items():
+        if name not in schema["tables"]:
+            raise ReferenceDataError(f"Compiled data in {compiled_dir} has no table '{name}'")
+        compiled = {c["name"]: c for c in schema["tables"][name]}
+        for column, dtype in spec.get("columns", {}).items():
+            if column not in compiled:
+                raise ReferenceDataError(f"{name}: column '{column}' missing from compiled data")
+            if np.dtype(compiled[column]["dtype"]).kind != _DTYPE_KINDS[dtype]:
+                raise ReferenceDataError(f"{name}.{column}: expected {dtype}, found {compiled[column]['dtype']}")
+        if len({c["rows"] for c in compiled.values()}) > 1:
+            raise ReferenceDataError(f"{name}: columns have different lengths")
+
+
+def open_store(data_dir=DEFAULT_DATA_DIR):
+    """Compile if needed, validate the schema once and memory-map every column."""
+    compiled_dir = compile_reference_data(data_dir)
+    with open(os.path.join(compiled_dir, SCHEMA_FILE)) as f:
+        schema = json.load(f)
+    _validate(_read_manifest(data_dir), schema, compiled_dir)
+    tables = {
+        name: ReferenceTable(name, {c["name"]: _load_column(os.path.join(compiled_dir, name, c["file"]))
+                                    for c in columns})
+        for name, columns in schema["tables"].items()
+    }
+    return ReferenceStore(data_dir, schema["version"], tables)
+
+
+@lru_cache(maxsize=None)
+def get_store():
+    """Process-wide store for FUEL_REFERENCE_DATA_DIR (or the bundled reference_data/)."""
+    return open_store(os.environ.get("FUEL_REFERENCE_DATA_DIR", DEFAULT_DATA_DIR))
+
+
+if __name__ == "__main__":
+    directory = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DATA_DIR
+    print(f"Compiled {directory} -> {compile_reference_data(directory)}")
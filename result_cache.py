@@ -0,0 +1,210 @@
+"""Server-wide memoization of calculation results.
+
+Results are keyed on a canonical hash of the scenario inputs and the configuration
+version, held in a size-bounded LRU and optionally persisted to disk so they survive app
+restarts. One instance is shared by all sessions, so every operation takes a lock; file
+reads and writes happen outside it.
+
+Persisted entries are pickles, and unpickling runs code, so ``persist_dir`` must only be
+writable by the server's user: ``private_dirs.private_dir`` creates it with mode 0700 and
+refuses a directory owned by anyone else or writable by group or others.
+"""
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from fuel_config import config_version
+from private_dirs import private_dir
+
+_KEY_DECIMALS = 9  # Inputs equal to this many decimals share a cache entry
+# Bump when a cached result type changes (e.g. fields added to fuel_engine.ScenarioResults), so
+# entries persisted by an older build are never unpickled into the new one
+SCHEMA_VERSION = 2
+
+
+def _digest(payload):
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+def _canonical(values):
+    rounded = np.round(np.asarray(values, dtype=float), _KEY_DECIMALS) + 0.0  # + 0.0 folds -0.0
+    return [repr(v) for v in rounded.tolist()]
+
+
+def scenario_key(year, vessel_counts, fuel_mix, *extra):
+    """Canonical cache key for a scenario.
+
+    ``vessel_counts`` is ordered like VESSEL_KEYS and ``fuel_mix`` like the year's mix keys.
+    Any ``extra`` JSON-serialisable values (e.g. a computation mode) are folded in.
+    """
+    return _digest([int(year), _canonical(vessel_counts), _canonical(fuel_mix),
+                    config_version(), SCHEMA_VERSION, list(extra)])
+
+
+class ResultCache:
+    """LRU of pickled results bounded by ``max_entries`` and ``max_bytes``.
+
+    With ``persist_dir`` every entry is also written to ``<key>.pkl`` there; the disk copy has
+    the same bounds, dropping the least recently used file first (entries found at startup are
+    ordered by when they were written).
+    """
+
+    def __init__(self, max_entries=4096, max_bytes=64 * 1024 * 1024, persist_dir=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.persist_dir = private_dir(persist_dir) if persist_dir else None
+        self._entries = OrderedDict()  # key -> (pickled bytes)
+        self._bytes = 0
+        self._disk = OrderedDict()  # key -> file size, least recently used first
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+        if self.persist_dir:
+            self._scan_disk()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries or key in self._disk
+
+    def _disk_path(self, key):
+        return os.path.join(self.persist_dir, f"{key}.pkl") if self.persist_dir else None
+
+    def _scan_disk(self):
+        found = []
+        for entry in os.scandir(self.persist_dir):
+            if entry.name.endswith(".pkl") and entry.is_file(follow_symlinks=False):
+                info = entry.stat(follow_symlinks=False)
+                found.append((info.st_mtime, entry.name[:-len(".pkl")], info.st_size))
+        for _, key, size in sorted(found):
+            self._disk[key] = size
+            self._disk_bytes += size
+        self._remove_files(self._trim_disk())
+
+    def _store(self, key, blob):
+        if key in self._entries:
+            self._bytes -= len(self._entries.pop(key))
+        self._entries[key] = blob
+        self._bytes += len(blob)
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            self.evictions += 1
+
+    def _trim_disk(self):
+        """Drop the oldest disk entries beyond the bounds; returns their paths for removal."""
+        removed = []
+        while self._disk and (len(self._disk) > self.max_entries or self._disk_bytes > self.max_bytes):
+            key, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            removed.append(self._disk_path(key))
+        return removed
+
+    @staticmethod
+    def _remove_files(paths):
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def get(self, key, default=None):
+        """Return the cached value (a fresh unpickled copy, safe to mutate), or ``default``.
+
+        An entry that cannot be unpickled (a truncated file, or one written by other code) is
+        dropped from memory and disk and counts as a miss.
+        """
+        with self._lock:
+            blob = self._entries.get(key)
+            if blob is not None:
+                self._entries.move_to_end(key)
+            on_disk = blob is None and key in self._disk
+            if on_disk:
+                self._disk.move_to_end(key)
+        if on_disk:
+            path = self._disk_path(key)
+            try:
+                with open(path, "rb") as f:
+                    blob = f.read()
+            except FileNotFoundError:  # Removed by a concurrent clear() or trim
+                blob = None
+        value, corrupt = None, False
+        if blob is not None:
+            try:
+                value = pickle.loads(blob)
+            except Exception:
+                corrupt = True
+        with self._lock:
+            if blob is None or corrupt:
+                if on_disk or corrupt:
+                    self._disk_bytes -= self._disk.pop(key, 0)
+                if corrupt and key in self._entries:
+                    self._bytes -= len(self._entries.pop(key))
+                self.misses += 1
+            else:
+                if on_disk:
+                    self._store(key, blob)
+                    self.disk_hits += 1
+                self.hits += 1
+        if corrupt and self.persist_dir:
+            self._remove_files([self._disk_path(key)])
+        return value if blob is not None and not corrupt else default
+
+    def put(self, key, value):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        removed = []
+        with self._lock:
+            self._store(key, blob)
+            if self.persist_dir:
+                self._disk_bytes += len(blob) - self._disk.pop(key, 0)
+                self._disk[key] = len(blob)
+                removed = self._trim_disk()
+        if self.persist_dir and self._disk_path(key) not in removed:
+            fd, tmp = tempfile.mkstemp(dir=self.persist_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(blob)
+            os.replace(tmp, self._disk_path(key))
+        self._remove_files(removed)
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        """Drop every entry, in memory and on disk, and reset the counters."""
+        with self._lock:
+            removed = [self._disk_path(key) for key in self._disk]
+            self._entries.clear()
+            self._disk.clear()
+            self._bytes = self._disk_bytes = 0
+            self.hits = self.misses = self.disk_hits = self.evictions = 0
+        self._remove_files(removed)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,355 @@
+"""Persistent store of saved scenarios (SQLite).
+
+A scenario is saved with its inputs and computed results, so it outlives the browser
+session that ran it and can be listed, compared and loaded back into the inputs by anyone
+using the same database (``FUEL_SCENARIO_DB``, default ``~/.fuel_supplier/scenarios.sqlite``).
+
+Tables:
+
+* ``scenarios`` -- one row per scenario: name, source (``app`` or a sweep kind), year,
+  fleet composition key and the summary results; indexed by (year, created) and
+  (fleet_key, year);
+* ``scenario_tags`` -- keyed (tag, scenario_id), so tag filters are index range scans;
+* ``scenario_values`` -- (scenario_id, kind, key, value), clustered by scenario
+  (``WITHOUT ROWID``): vessel counts, mix shares, fuel prices and per-fuel GJ and cost,
+  see ``VALUE_KINDS``.
+
+Scenarios are saved as frames in the ``fuel_batch`` layout (``year``, one column per vessel
+key and mix key, ``cost_<mix key>`` prices and its result columns), so a whole sweep is one
+transaction of two ``executemany`` calls. ``compare`` reads the values of any number of
+scenarios in a single query (the ids are passed as one JSON array) and pivots them in
+pandas. The database runs in WAL mode, so readers never wait for a writer, and
+connections are pooled and shared by all sessions.
+"""
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from fuel_config import VESSEL_TYPES_OWNED, VESSEL_KEYS, FUEL_MIX_CATEGORIES, YEAR_OPTIONS, config_version
+import fuel_batch
+import fuel_engine
+
+DEFAULT_DB_PATH = os.path.join(os.path.expanduser("~"), ".fuel_supplier", "scenarios.sqlite")
+DEFAULT_POOL_SIZE = 4
+DEFAULT_LIST_LIMIT = 1_000
+SCHEMA_VERSION = 1
+SUMMARY_COLUMNS = ("total_consumption_gj", "total_cost_musd", "compliance_cost_musd",
+                   "total_cost_incl_compliance_musd", "fleet_gfi", "gfi_zone")
+MIX_KEYS = fuel_batch.MIX_KEYS
+# kind -> (frame column per key, keys, comparison section label)
+VALUE_KINDS = {
+    "count": (list(VESSEL_KEYS), VESSEL_KEYS, "Owned Vessels"),
+    "mix": (list(MIX_KEYS), MIX_KEYS, "Fuel Mix (%)"),
+    "price": ([f"cost_{k}" for k in MIX_KEYS], MIX_KEYS, "Fuel Price (USD/GJ)"),
+    "gj": ([f"gj_{k}" for k in MIX_KEYS], MIX_KEYS, "Consumption (GJ/Year)"),
+    "cost_musd": ([f"cost_musd_{k}" for k in MIX_KEYS], MIX_KEYS, "Fuel Cost (Million USD)"),
+}
+SUMMARY_LABELS = {
+    "year": "Year",
+    "total_consumption_gj": "Total Consumption (GJ/Year)",
+    "total_cost_musd": "Fuel Cost (Million USD)",
+    "compliance_cost_musd": "GFI Compliance Cost (Million USD)",
+    "total_cost_incl_compliance_musd": "Total incl. Compliance (Million USD)",
+    "fleet_gfi": "Fleet GFI (gCO2eq/MJ)",
+    "gfi_zone": "GFI Zone",
+}
+_DISPLAY_NAMES = {key: name.replace(" Percentage", "")
+                  for year in YEAR_OPTIONS for key, name in FUEL_MIX_CATEGORIES[year].items()}
+_DISPLAY_NAMES.update(zip(VESSEL_KEYS, VESSEL_TYPES_OWNED))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scenarios (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    source TEXT NOT NULL,
+    job_id TEXT,
+    created REAL NOT NULL,
+    config_version TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    fleet_key TEXT NOT NULL,
+    total_vessels INTEGER NOT NULL,
+    total_consumption_gj REAL,
+    total_cost_musd REAL,
+    compliance_cost_musd REAL,
+    total_cost_incl_compliance_musd REAL,
+    fleet_gfi REAL,
+    gfi_zone INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_scenarios_year ON scenarios (year, created);
+CREATE INDEX IF NOT EXISTS idx_scenarios_fleet ON scenarios (fleet_key, year);
+CREATE INDEX IF NOT EXISTS idx_scenarios_job ON scenarios (job_id) WHERE job_id IS NOT NULL;
+CREATE TABLE IF NOT EXISTS scenario_tags (
+    tag TEXT NOT NULL,
+    scenario_id INTEGER NOT NULL REFERENCES scenarios (id) ON DELETE CASCADE,
+    PRIMARY KEY (tag, scenario_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_tags_scenario ON scenario_tags (scenario_id, tag);
+CREATE TABLE IF NOT EXISTS scenario_values (
+    scenario_id INTEGER NOT NULL REFERENCES scenarios (id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (scenario_id, kind, key)
+) WITHOUT ROWID;
+"""
+_LIST_COLUMNS = ("id", "name", "source", "job_id", "created", "year", "fleet_key", "total_vessels") + SUMMARY_COLUMNS
+
+
+def fleet_key(vessel_counts):
+    """Composition key, counts in VESSEL_KEYS order (e.g. ``18/29/5/1/4``)."""
+    return "/".join(str(int(c)) for c in vessel_counts)
+
+
+def describe_fleet(key):
+    """``18 VLCC, 29 Suezmax, ...`` for a fleet key (types with no vessels omitted)."""
+    counts = key.split("/")
+    return ", ".join(f"{c} {name}" for c, name in zip(counts, VESSEL_TYPES_OWNED) if c != "0") or "No vessels"
+
+
+def normalize_tags(tags):
+    if isinstance(tags, str):
+        tags = tags.split(",")
+    return sorted({t.strip().lower() for t in tags if t and t.strip()})
+
+
+def results_frame(year, vessel_counts, fuel_mix, results, fuel_costs_gj=None):
+    """A one-row store frame for an app calculation (``results`` is ``fuel_engine.ScenarioResults``)."""
+    tables = fuel_engine.get_year_tables(year)
+    costs = tables.fuel_costs_gj if fuel_costs_gj is None else fuel_costs_gj
+    row = {"year": int(year)}
+    row.update({k: float(vessel_counts.get(k, 0)) for k in VESSEL_KEYS})
+    for i, key in enumerate(tables.mix_keys):
+        row[key] = float(fuel_mix.get(key, 0.0))
+        row[f"cost_{key}"] = float(costs[i])
+        row[f"gj_{key}"] = float(results.consumption_by_mix[i])
+        row[f"cost_musd_{key}"] = float(results.cost_by_mix_musd[i])
+    row.update({
+        "total_consumption_gj": results.total_consumption,
+        "total_cost_musd": results.total_cost_musd,
+        "compliance_cost_musd": results.compliance_cost_musd,
+        "total_cost_incl_compliance_musd": results.total_cost_incl_compliance_musd,
+        "fleet_gfi": results.fleet_gfi,
+        "gfi_zone": results.gfi_zone,
+    })
+    return pd.DataFrame([row])
+
+
+class ScenarioStore:
+    """Thread-safe handle on one database; share one instance per process."""
+
+    def __init__(self, path=None, pool_size=DEFAULT_POOL_SIZE):
+        self.path = path or os.environ.get("FUEL_SCENARIO_DB", DEFAULT_DB_PATH)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(pool_size)
+        with self._connection() as conn:
+            conn.executescript(_SCHEMA)
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30.0, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")  # Durable at checkpoints; WAL keeps the file consistent
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        """A pooled connection (autocommit; use ``_transaction`` for writes)."""
+        with self._slots:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            try:
+                yield conn
+            finally:
+                if conn.in_transaction:
+                    conn.rollback()
+                self._idle.put(conn)
+
+    @contextmanager
+    def _transaction(self):
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            conn.execute("COMMIT")
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+    # --- Saving ---
+    def save_frame(self, frame, source, names=None, tags=(), job_id=None):
+        """Bulk-insert scenarios from a store frame; returns their ids (in frame order).
+
+        ``names`` is one name per row, or a prefix numbered by row; tags apply to every row.
+        Columns follow ``fuel_batch`` (vessel columns may use type names, e.g. ``VLCC``).
+        """
+        frame = frame.rename(columns=fuel_batch._normalize_column).reset_index(drop=True)
+        n = len(frame)
+        if not n:
+            return np.empty(0, dtype=np.int64)
+        years = frame["year"].to_numpy(dtype=np.int64)
+        counts = frame.reindex(columns=VESSEL_KEYS).fillna(0).to_numpy(dtype=np.int64)
+        if isinstance(names, str) or names is None:
+            prefix = names or source
+            names = [prefix] if n == 1 else [f"{prefix} #{i + 1}" for i in range(n)]
+        fleet_keys = ["/".join(map(str, row)) for row in counts.tolist()]
+        summary = frame.reindex(columns=list(SUMMARY_COLUMNS)).astype(float)
+        summary = summary.astype(object).where(summary.notna(), None)
+        created, version = time.time(), config_version()
+
+        value_columns = [(kind, key, column) for kind, (columns, keys, _) in VALUE_KINDS.items()
+                         for column, key in zip(columns, keys) if column in frame]
+        values = frame[[c for _, _, c in value_columns]].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+        present = ~np.isnan(values)
+        rows, cols = np.nonzero(present)
+        kinds = np.array([k for k, _, _ in value_columns], dtype=object)
+        keys = np.array([k for _, k, _ in value_columns], dtype=object)
+        tags = normalize_tags(tags)
+
+        with self._transaction() as conn:
+            first_id = conn.execute("SELECT coalesce(max(id), 0) + 1 FROM scenarios").fetchone()[0]
+            ids = np.arange(first_id, first_id + n, dtype=np.int64)
+            conn.executemany(
+                f"INSERT INTO scenarios (id, name, source, job_id, created, config_version, year, fleet_key, "
+                f"total_vessels, {', '.join(SUMMARY_COLUMNS)}) VALUES ({', '.join('?' * (9 + len(SUMMARY_COLUMNS)))})",
+                zip(ids.tolist(), names, [source] * n, [job_id] * n, [created] * n, [version] * n, years.tolist(),
+                    fleet_keys, counts.sum(axis=1).tolist(), *(summary[c].tolist() for c in SUMMARY_COLUMNS)))
+            conn.executemany("INSERT INTO scenario_values VALUES (?, ?, ?, ?)",
+                             zip(ids[rows].tolist(), kinds[cols], keys[cols], values[rows, cols].tolist()))
+            if tags:
+                conn.executemany("INSERT INTO scenario_tags VALUES (?, ?)",
+                                 ((tag, i) for i in ids.tolist() for tag in tags))
+        return ids
+
+    def save_result(self, year, vessel_counts, fuel_mix, results, name, tags=()):
+        """Save one app calculation; returns its id."""
+        return int(self.save_frame(results_frame(year, vessel_counts, fuel_mix, results), "app", name, tags)[0])
+
+    def delete(self, ids):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM scenarios WHERE id IN (SELECT value FROM json_each(?))",
+                         (json.dumps([int(i) for i in ids]),))
+
+    def set_tags(self, ids, tags):
+        """Replace the tags of the given scenarios."""
+        ids_json = json.dumps([int(i) for i in ids])
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM scenario_tags WHERE scenario_id IN (SELECT value FROM json_each(?))", (ids_json,))
+            conn.executemany("INSERT INTO scenario_tags VALUES (?, ?)",
+                             ((tag, int(i)) for i in ids for tag in normalize_tags(tags)))
+
+    # --- Queries ---
+    def count(self, job_id=None):
+        """Saved scenarios, or those saved from one background job."""
+        where, params = ("WHERE job_id = ?", (job_id,)) if job_id else ("", ())
+        with self._connection() as conn:
+            return conn.execute(f"SELECT count(*) FROM scenarios {where}", params).fetchone()[0]
+
+    def tags(self):
+        """{tag: scenarios}, most used first."""
+        with self._connection() as conn:
+            return dict(conn.execute("SELECT tag, count(*) FROM scenario_tags GROUP BY tag ORDER BY count(*) DESC, tag"))
+
+    def fleets(self, year=None):
+        """{fleet key: scenarios} for ``year`` (or all years), most used first."""
+        where, params = ("WHERE year = ?", (int(year),)) if year is not None else ("", ())
+        with self._connection() as conn:
+            return dict(conn.execute(f"SELECT fleet_key, count(*) FROM scenarios {where} "
+                                     f"GROUP BY fleet_key ORDER BY count(*) DESC, fleet_key", params))
+
+    def list_scenarios(self, years=(), fleet_key=None, tags=(), sources=(), name_like=None,
+                       limit=DEFAULT_LIST_LIMIT):
+        """Scenario headers matching every given filter (newest first), with their tags.
+
+        A scenario matches ``tags`` if it has all of them.
+        """
+        where, params = [], []
+        if years:
+            where.append("s.year IN (SELECT value FROM json_each(?))")
+            params.append(json.dumps([int(y) for y in years]))
+        if fleet_key:
+            where.append("s.fleet_key = ?")
+            params.append(fleet_key)
+        if sources:
+            where.append("s.source IN (SELECT value FROM json_each(?))")
+            params.append(json.dumps(list(sources)))
+        if name_like:
+            where.append("s.name LIKE ? ESCAPE '\\'")
+            params.append("%" + name_like.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+        tags = normalize_tags(tags)
+        if tags:
+            where.append("s.id IN (SELECT scenario_id FROM scenario_tags WHERE tag IN (SELECT value FROM json_each(?)) "
+                         "GROUP BY scenario_id HAVING count(*) = ?)")
+            params += [json.dumps(tags), len(tags)]
+        query = (f"SELECT {', '.join('s.' + c for c in _LIST_COLUMNS)}, "
+                 f"(SELECT group_concat(tag, ', ') FROM scenario_tags t WHERE t.scenario_id = s.id) AS tags "
+                 f"FROM scenarios s {'WHERE ' + ' AND '.join(where) if where else ''} "
+                 f"ORDER BY s.created DESC, s.id DESC LIMIT ?")
+        with self._connection() as conn:
+            rows = conn.execute(query, params + [int(limit)]).fetchall()
+        frame = pd.DataFrame(rows, columns=list(_LIST_COLUMNS) + ["tags"])
+        frame["created"] = pd.to_datetime(frame["created"], unit="s")
+        frame["tags"] = frame["tags"].fillna("")
+        return frame
+
+    def load_inputs(self, scenario_id):
+        """(year, {vessel key: count}, {mix key: percent}) of a saved scenario."""
+        with self._connection() as conn:
+            row = conn.execute("SELECT year FROM scenarios WHERE id = ?", (int(scenario_id),)).fetchone()
+            if row is None:
+                raise KeyError(f"No saved scenario with id {scenario_id}.")
+            values = conn.execute("SELECT kind, key, value FROM scenario_values WHERE scenario_id = ? "
+                                  "AND kind IN ('count', 'mix')", (int(scenario_id),)).fetchall()
+        year = row[0]
+        counts = {k: 0 for k in VESSEL_KEYS}
+        mix = {k: 0.0 for k in FUEL_MIX_CATEGORIES.get(year, {})}
+        for kind, key, value in values:
+            if kind == "count":
+                counts[key] = int(value)
+            elif key in mix:
+                mix[key] = value
+        return year, counts, mix
+
+    def compare(self, ids, labels=None):
+        """Side-by-side table of the given scenarios: rows (section, item), one column per scenario.
+
+        The summary rows come from the headers and all per-key rows from one query on
+        ``scenario_values``; keys no compared scenario has are dropped.
+        """
+        ids = [int(i) for i in ids]
+        ids_json = json.dumps(ids)
+        with self._connection() as conn:
+            headers = conn.execute(f"SELECT id, name, year, {', '.join(SUMMARY_COLUMNS)} FROM scenarios "
+                                   f"WHERE id IN (SELECT value FROM json_each(?))", (ids_json,)).fetchall()
+            values = conn.execute("SELECT scenario_id, kind, key, value FROM scenario_values "
+                                  "WHERE scenario_id IN (SELECT value FROM json_each(?))", (ids_json,)).fetchall()
+        headers = pd.DataFrame(headers, columns=["id", "name", "year", *SUMMARY_COLUMNS]).set_index("id").reindex(ids)
+        columns = labels or [f"#{i} {name}" for i, name in zip(ids, headers["name"].fillna("(deleted)"))]
+
+        summary = headers[list(SUMMARY_LABELS)].T
+        summary.index = pd.MultiIndex.from_tuples([("Summary", SUMMARY_LABELS[c]) for c in summary.index])
+        summary.columns = columns
+        values = pd.DataFrame(values, columns=["scenario_id", "kind", "key", "value"])
+        if values.empty:
+            return summary
+        wide = values.pivot(index=["kind", "key"], columns="scenario_id", values="value").reindex(columns=ids)
+        order = [(kind, key) for kind, (_, keys, _) in VALUE_KINDS.items() for key in keys]
+        wide = wide.reindex([row for row in order if row in wide.index])
+        wide.index = pd.MultiIndex.from_tuples(
+            [(VALUE_KINDS[kind][2], _DISPLAY_NAMES.get(key, key)) for kind, key in wide.index])
+        wide.columns = columns
+        return pd.concat([summary, wide])
@@ -0,0 +1,38 @@
+"""Consumption factors from the long (row per fuel) and wide (column per fuel) log layouts."""
+import numpy as np
+import pandas as pd
+import pytest
+
+import consumption_logs
+
+
+def noon_reports(days=182):
+    """One vessel's dual-fuel noon reports: (vessel_id, vessel_type, date, hfo_t, lng_t, hours)."""
+    rng = np.random.default_rng(0)
+    dates = pd.date_range("2025-01-01", periods=days, freq="D").strftime("%Y-%m-%d")
+    return pd.DataFrame({"vessel_id": "9000001", "vessel_type": "Suezmax", "date": dates,
+                         "hfo_t": rng.uniform(20, 40, days).round(3), "lng_t": rng.uniform(5, 15, days).round(3),
+                         "hours": 24.0})
+
+
+def write_layouts(tmp_path):
+    wide = noon_reports()
+    long = (wide.melt(id_vars=["vessel_id", "vessel_type", "date", "hours"], value_vars=["hfo_t", "lng_t"],
+                      var_name="fuel", value_name="consumption_t")
+            .assign(fuel=lambda f: f["fuel"].str[:-2].str.upper())
+            .sort_values(["date", "fuel"], kind="stable"))
+    wide.to_csv(tmp_path / "wide.csv", index=False)
+    long.to_csv(tmp_path / "long.csv", index=False)
+    return tmp_path / "wide.csv", tmp_path / "long.csv"
+
+
+@pytest.mark.parametrize("chunk_rows", [consumption_logs.DEFAULT_CHUNK_ROWS, 5])
+def test_long_and_wide_layouts_give_the_same_factors(tmp_path, chunk_rows):
+    wide_path, long_path = write_layouts(tmp_path)
+    wide, wide_rows, _ = consumption_logs.aggregate_file(str(wide_path), chunk_rows)
+    long, long_rows, _ = consumption_logs.aggregate_file(str(long_path), chunk_rows)
+    assert long_rows == 2 * wide_rows
+    assert long["hours"].tolist() == wide["hours"].tolist() == [182 * 24.0]
+    np.testing.assert_allclose(long["gj"], wide["gj"], rtol=1e-12)
+    pd.testing.assert_frame_equal(consumption_logs.consumption_factors(long),
+                                  consumption_logs.consumption_factors(wide))
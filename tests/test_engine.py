@@ -0,0 +1,122 @@
+"""The vectorized engine against the original per-fuel Run Calculation loop."""
+import numpy as np
+import pytest
+
+from fuel_config import (
+    YEAR_OPTIONS, VESSEL_TYPES_OWNED, VESSEL_KEYS, MILLION, FUEL_MIX_CATEGORIES, DEFAULT_FUEL_MIX,
+    DEFAULT_OWNED_VESSEL_COUNTS, VESSEL_CONSUMPTION_FACTORS, DEFAULT_FUEL_COSTS_GJ,
+)
+import fuel_engine
+import fuel_timeline
+
+
+def reference_results(year, owned_counts, fuel_mix):
+    """The app's original Run Calculation loop, one vessel type and fuel at a time."""
+    factors, costs = VESSEL_CONSUMPTION_FACTORS[year], DEFAULT_FUEL_COSTS_GJ[year]
+    by_type, total = {}, 0.0
+    for vessel in VESSEL_TYPES_OWNED:
+        key = vessel.lower().replace(' ', '_')
+        by_type[vessel] = owned_counts.get(key, 0) * factors.get(key, 0)
+        total += by_type[vessel]
+    by_mix, cost_by_mix, total_cost = {}, {}, 0.0
+    produced_vs_procured = {'Produced': 0.0, 'Procured': 0.0}
+    base_demand = {}
+    for key, name in FUEL_MIX_CATEGORIES[year].items():
+        consumption = total * (fuel_mix.get(key, 0.0) / 100.0)
+        cost = consumption * costs.get(key, 0.0)
+        by_mix[name] = consumption
+        cost_by_mix[name] = cost / MILLION
+        total_cost += cost
+        if "(Produced)" in name:
+            produced_vs_procured['Produced'] += cost
+        elif "(Procured)" in name:
+            produced_vs_procured['Procured'] += cost
+        base = name.replace(" (Produced)", "").replace(" (Procured)", "")
+        base_demand[base] = base_demand.get(base, 0.0) + consumption
+    return {
+        "fleet_consumption_by_type": by_type,
+        "total_annual_consumption": total,
+        "fuel_consumption_by_mix": by_mix,
+        "fuel_cost_by_mix": cost_by_mix,
+        "total_fuel_cost_million": total_cost / MILLION,
+        "prod_vs_proc_cost_million": {k: v / MILLION for k, v in produced_vs_procured.items()},
+        "base_fuel_demand_gj": base_demand,
+    }
+
+
+def random_scenario(rng, year):
+    counts = {key: int(n) for key, n in zip(VESSEL_KEYS, rng.integers(0, 40, len(VESSEL_KEYS)))}
+    keys = list(FUEL_MIX_CATEGORIES[year])
+    shares = rng.dirichlet(np.full(len(keys), 0.5)) * 100.0
+    return counts, dict(zip(keys, shares.tolist()))
+
+
+def assert_matches_reference(results, expected):
+    legacy = results.as_dict()
+    for field, value in expected.items():
+        if isinstance(value, dict):
+            assert legacy[field].keys() == value.keys(), field
+            np.testing.assert_allclose(list(legacy[field].values()), list(value.values()), rtol=1e-12, atol=1e-6,
+                                       err_msg=field)
+        else:
+            assert legacy[field] == pytest.approx(value, rel=1e-12), field
+
+
+@pytest.mark.parametrize("year", YEAR_OPTIONS)
+def test_default_scenario_matches_reference_loop(year):
+    counts, mix = DEFAULT_OWNED_VESSEL_COUNTS[year], DEFAULT_FUEL_MIX[year]
+    assert_matches_reference(fuel_engine.compute_results(year, counts, mix), reference_results(year, counts, mix))
+
+
+@pytest.mark.parametrize("year", YEAR_OPTIONS)
+def test_random_scenarios_match_reference_loop(year):
+    rng = np.random.default_rng(year)
+    for _ in range(20):
+        counts, mix = random_scenario(rng, year)
+        assert_matches_reference(fuel_engine.compute_results(year, counts, mix), reference_results(year, counts, mix))
+
+
+def test_batch_rows_match_single_scenarios():
+    year = YEAR_OPTIONS[0]
+    rng = np.random.default_rng(1)
+    scenarios = [random_scenario(rng, year) for _ in range(50)]
+    counts = np.array([fuel_engine.counts_vector(c) for c, _ in scenarios])
+    mixes = np.array([fuel_engine.mix_vector(year, m) for _, m in scenarios])
+    tables = fuel_engine.get_year_tables(year)
+    batch = fuel_engine.compute_year_batch(year, counts, mixes, tables=tables)
+    for i, (c, m) in enumerate(scenarios):
+        single = fuel_engine.compute_results(year, c, m)
+        row = fuel_engine.scenario_results(tables, batch, mixes, index=i)
+        assert row.total_cost_musd == pytest.approx(single.total_cost_musd, rel=1e-12)
+        np.testing.assert_allclose(row.base_fuel_demand, single.base_fuel_demand, rtol=1e-12)
+        assert row.gfi_zone == single.gfi_zone
+
+
+def test_costs_split_into_produced_and_procured():
+    year = YEAR_OPTIONS[-1]
+    results = fuel_engine.compute_results(year, DEFAULT_OWNED_VESSEL_COUNTS[year], DEFAULT_FUEL_MIX[year])
+    assert results.produced_cost_musd + results.procured_cost_musd == pytest.approx(results.total_cost_musd)
+    assert results.base_fuel_demand.sum() == pytest.approx(results.total_consumption)
+
+
+def test_empty_fleet_costs_nothing():
+    year = YEAR_OPTIONS[0]
+    results = fuel_engine.compute_results(year, {}, DEFAULT_FUEL_MIX[year])
+    assert results.total_consumption == 0.0
+    assert results.total_cost_musd == 0.0
+
+
+@pytest.mark.parametrize("year", YEAR_OPTIONS)
+def test_timeline_equals_snapshot_calculation(year):
+    timeline = fuel_timeline.compute_timeline()
+    row = int(np.flatnonzero(timeline.years == year)[0])
+    results = fuel_engine.compute_results(year, DEFAULT_OWNED_VESSEL_COUNTS[year], DEFAULT_FUEL_MIX[year])
+    assert timeline.batch.total_cost[row] / MILLION == pytest.approx(results.total_cost_musd, rel=1e-9)
+    assert timeline.compliance.gfi[row] == pytest.approx(results.fleet_gfi, rel=1e-9)
+
+
+def test_timeline_rejects_a_mix_not_summing_to_100():
+    year = YEAR_OPTIONS[1]
+    mix = {key: share / 10.0 for key, share in DEFAULT_FUEL_MIX[year].items()}
+    with pytest.raises(ValueError):
+        fuel_timeline.compute_timeline(fuel_mix_by_year={year: mix})
@@ -0,0 +1,66 @@
+"""Sectioned export-projection parsing."""
+import numpy as np
+
+from export_data import parse_export_data
+
+SAMPLE = "\t2025\t2026\nCrude Oil\nChina\t1\t2\nUSA\t3\t4\nDiesel\nEurope\t5.5\t6\n"
+
+
+def test_parses_sections_into_wide_columns():
+    data = parse_export_data(SAMPLE)
+    assert list(data.frame.columns) == ["Crude Oil - China", "Crude Oil - USA", "Diesel - Europe"]
+    assert list(data.frame.index) == [2025, 2026]
+    np.testing.assert_array_equal(data.frame["Diesel - Europe"], [5.5, 6.0])
+    assert data.malformed_rows == []
+
+
+def test_small_chunks_give_the_same_frame():
+    assert parse_export_data(SAMPLE, chunk_rows=1).frame.equals(parse_export_data(SAMPLE).frame)
+
+
+def test_reads_any_iterable_of_lines():
+    assert parse_export_data(iter(SAMPLE.splitlines(keepends=True))).frame.equals(parse_export_data(SAMPLE).frame)
+
+
+def test_bad_rows_are_reported_not_dropped_silently():
+    text = "Orphan\t1\t2\n\t2025\t2026\nCrude Oil\nChina\t1\nUSA\t3\tx\nChina\t1\t2\nChina\t5\t6\n"
+    data = parse_export_data(text)
+    assert list(data.frame.columns) == ["Crude Oil - China"]
+    assert sorted(row.line_number for row in data.malformed_rows) == [1, 4, 5, 7]
+
+
+def test_groups_with_different_periods_are_aligned():
+    text = "\t2025\t2026\nA\nX\t1\t2\n\t2026\t2027\nB\nY\t3\t4\n"
+    frame = parse_export_data(text).frame
+    assert list(frame.index) == [2025, 2026, 2027]
+    assert np.isnan(frame.loc[2027, "A - X"]) and frame.loc[2026, "B - Y"] == 3.0
+
+
+def test_section_rows_may_carry_trailing_tabs():
+    text = "\t2025\t2026\t\nCrude Oil\t\nChina\t1\t2\r\n"
+    data = parse_export_data(text)
+    assert list(data.frame.columns) == ["Crude Oil - China"]
+    assert list(data.frame.index) == [2025, 2026]
+    assert data.malformed_rows == []
+
+
+def test_first_section_may_be_padded_to_the_header_width():
+    text = "\t2025\t2026\nCrude Oil\t\t\nChina\t1\t2\nDiesel\t\nEurope\t5\t6\n"
+    data = parse_export_data(text)
+    assert list(data.frame.columns) == ["Crude Oil - China", "Diesel - Europe"]
+    assert data.malformed_rows == []
+
+
+def test_row_with_all_values_blank_is_malformed_not_a_section():
+    text = "\t2025\t2026\nCrude Oil\nChina\t1\t2\nEurope\t\t\nUSA\t3\t4\n"
+    data = parse_export_data(text)
+    assert list(data.frame.columns) == ["Crude Oil - China", "Crude Oil - USA"]
+    assert [(row.line_number, row.text) for row in data.malformed_rows] == [(4, "Europe\t\t")]
+
+
+def test_data_rows_may_carry_trailing_tabs():
+    text = "\t2025\t2026\nCrude Oil\nChina\t1\t2\t\nUSA\t3\t4\t\t\n"
+    data = parse_export_data(text)
+    np.testing.assert_array_equal(data.frame["Crude Oil - China"], [1.0, 2.0])
+    np.testing.assert_array_equal(data.frame["Crude Oil - USA"], [3.0, 4.0])
+    assert data.malformed_rows == []
@@ -0,0 +1,30 @@
+"""Fleet registry capability bitmask and its engine inputs."""
+import numpy as np
+import pandas as pd
+import pytest
+
+import fleet_registry
+from fleet_registry import CAPABILITY_DTYPE, CAPABILITY_FUELS
+
+
+def test_capability_dtype_has_a_bit_per_fuel():
+    assert np.iinfo(CAPABILITY_DTYPE).bits >= len(CAPABILITY_FUELS)
+
+
+def test_every_capability_fuel_round_trips():
+    frame = pd.DataFrame({"vessel_id": [f"v{i}" for i in range(len(CAPABILITY_FUELS) + 1)],
+                          "vessel_type": "VLCC",
+                          "fuel_capability": list(CAPABILITY_FUELS) + [";".join(CAPABILITY_FUELS)]})
+    registry = fleet_registry.registry_from_frame(frame)
+    assert registry.fuel_capability.dtype == CAPABILITY_DTYPE
+    aggregate = registry.aggregate("capability")
+    assert aggregate.labels == CAPABILITY_FUELS
+    np.testing.assert_array_equal(aggregate.vessel_count, 2)  # Its single-fuel vessel and the all-fuel one
+
+
+def test_too_many_fuels_for_a_bitmask_fails_when_a_registry_is_built(monkeypatch):
+    monkeypatch.setattr(fleet_registry, "CAPABILITY_DTYPE", None)
+    frame = pd.DataFrame({"vessel_id": ["v0"], "vessel_type": "VLCC"})
+    for build in (lambda: fleet_registry.registry_from_frame(frame), lambda: fleet_registry.registry_from_counts({})):
+        with pytest.raises(ValueError, match="at most 64 fuels"):
+            build()
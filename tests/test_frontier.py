@@ -0,0 +1,48 @@
+"""Invariants of the cost-vs-GFI Pareto frontier."""
+import numpy as np
+import pytest
+
+from fuel_config import YEAR_OPTIONS
+import fuel_engine
+import fuel_frontier
+import fuel_optimizer
+
+
+def random_mixes(rng, year, n=20_000):
+    return rng.dirichlet(np.full(len(fuel_engine.get_year_tables(year).mix_keys), 0.3), n) * 100.0
+
+
+def test_pareto_mask_keeps_only_non_dominated_points():
+    gfi = np.array([1.0, 2.0, 2.0, 3.0, 0.5])
+    cost = np.array([5.0, 4.0, 6.0, 4.0, 9.0])
+    assert fuel_frontier.pareto_mask(gfi, cost).tolist() == [True, True, False, False, True]
+
+
+@pytest.mark.parametrize("year", YEAR_OPTIONS)
+def test_frontier_is_monotone_feasible_and_undominated(year):
+    tables = fuel_engine.get_year_tables(year)
+    frontier = fuel_frontier.pareto_frontier(year, n_samples=20_000)
+    assert len(frontier.gfi) > 1
+    assert (np.diff(frontier.gfi) > 0).all()
+    assert (np.diff(frontier.cost_per_gj) < 0).all()
+    np.testing.assert_allclose(frontier.mixes.sum(axis=1), 100.0)
+    np.testing.assert_allclose(frontier.mixes @ tables.emission_factors / 100.0, frontier.gfi)
+    np.testing.assert_allclose(frontier.mixes @ tables.fuel_costs_gj / 100.0, frontier.cost_per_gj)
+
+    # No independent sample lies below the frontier's piecewise-linear lower boundary
+    mixes = random_mixes(np.random.default_rng(year + 1), year)
+    gfi, cost = mixes @ tables.emission_factors / 100.0, mixes @ tables.fuel_costs_gj / 100.0
+    inside = (gfi >= frontier.gfi[0]) & (gfi <= frontier.gfi[-1])
+    bound = np.interp(gfi[inside], frontier.gfi, frontier.cost_per_gj)
+    assert (cost[inside] >= bound - 1e-9).all()
+
+
+def test_frontier_respects_caps_and_meets_the_optimizer():
+    year = YEAR_OPTIONS[-1]
+    tables = fuel_engine.get_year_tables(year)
+    caps = {key: 40.0 for key in tables.mix_keys}
+    frontier = fuel_frontier.pareto_frontier(year, n_samples=10_000, availability_caps=caps)
+    assert (frontier.mixes <= 40.0 + 1e-6).all()
+    target = float(np.median(frontier.gfi))
+    optimum = fuel_optimizer.optimize_fuel_mix(year, gfi_target=target, availability_caps=caps)
+    assert np.interp(target, frontier.gfi, frontier.cost_per_gj) == pytest.approx(optimum.cost_per_gj, rel=1e-6)
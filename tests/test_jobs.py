@@ -0,0 +1,184 @@
+"""Background jobs: submit, cancel, resume and failure; job and report directories."""
+import io
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import pytest
+
+import fuel_jobs
+import fuel_report
+from fuel_config import YEAR_OPTIONS, DEFAULT_OWNED_VESSEL_COUNTS, DEFAULT_FUEL_MIX
+
+YEAR = YEAR_OPTIONS[0]
+
+
+def write_job(jobs_dir, job_id, state, created):
+    os.makedirs(jobs_dir / job_id)
+    record = {"id": job_id, "kind": "price_sweep", "label": job_id, "params": {}, "n_units": 1,
+              "state": state, "units": {}, "created": created, "error": ""}
+    (jobs_dir / job_id / "job.json").write_text(json.dumps(record))
+
+
+def test_default_directories_are_private_and_per_user(tmp_path, monkeypatch):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    jobs = fuel_jobs.JobRunner()
+    reports = fuel_report.ReportRunner()
+    try:
+        for path in (jobs.jobs_dir, reports.reports_dir):
+            assert os.path.dirname(path) == str(tmp_path)
+            assert path.endswith(f"-{os.getuid()}")
+            assert os.stat(path).st_mode & 0o777 == 0o700
+    finally:
+        jobs.shutdown()
+        reports.shutdown()
+
+
+def test_directories_writable_by_others_are_refused(tmp_path):
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    shared.chmod(0o777)
+    with pytest.raises(PermissionError):
+        fuel_jobs.JobRunner(str(shared))
+    with pytest.raises(PermissionError):
+        fuel_report.ReportRunner(str(shared))
+
+
+def test_oldest_finished_jobs_are_pruned(tmp_path):
+    for i, state in enumerate(["running", "completed", "failed", "cancelled", "completed", "completed"]):
+        write_job(tmp_path, f"job{i}", state, created=float(i))
+    runner = fuel_jobs.JobRunner(str(tmp_path), max_jobs=3)
+    kept = {status.job_id for status in runner.jobs()}
+    assert kept == {"job0", "job4", "job5"}  # the interrupted job survives however old it is
+    assert sorted(os.listdir(tmp_path)) == ["job0", "job4", "job5"]
+    assert runner.status("job0").state == "interrupted"  # and stays resumable
+
+
+def test_oldest_interrupted_jobs_are_pruned_beyond_the_bound(tmp_path):
+    for i, state in enumerate(["running", "completed", "running", "running"]):
+        write_job(tmp_path, f"job{i}", state, created=float(i))
+    runner = fuel_jobs.JobRunner(str(tmp_path), max_jobs=2)
+    assert sorted(os.listdir(tmp_path)) == ["job2", "job3"]  # finished job1 first, then the oldest interrupted
+    assert {status.state for status in runner.jobs()} == {"interrupted"}
+
+
+@pytest.fixture
+def runner(tmp_path):
+    runner = fuel_jobs.JobRunner(str(tmp_path / "jobs"), max_workers=1)
+    yield runner
+    runner.shutdown()
+
+
+def wait(runner, job_id, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while runner.status(job_id).state == "running":
+        assert time.monotonic() < deadline, "job did not finish"
+        time.sleep(0.02)
+    return runner.status(job_id)
+
+
+def submit_sweep(runner, n_scenarios=200, unit_rows=10):
+    return runner.submit_price_sweep(YEAR, DEFAULT_OWNED_VESSEL_COUNTS[YEAR], DEFAULT_FUEL_MIX[YEAR], n_scenarios,
+                                     price_range_pct=30, seed=7, unit_rows=unit_rows)
+
+
+def test_sweep_completes_with_every_scenario(runner):
+    status = wait(runner, submit_sweep(runner))
+    assert (status.state, status.units_done, status.n_units, status.rows) == ("completed", 20, 20, 200)
+    results = runner.results(status.job_id)
+    assert results["scenario"].tolist() == list(range(200))
+    assert status.cost_min_musd == pytest.approx(results[fuel_jobs._SUMMARY_COLUMN].min())
+    assert len(runner.scenarios(status.job_id)) == 200
+
+
+def test_cancelled_sweep_resumes_to_the_uninterrupted_results(runner):
+    job_id = submit_sweep(runner)
+    runner.cancel(job_id)
+    cancelled = wait(runner, job_id)
+    assert cancelled.state == "cancelled" and cancelled.units_done < cancelled.n_units
+    runner.resume(job_id)
+    assert wait(runner, job_id).state == "completed"
+    uninterrupted = wait(runner, submit_sweep(runner))
+    pd.testing.assert_frame_equal(runner.results(job_id), runner.results(uninterrupted.job_id))
+
+
+def test_resumed_after_restart(tmp_path):
+    first = fuel_jobs.JobRunner(str(tmp_path), max_workers=1)
+    job_id = submit_sweep(first)
+    first.shutdown()  # Leaves the job "running" on disk, as a killed server would
+    second = fuel_jobs.JobRunner(str(tmp_path), max_workers=1)
+    try:
+        assert second.status(job_id).state == "interrupted"
+        second.resume(job_id)
+        assert wait(second, job_id).rows == 200
+        assert second.results(job_id)["scenario"].tolist() == list(range(200))
+    finally:
+        second.shutdown()
+
+
+def test_failed_unit_fails_the_job(runner):
+    rows = pd.DataFrame({"year": YEAR, **DEFAULT_OWNED_VESSEL_COUNTS[YEAR], **DEFAULT_FUEL_MIX[YEAR]}, index=range(100))
+    job_id = runner.submit_scenario_file(rows.to_csv(index=False).encode(), "scenarios.csv", unit_rows=10)
+    runner.cancel(job_id)
+    wait(runner, job_id)
+    os.remove(os.path.join(runner.jobs_dir, job_id, "input_9.pkl"))
+    runner.resume(job_id)
+    status = wait(runner, job_id)
+    assert status.state == "failed"
+    assert status.error.startswith("unit 9:") and "FileNotFoundError" in status.error
+
+
+def test_unreadable_upload_leaves_no_job_directory(runner):
+    for data in (b"", b"year,vlcc\n2030,1\n2030,1,2,3\n"):
+        with pytest.raises(ValueError):
+            runner.submit_scenario_file(data, "scenarios.csv")
+    assert os.listdir(runner.jobs_dir) == []
+    assert runner.jobs() == []
+
+
+def test_units_are_requeued_when_the_pool_is_shut_down(runner):
+    runner._pool = ProcessPoolExecutor(max_workers=1)
+    runner._pool.shutdown()
+    job_id = submit_sweep(runner)  # Dispatching raises RuntimeError inside submit
+    job = runner._jobs[job_id]
+    assert list(job.pending) == list(range(20)) and not job.in_flight
+    runner._pool = None
+    runner._dispatch()
+    assert wait(runner, job_id).rows == 200
+
+
+def test_nsmallest_and_write_csv_stream_frames():
+    frames = [pd.DataFrame({"id": range(i, i + 5), "cost": [5.0, 1.0, 4.0, 1.0, 3.0]}) for i in (0, 5, 10)]
+    expected = pd.concat(frames, ignore_index=True).nsmallest(4, "cost").reset_index(drop=True)
+    pd.testing.assert_frame_equal(fuel_jobs.nsmallest(iter(frames), 4, "cost"), expected)
+    out = io.StringIO()
+    fuel_jobs.write_csv(iter(frames), out)
+    assert out.getvalue() == pd.concat(frames).to_csv(index=False)
+
+
+def write_report(reports_dir, report_id, created, finished=True):
+    os.makedirs(reports_dir / report_id)
+    (reports_dir / report_id / "report.pdf").write_bytes(b"%PDF")
+    if finished:
+        record = {"id": report_id, "state": "completed", "formats": ["pdf"], "n_charts": 1, "charts_done": 1,
+                  "cached": 0, "created": created, "finished": created + 1.0, "error": "", "label": report_id}
+        (reports_dir / report_id / "report.json").write_text(json.dumps(record))
+
+
+def test_reports_of_a_previous_process_are_reloaded_and_pruned(tmp_path):
+    for i in range(4):
+        write_report(tmp_path, f"report{i}", created=float(i))
+    write_report(tmp_path, "unfinished", created=10.0, finished=False)
+    runner = fuel_report.ReportRunner(str(tmp_path), max_reports=2)
+    try:
+        assert sorted(os.listdir(tmp_path)) == ["report2", "report3"]
+        assert runner.status("report3").state == "completed"
+        assert runner.data("report3", "pdf") == b"%PDF"
+        with pytest.raises(KeyError):
+            runner.status("report0")
+    finally:
+        runner.shutdown()
+
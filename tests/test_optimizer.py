@@ -0,0 +1,43 @@
+"""Invariants of the least-cost optimizer."""
+import numpy as np
+import pytest
+
+from fuel_config import YEAR_OPTIONS
+import fuel_engine
+import fuel_optimizer
+
+
+def random_mixes(rng, year, n=20_000):
+    return rng.dirichlet(np.full(len(fuel_engine.get_year_tables(year).mix_keys), 0.3), n) * 100.0
+
+
+@pytest.mark.parametrize("year", YEAR_OPTIONS)
+def test_optimum_is_feasible_and_no_sample_is_cheaper(year):
+    tables = fuel_engine.get_year_tables(year)
+    dirtiest = int(np.argmax(tables.emission_factors))  # Capping it cannot make the target unreachable
+    cheapest = int(np.argmin(tables.fuel_costs_gj))
+    target = (tables.emission_factors.min() + tables.emission_factors[cheapest]) / 2.0  # Binding but reachable
+    result = fuel_optimizer.optimize_fuel_mix(year, gfi_target=target,
+                                              availability_caps={tables.mix_keys[dirtiest]: 10.0})
+    shares = fuel_engine.mix_vector(year, result.fuel_mix)
+    assert shares.sum() == pytest.approx(100.0)
+    assert (shares >= 0).all() and shares[dirtiest] <= 10.0 + 1e-6
+    assert result.gfi <= result.gfi_target + 1e-6
+    assert result.cost_per_gj == pytest.approx(shares @ tables.fuel_costs_gj / 100.0)
+
+    mixes = random_mixes(np.random.default_rng(year), year)
+    feasible = (mixes[:, dirtiest] <= 10.0) & (mixes @ tables.emission_factors / 100.0 <= result.gfi_target)
+    assert (mixes[feasible] @ tables.fuel_costs_gj / 100.0 >= result.cost_per_gj - 1e-9).all()
+
+
+def test_uncapped_optimum_is_the_cheapest_fuel():
+    year = YEAR_OPTIONS[0]
+    tables = fuel_engine.get_year_tables(year)
+    result = fuel_optimizer.optimize_fuel_mix(year, gfi_line=None)
+    assert result.gfi_target is None
+    assert result.cost_per_gj == pytest.approx(tables.fuel_costs_gj.min())
+
+
+def test_unreachable_target_raises():
+    with pytest.raises(ValueError):
+        fuel_optimizer.optimize_fuel_mix(YEAR_OPTIONS[0], gfi_target=-1.0)
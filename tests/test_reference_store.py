@@ -0,0 +1,48 @@
+"""Compiled reference data: version directories and the fallback for read-only data."""
+import os
+import shutil
+import tempfile
+
+import pytest
+
+import reference_store
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    path = tmp_path / "reference_data"
+    shutil.copytree(reference_store.DEFAULT_DATA_DIR, path, ignore=shutil.ignore_patterns(".compiled"))
+    return str(path)
+
+
+def test_new_version_replaces_the_superseded_one(data_dir):
+    first = reference_store.compile_reference_data(data_dir)
+    with open(os.path.join(data_dir, "fuel_lhv.tsv"), "a") as f:
+        f.write("\n")  # Any source change is a new version
+    second = reference_store.compile_reference_data(data_dir)
+    assert second != first
+    assert os.listdir(os.path.join(data_dir, ".compiled")) == [os.path.basename(second)]
+    assert reference_store.open_store(data_dir).version == os.path.basename(second)
+
+
+def test_read_only_data_compiles_to_a_private_user_directory(data_dir, tmp_path, monkeypatch):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path / "tmp"))
+    os.makedirs(tempfile.tempdir)
+    writable = os.access
+    monkeypatch.setattr(os, "access", lambda path, mode: False if str(path).startswith(data_dir) else writable(path, mode))
+    compiled = reference_store.compile_reference_data(data_dir)
+    root = os.path.dirname(os.path.dirname(compiled))
+    assert os.path.dirname(root) == tempfile.tempdir and root.endswith(f"-{os.getuid()}")
+    assert os.stat(root).st_mode & 0o777 == 0o700
+    assert not os.path.exists(os.path.join(data_dir, ".compiled"))
+    assert reference_store.open_store(data_dir).table("fuel_lhv").n_rows > 0
+
+
+def test_existing_user_directory_readable_by_others_is_made_private(data_dir, tmp_path, monkeypatch):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    root = tmp_path / f"fuel_supplier_reference-{os.getuid()}"
+    root.mkdir(mode=0o755)
+    root.chmod(0o755)
+    monkeypatch.setattr(os, "access", lambda path, mode: False)
+    assert reference_store.compiled_root_for(data_dir).startswith(str(root))
+    assert os.stat(root).st_mode & 0o777 == 0o700
@@ -0,0 +1,114 @@
+"""ResultCache bounds, copies and persistence, and scenario key canonicalization."""
+import numpy as np
+import pytest
+
+import result_cache
+
+
+def test_scenario_key_is_canonical():
+    key = result_cache.scenario_key(2030, [1, 2], [50.0, 50.0])
+    assert result_cache.scenario_key(2030, np.array([1.0, 2.0]), [50.0 + 1e-12, 50.0]) == key
+    assert result_cache.scenario_key(2030, [1, 2], [50.0, 50.0], "mode") != key
+    assert result_cache.scenario_key(2040, [1, 2], [50.0, 50.0]) != key
+    assert result_cache.scenario_key(2030, [0.0], [100.0]) == result_cache.scenario_key(2030, [-0.0], [100.0])
+
+
+def test_scenario_key_changes_with_the_schema_version(monkeypatch):
+    key = result_cache.scenario_key(2030, [1, 2], [50.0, 50.0])
+    monkeypatch.setattr(result_cache, "SCHEMA_VERSION", result_cache.SCHEMA_VERSION + 1)
+    assert result_cache.scenario_key(2030, [1, 2], [50.0, 50.0]) != key
+
+
+def test_evicts_least_recently_used_beyond_max_entries():
+    cache = result_cache.ResultCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" is now the oldest
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_evicts_beyond_max_bytes():
+    cache = result_cache.ResultCache(max_bytes=10_000)
+    for i in range(10):
+        cache.put(str(i), np.zeros(500))  # ~4 KB pickled
+    stats = cache.stats()
+    assert stats["bytes"] <= 10_000
+    assert len(cache) == stats["entries"] < 10
+    assert cache.get("9") is not None and cache.get("0") is None
+
+
+def test_get_returns_independent_copies():
+    cache = result_cache.ResultCache()
+    cache.put("k", {"values": [1, 2]})
+    cache.get("k")["values"].append(3)
+    assert cache.get("k") == {"values": [1, 2]}
+
+
+def test_get_or_compute_computes_once():
+    cache = result_cache.ResultCache()
+    calls = []
+    for _ in range(3):
+        assert cache.get_or_compute("k", lambda: calls.append(1) or "value") == "value"
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 2
+
+
+def test_persisted_entries_survive_a_new_instance(tmp_path):
+    result_cache.ResultCache(persist_dir=str(tmp_path)).put("k", [1.5])
+    cache = result_cache.ResultCache(persist_dir=str(tmp_path))
+    assert "k" in cache
+    assert cache.get("k") == [1.5]
+    assert cache.stats()["disk_hits"] == 1
+
+
+def test_unreadable_persisted_entry_is_a_miss_and_removed(tmp_path):
+    result_cache.ResultCache(persist_dir=str(tmp_path)).put("good", [1.5])
+    (tmp_path / "bad.pkl").write_bytes(b"not a pickle")
+    cache = result_cache.ResultCache(persist_dir=str(tmp_path))
+    assert cache.get("bad", "default") == "default"
+    assert "bad" not in cache and not (tmp_path / "bad.pkl").exists()
+    assert cache.get("good") == [1.5]
+    stats = cache.stats()
+    assert (stats["misses"], stats["hits"], stats["disk_entries"]) == (1, 1, 1)
+
+
+def test_disk_copy_has_the_same_bounds(tmp_path):
+    cache = result_cache.ResultCache(max_entries=3, persist_dir=str(tmp_path))
+    for key in "abcde":
+        cache.put(key, key)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["c.pkl", "d.pkl", "e.pkl"]
+    assert cache.stats()["disk_entries"] == 3
+
+    cache = result_cache.ResultCache(max_bytes=200, persist_dir=str(tmp_path))
+    cache.put("big", b"x" * 175)  # Leaves no room for the older small entries
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["big.pkl"]
+    assert cache.stats()["disk_bytes"] == (tmp_path / "big.pkl").stat().st_size <= 200
+
+
+def test_clear_removes_files_and_counters(tmp_path):
+    cache = result_cache.ResultCache(persist_dir=str(tmp_path))
+    cache.put("k", 1)
+    cache.get("k")
+    cache.get("missing")
+    cache.clear()
+    assert list(tmp_path.iterdir()) == []
+    assert "k" not in cache
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"], stats["disk_entries"]) == (0, 0, 0, 0)
+
+
+def test_persist_dir_is_private(tmp_path):
+    path = tmp_path / "cache"
+    result_cache.ResultCache(persist_dir=str(path))
+    assert path.stat().st_mode & 0o777 == 0o700
+
+
+def test_shared_persist_dir_is_refused(tmp_path):
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    shared.chmod(0o777)
+    with pytest.raises(PermissionError):
+        result_cache.ResultCache(persist_dir=str(shared))
@@ -0,0 +1,82 @@
+"""The closed-form sensitivities against finite differences of the engine."""
+import numpy as np
+import pytest
+
+from fuel_config import YEAR_OPTIONS, VESSEL_KEYS, DEFAULT_OWNED_VESSEL_COUNTS, DEFAULT_FUEL_MIX
+import fuel_engine
+import fuel_sensitivity
+
+
+def outputs(tables, counts, mix, prices):
+    batch = fuel_engine.compute_year_batch(tables.year, counts, mix, fuel_costs_gj=prices, tables=tables)
+    return np.concatenate([batch.total_cost, batch.base_fuel_demand[0]])
+
+
+def rebalanced(mix, i, h):
+    """``mix`` with share ``i`` raised by ``h`` points and the others scaled to keep the sum."""
+    shifted = mix * (100.0 - mix[i] - h) / (100.0 - mix[i])
+    shifted[i] = mix[i] + h
+    return shifted
+
+
+@pytest.mark.parametrize("year", YEAR_OPTIONS)
+def test_jacobian_matches_finite_differences(year):
+    tables = fuel_engine.get_year_tables(year)
+    counts = fuel_engine.counts_vector(DEFAULT_OWNED_VESSEL_COUNTS[year])
+    mix = fuel_engine.mix_vector(year, DEFAULT_FUEL_MIX[year])
+    prices = tables.fuel_costs_gj.astype(float)
+    sens = fuel_sensitivity.year_sensitivity(year, counts, mix)
+    base = outputs(tables, counts, mix, prices)
+    np.testing.assert_allclose(sens.base[0], base, rtol=1e-12)
+
+    n_vessels, n_fuels, h = len(VESSEL_KEYS), len(tables.mix_keys), 1e-3
+    numeric = []
+    for v in range(n_vessels):
+        step = counts.copy()
+        step[v] += h
+        numeric.append((outputs(tables, step, mix, prices) - base) / h)
+    for f in range(n_fuels):
+        step = prices.copy()
+        step[f] += h
+        numeric.append((outputs(tables, counts, mix, step) - base) / h)
+    for f in range(n_fuels):
+        numeric.append((outputs(tables, counts, rebalanced(mix, f, h), prices) - base) / h)
+    numeric = np.column_stack(numeric)
+
+    scale = np.abs(sens.jacobian[0]).max(axis=1, keepdims=True) + 1.0
+    np.testing.assert_allclose(sens.jacobian[0] / scale, numeric / scale, atol=1e-6)
+
+
+def test_unbounded_swings_are_linear_and_symmetric():
+    year = YEAR_OPTIONS[0]
+    sens = fuel_sensitivity.year_sensitivity(year, fuel_engine.counts_vector(DEFAULT_OWNED_VESSEL_COUNTS[year]),
+                                             fuel_engine.mix_vector(year, DEFAULT_FUEL_MIX[year]))
+    low, high = fuel_sensitivity.swings(sens, 10)
+    free = ~((np.array(sens.groups) == "Mix share") & (sens.values[0] * 1.1 > 100.0))  # Not capped at 100%
+    np.testing.assert_allclose(fuel_sensitivity.swings(sens, 5)[1][..., free], high[..., free] / 2)
+    np.testing.assert_allclose(low[..., free], -high[..., free])
+    base = sens.base[0, sens.outputs.index(fuel_sensitivity.COST_OUTPUT)]
+    for label, at_low, at_high, *_ in fuel_sensitivity.tornado(sens, fuel_sensitivity.COST_OUTPUT, 10):
+        if "capped" not in label:
+            assert at_low + at_high == pytest.approx(2 * base), label
+
+
+@pytest.mark.parametrize("share", [95.0, 100.0])
+def test_mix_share_swings_stay_within_0_and_100(share):
+    year = YEAR_OPTIONS[0]
+    tables = fuel_engine.get_year_tables(year)
+    mix = np.zeros(len(tables.mix_keys))
+    mix[0], mix[1] = share, 100.0 - share
+    counts = fuel_engine.counts_vector(DEFAULT_OWNED_VESSEL_COUNTS[year])
+    sens = fuel_sensitivity.year_sensitivity(year, counts, mix)
+    rows = {label: (low, high) for label, low, high, _ in fuel_sensitivity.tornado(sens, fuel_sensitivity.COST_OUTPUT, 10)}
+    label = f"Mix share: {tables.display_names[0]} (capped at 100%)"
+    low, high = rows[label]
+    base = sens.base[0, 0]
+    derivative = sens.jacobian[0, 0, sens.parameters.index(tables.display_names[0], len(VESSEL_KEYS) + len(mix))]
+    assert high - base == pytest.approx(derivative * (100.0 - share))  # Up to 100%, not 1.1 * share
+    assert base - low == pytest.approx(derivative * share * 0.1)
+
+    # The bounded swing is what re-scoring the clipped mix gives
+    clipped = rebalanced(mix, 0, 100.0 - share) if share < 100.0 else mix
+    assert outputs(tables, counts, clipped, tables.fuel_costs_gj.astype(float))[0] == pytest.approx(high)
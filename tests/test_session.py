@@ -0,0 +1,12 @@
+"""Process-wide figure cache shared by sessions."""
+import fuel_session
+
+
+def test_figures_built_as_none_are_cached():
+    cache = fuel_session.FigureCache()
+    builds = []
+    for _ in range(3):
+        assert cache.get_or_build("empty", {"rows": []}, lambda: builds.append(1)) is None
+    assert len(builds) == 1
+    assert (cache.hits, cache.misses) == (2, 1)
+    assert cache.get("other", {"rows": []}) is None and cache.misses == 2